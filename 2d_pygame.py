@@ -1,9 +1,8 @@
 import pygame
 import sys
-pygame.init()
+from raster import draw_lines
+from render_target import SurfaceTarget
 WIDTH,HEIGHT= 800,600
-screen=pygame.display.set_mode((WIDTH,HEIGHT))
-pygame.display.set_caption("Bresenham algorithm")
 WHITE=(255,255,255)
 BLACK=(0,0,0)
 RED = (255, 0, 0)
@@ -11,45 +10,6 @@ GREEN = (0, 255, 0)
 BLUE= (0, 0, 255)
 PINK = (255, 192, 203)
 
-def bresenham(x1,y1,x2,y2,color):
-    dx=x2-x1
-    dy=y2-y1
-    if x2>x1:
-        lx=1
-    else: 
-        lx=-1
-    if y2>y1:
-        ly=1
-    else: 
-        ly=-1
-    x=x1
-    y=y1
-    if dx>dy:
-        p=(2*dy)-dx
-        while (x!=x2):
-            if p<0:
-                x=x+lx
-                y=y
-                p=p+(2*dy)
-            else:
-                x=x+lx
-                y=y+ly
-                p=p+(2*dy)-(2*dx)
-            screen.set_at((round(x),round(y)),color)
-    else:
-        p=2*dx-dy
-        while (y!=y2):
-            if p<0:
-                x=x
-                y=y+ly
-                p=p+(2*dx)
-            else:
-                x=x+lx
-                y=y+ly
-                p=p+(2*dx)-(2*dy)
-            screen.set_at((round(x),round(y)),color)
-
-
 def translation(x1, y1,x2,y2, tx, ty):
     x_new1 = x1 + tx
     y_new1 = y1 + ty
@@ -92,31 +52,34 @@ def reflection(x1, y1, x2, y2, axis,cx,cy):
     return round(x_new1), round(y_new1), round(x_new2), round(y_new2)
 
 
+def draw(target,x1,y1,x2,y2):
+    # Every line with its color, rasterized in one batch (Bresenham, see raster.py)
+    segments=[
+        (x1,y1,x2,y2),
+        translation(x1, y1, x2, y2, 100, 50),
+        scale(x1, y1, x2, y2, 4,4,10,10),
+        rotate(x1, y1, x2, y2, 45),
+        reflection(x1, y1, x2, y2, 'y',200,150),
+    ]
+    draw_lines(target,segments,[WHITE,RED,GREEN,BLUE,PINK])
+
 def main():
     x1=int(input("Enter x1:"))
     y1=int(input("Enter y1:"))
     x2=int(input("Enter x2:"))
     y2=int(input("Enter y2:"))
+    pygame.init()
+    screen=pygame.display.set_mode((WIDTH,HEIGHT))
+    pygame.display.set_caption("Bresenham algorithm")
+    target=SurfaceTarget(screen)
     while True:
         for event in pygame.event.get():
             if event.type==pygame.QUIT: 
                 pygame.quit()
                 sys.exit()
-        screen.fill(BLACK)
-
-        bresenham(x1,y1,x2,y2,WHITE)
-
-        a,b,c,d = translation(x1, y1, x2, y2, 100, 50)
-        bresenham(a,b,c,d,RED)
-
-        e,f,g,h = scale(x1, y1, x2, y2, 4,4,10,10)
-        bresenham(e,f,g,h,GREEN)
-
-        i,j,k,l = rotate(x1, y1, x2, y2, 45)
-        bresenham(i,j,k,l,BLUE)
+        target.fill(BLACK)
 
-        m,n,o,p = reflection(x1, y1, x2, y2, 'y',200,150)
-        bresenham(m,n,o,p,PINK)
+        draw(target,x1,y1,x2,y2)
 
         pygame.display.flip()
         
@@ -1,50 +1,16 @@
 import pygame
 import sys
 import math
-
-pygame.init()
+from raster import draw_lines
+from render_target import SurfaceTarget
 
 # Screen setup
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Bresenham Algorithm with Transformations")
 
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-# Bresenham Line Drawing Algorithm
-def bresenham(x1, y1, x2, y2):
-    dx = abs(x2 - x1)
-    dy = abs(y2 - y1)
-
-    lx = 1 if x2 > x1 else -1
-    ly = 1 if y2 > y1 else -1
-
-    x, y = x1, y1
-    screen.set_at((x, y), WHITE)
-
-    if dx > dy:
-        p = 2 * dy - dx
-        while x != x2:
-            x += lx
-            if p < 0:
-                p += 2 * dy
-            else:
-                y += ly
-                p += 2 * dy - 2 * dx
-            screen.set_at((x, y), WHITE)
-    else:
-        p = 2 * dx - dy
-        while y != y2:
-            y += ly
-            if p < 0:
-                p += 2 * dx
-            else:
-                x += lx
-                p += 2 * dx - 2 * dy
-            screen.set_at((x, y), WHITE)
-
 # Translation
 def translation(x1, y1, x2, y2, tx, ty):
     return x1 + tx, y1 + ty, x2 + tx, y2 + ty
@@ -65,12 +31,26 @@ def rotate(x1, y1, x2, y2, angle):
 
     return round(x_new1), round(y_new1), round(x_new2), round(y_new2)
 
+def draw(target, x1, y1, x2, y2):
+    # The line and its transformed copies, rasterized in one batch (Bresenham, see raster.py)
+    segments = [
+        (x1, y1, x2, y2),                       # Original line
+        translation(x1, y1, x2, y2, 100, 50),   # Translated line
+        scale(x1, y1, x2, y2, 2, 2),            # Scaled line
+        rotate(x1, y1, x2, y2, 45),             # Rotated line
+    ]
+    draw_lines(target, segments, WHITE)
+
 def main():
     x1 = int(input("Enter x1: "))
     y1 = int(input("Enter y1: "))
     x2 = int(input("Enter x2: "))
     y2 = int(input("Enter y2: "))
 
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Bresenham Algorithm with Transformations")
+    target = SurfaceTarget(screen)
     clock = pygame.time.Clock()
 
     while True:
@@ -79,22 +59,8 @@ def main():
                 pygame.quit()
                 sys.exit()
 
-        screen.fill(BLACK)
-
-        # Original line
-        bresenham(x1, y1, x2, y2)
-
-        # Translated line
-        a, b, c, d = translation(x1, y1, x2, y2, 100, 50)
-        bresenham(a, b, c, d)
-
-        # Scaled line
-        e, f, g, h = scale(x1, y1, x2, y2, 2, 2)
-        bresenham(e, f, g, h)
-
-        # Rotated line
-        i, j, k, l = rotate(x1, y1, x2, y2, 45)
-        bresenham(i, j, k, l)
+        target.fill(BLACK)
+        draw(target, x1, y1, x2, y2)
 
         pygame.display.flip()
         clock.tick(60)
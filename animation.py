@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+from gbuffer import GBuffer
+from image_io import write_png
+from raytracer import MAX_DEPTH, compile_scene, default_scene, render_batched
+from scene import load_scene
+
+# Keyframed animation renderer writing a numbered image sequence.
+#   python animation.py [animation.json] [--scene scene.json] -o frames/frame_%04d.png
+#
+# The animation file keys sphere centers (by index into the scene's spheres) and the
+# camera position; values in between are linear:
+#   {"frames": 48,
+#    "camera": [{"frame": 0, "position": [0, 1, 1]}, {"frame": 47, "position": [0, 2, 4]}],
+#    "spheres": {"0": [{"frame": 0, "center": [0, 0, -5]}, {"frame": 24, "center": [0, 2, -5]}]}}
+#
+# Per frame the moved spheres are updated in place and the BVH is refitted, not rebuilt.
+# While the camera stays put, frames come from a GBuffer that only re-traces the pixels
+# the moved spheres can affect; the static background is shaded from the cache. Frames
+# are PNG-encoded on a writer thread behind a bounded queue, so encoding overlaps with
+# rendering the next frame without unbounded memory use.
+
+WIDTH, HEIGHT = 400, 300
+QUEUE_SIZE = 4  # frames waiting to be written before the renderer blocks
+
+class Track:
+    # Piecewise-linear keyframes [(frame, value), ...]; held constant outside the keys
+    def __init__(self, keys):
+        keys = sorted(keys, key=lambda key: key[0])
+        self.frames = np.array([frame for frame, _ in keys], dtype=float)
+        self.values = np.array([value for _, value in keys], dtype=float).reshape(len(keys), -1)
+
+    def at(self, frame):
+        return np.array([np.interp(frame, self.frames, column) for column in self.values.T])
+
+class Animation:
+    def __init__(self, num_frames, camera=None, spheres=None):
+        self.num_frames = num_frames
+        self.camera = camera          # Track or None for the scene's camera
+        self.spheres = spheres or {}  # sphere index -> Track of its center
+
+    @classmethod
+    def from_json(cls, data):
+        camera = None
+        if data.get('camera'):
+            camera = Track([(key['frame'], key['position']) for key in data['camera']])
+        spheres = {int(index): Track([(key['frame'], key['center']) for key in keys])
+                   for index, keys in data.get('spheres', {}).items()}
+        return cls(data['frames'], camera, spheres)
+
+    def camera_at(self, frame, default):
+        return np.asarray(default, dtype=float) if self.camera is None else self.camera.at(frame)
+
+def demo_animation():
+    # Red sphere bounces in place while the camera holds still, then the camera dollies back
+    bounce = [(frame, [0, abs(np.sin(frame / 24 * 2 * np.pi)) * 1.5, -5]) for frame in range(0, 48, 3)]
+    camera = Track([(0, [0, 1, 1]), (23, [0, 1, 1]), (47, [0, 2, 4])])
+    return Animation(48, camera, {0: Track(bounce)})
+
+# --- Output ---
+
+class FrameWriter:
+    # Writes images to pattern % index on a background thread. write() blocks while
+    # max_pending frames are queued; an error on the writer thread is raised again
+    # from the next write() or close().
+    def __init__(self, pattern, max_pending=QUEUE_SIZE):
+        self.pattern = pattern
+        directory = os.path.dirname(pattern % 0)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is None:
+                index, image = item
+                try:
+                    write_png(self.pattern % index, image)
+                except Exception as error:
+                    self.error = error
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, index, image):
+        self._check()
+        self.queue.put((index, image))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# --- Rendering ---
+
+def render_animation(objects, lights, camera_pos, animation, width, height, max_depth=MAX_DEPTH):
+    # Yields (frame, image, retraced) with retraced the fraction of pixels traced anew
+    scene = compile_scene(objects)
+    if scene.uses_bvh():
+        scene.build_bvh()
+    tracks = {index: track for index, track in animation.spheres.items() if index < len(scene.sphere_centers)}
+    cache = None
+
+    for frame in range(animation.num_frames):
+        camera = animation.camera_at(frame, camera_pos)
+        moved = []
+        for index, track in tracks.items():
+            center = track.at(frame)
+            if not np.array_equal(center, scene.sphere_centers[index]):
+                scene.sphere_centers[index] = center
+                moved.append(index)
+
+        if cache is not None and np.array_equal(cache.camera_pos, camera):
+            retraced = cache.geometry_changed(moved) / (width * height) if moved else 0.0
+        else:
+            cache = None
+            if moved:
+                scene.geometry_changed(refit=True)
+            # Only worth recording the G-buffer if the next frame keeps this camera
+            next_camera = animation.camera_at(frame + 1, camera_pos)
+            if frame + 1 < animation.num_frames and np.array_equal(next_camera, camera):
+                cache = GBuffer(scene, lights, camera, width, height, max_depth)
+            retraced = 1.0
+        image = cache.render() if cache is not None else render_batched(scene, lights, camera, width, height, max_depth)
+        yield frame, image, retraced
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render a keyframed animation to a numbered image sequence.")
+    parser.add_argument('animation', nargs='?', help="animation file (.json); default is a built-in demo")
+    parser.add_argument('--scene', help="scene file (.json or .npz); default is the built-in demo scene")
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--height', type=int, default=HEIGHT)
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help="reflection bounces")
+    parser.add_argument('-o', '--output', default='frames/frame_%04d.png', help="printf-style pattern for the frame index")
+    parser.add_argument('--queue', type=int, default=QUEUE_SIZE, help="frames buffered for the writer thread")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.scene:
+        scene = load_scene(args.scene)
+        objects, lights, camera_pos = scene, scene.lights(), scene.camera
+    else:
+        objects, lights, camera_pos = default_scene()
+    if args.animation:
+        with open(args.animation) as f:
+            animation = Animation.from_json(json.load(f))
+    else:
+        animation = demo_animation()
+
+    print(f"Rendering {animation.num_frames} frames at {args.width}x{args.height} to {args.output}...")
+    start = time.perf_counter()
+    with FrameWriter(args.output, args.queue) as writer:
+        last = start
+        for frame, image, retraced in render_animation(objects, lights, camera_pos, animation,
+                                                       args.width, args.height, args.max_depth):
+            writer.write(frame, image)
+            now = time.perf_counter()
+            print(f"  frame {frame:4d}  {now - last:6.3f} s  {retraced:6.1%} traced")
+            last = now
+    print(f"Done in {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import sys
+import time
+import numpy as np
+from raytracer import Material, Sphere, Plane, Scene, render_batched
+
+# Render time against sphere count, with and without the BVH.
+# Usage: python benchmark_bvh.py [width height]
+
+WIDTH, HEIGHT = 160, 120
+COUNTS = [10, 100, 1000, 5000]
+LINEAR_LIMIT = 1000  # the linear scan gets too slow to wait for beyond this
+
+def random_scene(count, seed=0):
+    rng = np.random.default_rng(seed)
+    materials = [
+        Material([1.0, 0.0, 0.0], reflection=0.2),
+        Material([0.0, 1.0, 0.0], reflection=0.2),
+        Material([0.9, 0.9, 0.9], reflection=0.8, diffuse=0.1),
+    ]
+    objects = [
+        Sphere(rng.uniform([-20, -1, -60], [20, 10, -5]), rng.uniform(0.1, 0.6), materials[rng.integers(len(materials))])
+        for _ in range(count)
+    ]
+    objects.append(Plane([0, -1, 0], [0, 1, 0], Material([0.5, 0.5, 0.5], reflection=0.3)))
+    return objects
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    width, height = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (WIDTH, HEIGHT)
+    lights = [
+        (np.array([5, 5, -5]), np.array([1, 1, 1])),
+        (np.array([-5, 5, -5]), np.array([0.5, 0.5, 0.5]))
+    ]
+    camera_pos = np.array([0, 1, 0])
+
+    print(f"{'spheres':>8} {'linear (s)':>11} {'build (s)':>10} {'bvh (s)':>9} {'speedup':>8}")
+    for count in COUNTS:
+        objects = random_scene(count)
+
+        scene = Scene.from_objects(objects)
+        scene.use_bvh = True
+        _, build_time = timed(scene.build_bvh)
+        _, bvh_time = timed(lambda: render_batched(scene, lights, camera_pos, width, height))
+
+        if count <= LINEAR_LIMIT:
+            linear = Scene.from_objects(objects)
+            linear.use_bvh = False
+            _, linear_time = timed(lambda: render_batched(linear, lights, camera_pos, width, height))
+            print(f"{count:>8} {linear_time:>11.3f} {build_time:>10.3f} {bvh_time:>9.3f} {linear_time / bvh_time:>7.1f}x")
+        else:
+            print(f"{count:>8} {'-':>11} {build_time:>10.3f} {bvh_time:>9.3f} {'-':>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import raytracer
+from raytracer import Material, Plane, RayStats, Sphere, compile_scene, default_scene, render_batched
+
+# Canonical ray-tracer benchmarks with regression tracking.
+#   python benchmark_raytracer.py run -o results.json [--scenes default mirror_box] [--width 160 --height 120]
+#   python benchmark_raytracer.py compare baseline.json results.json [--threshold 0.1]
+#
+# Per scene: wall time of a full render (best of --repeat, after a warm-up render so
+# JIT compilation isn't counted), peak traced memory of one render, and rays per
+# second split into primary, shadow and reflection rays. The split comes from a
+# separate RayStats render, so it times only the scene queries of each kind; the
+# total rate is all those rays over the wall time. compare exits with status 1 if
+# any metric got worse by more than the threshold.
+
+WIDTH, HEIGHT = 160, 120
+REPEAT = 3
+THRESHOLD = 0.10  # relative change that counts as a regression
+
+# --- Scenes ---
+# Each returns (objects, lights, camera_pos, max_depth)
+
+def default_bench():
+    objects, lights, camera_pos = default_scene()
+    return objects, lights, camera_pos, raytracer.MAX_DEPTH
+
+def sphere_grid():
+    # 10 x 10 x 10 spheres: the BVH path
+    materials = [Material([1.0, 0.2, 0.2], reflection=0.2), Material([0.2, 0.2, 1.0], reflection=0.2),
+                 Material([0.9, 0.9, 0.9], reflection=0.8, diffuse=0.1)]
+    objects = [
+        Sphere([x - 4.5, y, -5 - z], 0.3, materials[(x + y + z) % len(materials)])
+        for x in range(10) for y in range(10) for z in range(10)
+    ]
+    objects.append(Plane([0, -1, 0], [0, 1, 0], Material([0.5, 0.5, 0.5], reflection=0.3)))
+    lights = [(np.array([5, 15, 0]), np.array([1, 1, 1])), (np.array([-5, 10, -5]), np.array([0.5, 0.5, 0.5]))]
+    return objects, lights, np.array([0, 5, 4]), raytracer.MAX_DEPTH
+
+def mirror_box():
+    # Camera and light inside six mirror walls: every ray bounces to the depth limit
+    wall = Material([0.8, 0.8, 0.9], reflection=0.9, diffuse=0.2)
+    objects = [
+        Plane([0, -1, 0], [0, 1, 0], wall), Plane([0, 4, 0], [0, -1, 0], wall),
+        Plane([-3, 0, 0], [1, 0, 0], wall), Plane([3, 0, 0], [-1, 0, 0], wall),
+        Plane([0, 0, -8], [0, 0, 1], wall), Plane([0, 0, 2], [0, 0, -1], wall),
+        Sphere([0, 0, -5], 1, Material([1.0, 0.0, 0.0], reflection=0.2)),
+        Sphere([-1.5, 0.5, -3.5], 0.7, Material([0.0, 1.0, 0.0], reflection=0.5)),
+    ]
+    lights = [(np.array([0, 3, -2]), np.array([1, 1, 1]))]
+    return objects, lights, np.array([0, 1, 1]), 8
+
+def many_lights():
+    # The default scene lit by a ring of 32 dim lights: shadow rays dominate
+    objects, _, camera_pos = default_scene()
+    angles = np.linspace(0, 2 * np.pi, 32, endpoint=False)
+    lights = [(np.array([6 * np.cos(a), 5, -5 + 6 * np.sin(a)]), np.full(3, 1 / 16)) for a in angles]
+    return objects, lights, camera_pos, raytracer.MAX_DEPTH
+
+SCENES = {
+    'default': default_bench,
+    'sphere_grid': sphere_grid,
+    'mirror_box': mirror_box,
+    'many_lights': many_lights,
+}
+
+# --- Measurement ---
+
+def peak_memory(fn):
+    # Peak bytes allocated while fn runs, as seen by tracemalloc
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def bench_scene(make_scene, width, height, repeat):
+    objects, lights, camera_pos, max_depth = make_scene()
+    scene = compile_scene(objects)
+    start = time.perf_counter()
+    if scene.uses_bvh():
+        scene.build_bvh()
+    build_seconds = time.perf_counter() - start
+
+    def render():
+        return render_batched(scene, lights, camera_pos, width, height, max_depth)
+
+    # Warm-up for both paths, so neither pays JIT compilation or kernel loading below
+    render_batched(scene, lights, camera_pos, 8, 6, max_depth)
+    render_batched(scene, lights, camera_pos, 8, 6, max_depth, stats=RayStats())
+    wall = best_time(render, repeat)
+    peak = peak_memory(render)
+    stats = RayStats()
+    render_batched(scene, lights, camera_pos, width, height, max_depth, stats=stats)
+
+    rates = stats.rays_per_second()
+    rates['total'] = sum(stats.rays.values()) / wall
+    return {
+        'wall_seconds': wall,
+        'build_seconds': build_seconds,
+        'peak_memory_mb': peak / 1e6,
+        'rays': stats.rays,
+        'rays_per_second': rates,
+    }
+
+def bench_trial3(width, height, repeat):
+    # project_trial3.py's standalone tuple tracer; it doesn't count its secondary rays,
+    # so only the primary rate is known
+    import project_trial3
+
+    def render():
+        return project_trial3.render(width, height, log=lambda message: None)
+
+    wall = best_time(render, repeat)
+    return {
+        'wall_seconds': wall,
+        'peak_memory_mb': peak_memory(render) / 1e6,
+        'rays': {'primary': width * height},
+        'rays_per_second': {'primary': width * height / wall},
+    }
+
+def run(args):
+    names = args.scenes or list(SCENES) + ['trial3']
+    results = {
+        'version': 1,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'backend': raytracer.BACKEND,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'width': args.width,
+        'height': args.height,
+        'scenes': {},
+    }
+    print(f"{args.width}x{args.height}, best of {args.repeat}, {raytracer.BACKEND} backend")
+    print(f"{'scene':<12} {'wall (s)':>9} {'mem (MB)':>9} {'total':>10} {'primary':>10} {'shadow':>10} {'reflect':>10}  (rays/s)")
+    for name in names:
+        if name == 'trial3':
+            result = bench_trial3(args.width, args.height, args.repeat)
+        else:
+            result = bench_scene(SCENES[name], args.width, args.height, args.repeat)
+        results['scenes'][name] = result
+        rates = result['rays_per_second']
+        print(f"{name:<12} {result['wall_seconds']:>9.3f} {result['peak_memory_mb']:>9.1f}"
+              + ''.join(f" {rates[kind]:>10.3g}" if kind in rates else f" {'-':>10}"
+                        for kind in ('total', 'primary', 'shadow', 'reflection')))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {args.output}")
+
+# --- Comparison ---
+
+def metrics(result):
+    # (name, value, higher_is_better) for every comparable number of one scene
+    yield 'wall_seconds', result['wall_seconds'], False
+    yield 'peak_memory_mb', result['peak_memory_mb'], False
+    for kind, rate in result['rays_per_second'].items():
+        yield f'rays_per_second.{kind}', rate, True
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if (baseline['width'], baseline['height']) != (current['width'], current['height']):
+        print(f"warning: resolutions differ ({baseline['width']}x{baseline['height']} vs {current['width']}x{current['height']})")
+    if baseline['backend'] != current['backend']:
+        print(f"warning: backends differ ({baseline['backend']} vs {current['backend']})")
+
+    regressions = 0
+    print(f"{'scene':<12} {'metric':<28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current['scenes'].items():
+        if name not in baseline['scenes']:
+            continue
+        old = {metric: value for metric, value, _ in metrics(baseline['scenes'][name])}
+        for metric, value, higher_is_better in metrics(result):
+            if metric not in old or old[metric] == 0:
+                continue
+            change = value / old[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = '  REGRESSION' if worse > args.threshold else ''
+            regressions += bool(flag)
+            print(f"{name:<12} {metric:<28} {old[metric]:>10.4g} {value:>10.4g} {change:>+7.1%}{flag}")
+
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ray-tracer benchmark suite.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the benchmarks and write a JSON result file")
+    run_parser.add_argument('--scenes', nargs='+', choices=list(SCENES) + ['trial3'],
+                            help="scenes to run (default: all, including project_trial3.py as trial3)")
+    run_parser.add_argument('--width', type=int, default=WIDTH)
+    run_parser.add_argument('--height', type=int, default=HEIGHT)
+    run_parser.add_argument('--repeat', type=int, default=REPEAT, help="timed renders per scene, the best counts")
+    run_parser.add_argument('-o', '--output', default='benchmark_results.json')
+
+    compare_parser = commands.add_parser('compare', help="flag regressions between two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                help="relative change that counts as a regression (default 0.1)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        run(args)
+        return 0
+    return compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import math
+import timeit
+import numpy as np
+import vec3
+from raytracer import normalize
+
+# Microbenchmark of the per-ray vector math: NumPy 3-vectors (raytracer.py),
+# the operator-overloading Vec class project_trial3.py used, and vec3 tuples.
+# Usage: python benchmark_vec3.py
+
+NUMBER = 100_000
+
+class Vec:
+    # project_trial3.py's original vector class, kept here as the baseline
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+    def __add__(self, o): return Vec(self.x+o.x, self.y+o.y, self.z+o.z)
+    def __sub__(self, o): return Vec(self.x-o.x, self.y-o.y, self.z-o.z)
+    def __mul__(self, k): return Vec(self.x*k, self.y*k, self.z*k)
+
+    def dot(self, o): return self.x*o.x + self.y*o.y + self.z*o.z
+
+    def norm(self):
+        m = math.sqrt(self.dot(self))
+        return self * (1/m)
+
+    def reflect(self, n):
+        return self - n * 2 * self.dot(n)
+
+def numpy_sphere(origin, direction, center, radius):
+    # Sphere.intersect body from raytracer.py
+    oc = origin - center
+    a = np.dot(direction, direction)
+    b = 2.0 * np.dot(oc, direction)
+    c = np.dot(oc, oc) - radius * radius
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return float('inf')
+    sqrt_disc = math.sqrt(discriminant)
+    return (-b - sqrt_disc) / (2 * a)
+
+def vec_sphere(origin, direction, center, radius):
+    oc = origin - center
+    a = direction.dot(direction)
+    b = 2.0 * oc.dot(direction)
+    c = oc.dot(oc) - radius * radius
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return float('inf')
+    sqrt_disc = math.sqrt(discriminant)
+    return (-b - sqrt_disc) / (2 * a)
+
+def tuple_sphere(origin, direction, center, radius):
+    oc = vec3.sub(origin, center)
+    a = vec3.dot(direction, direction)
+    b = 2.0 * vec3.dot(oc, direction)
+    c = vec3.dot(oc, oc) - radius * radius
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return float('inf')
+    sqrt_disc = math.sqrt(discriminant)
+    return (-b - sqrt_disc) / (2 * a)
+
+def main():
+    o_np, d_np, c_np = np.array([0.0, 1.0, 0.0]), normalize(np.array([0.1, -0.2, -1.0])), np.array([0.0, 0.0, -5.0])
+    o_v, d_v, c_v = Vec(*o_np), Vec(*d_np), Vec(*c_np)
+    o_t, d_t, c_t = vec3.vec(o_np), vec3.vec(d_np), vec3.vec(c_np)
+    n_np = normalize(np.array([0.3, 1.0, 0.2]))
+    n_v, n_t = Vec(*n_np), vec3.vec(n_np)
+
+    cases = {
+        'normalize': (
+            lambda: normalize(d_np),
+            lambda: d_v.norm(),
+            lambda: vec3.normalize(d_t),
+        ),
+        'dot': (
+            lambda: np.dot(d_np, n_np),
+            lambda: d_v.dot(n_v),
+            lambda: vec3.dot(d_t, n_t),
+        ),
+        'madd': (
+            lambda: o_np + d_np * 2.5,
+            lambda: o_v + d_v * 2.5,
+            lambda: vec3.madd(o_t, d_t, 2.5),
+        ),
+        'reflect': (
+            lambda: d_np - 2 * np.dot(d_np, n_np) * n_np,
+            lambda: d_v.reflect(n_v),
+            lambda: vec3.reflect(d_t, n_t),
+        ),
+        'sphere hit': (
+            lambda: numpy_sphere(o_np, d_np, c_np, 1.0),
+            lambda: vec_sphere(o_v, d_v, c_v, 1.0),
+            lambda: tuple_sphere(o_t, d_t, c_t, 1.0),
+        ),
+    }
+
+    print(f"{'op':<12} {'numpy (ns)':>11} {'Vec (ns)':>9} {'vec3 (ns)':>10} {'vs numpy':>9} {'vs Vec':>7}")
+    for name, fns in cases.items():
+        numpy_ns, vec_ns, tuple_ns = (min(timeit.repeat(fn, number=NUMBER, repeat=3)) / NUMBER * 1e9 for fn in fns)
+        print(f"{name:<12} {numpy_ns:>11.0f} {vec_ns:>9.0f} {tuple_ns:>10.0f} "
+              f"{numpy_ns / tuple_ns:>8.1f}x {vec_ns / tuple_ns:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import numpy as np
+
+# Bounding volume hierarchy over axis-aligned boxes, built with binned SAH.
+#
+# Nodes are stored depth-first in flat arrays: the left child of an inner node
+# is always the next node, the right child index is kept in node_right. Leaves
+# have node_count > 0 and cover prim_indices[node_start:node_start + node_count].
+#
+# Every query takes an optional counts argument for instrumentation: a [tests,
+# nodes] list for the scalar queries, an (N, 2) int array (one row per ray) for the
+# batched ones. Intersection tests and nodes visited are added to it.
+
+NUM_BINS = 16
+MAX_LEAF_SIZE = 4
+TRAVERSAL_COST = 1.0
+BATCH_SIZE = 1 << 16  # rays per chunk in the batched traversal, bounds pair-array memory
+
+def _area(lo, hi):
+    e = np.maximum(hi - lo, 0)
+    return 2 * (e[..., 0] * e[..., 1] + e[..., 1] * e[..., 2] + e[..., 2] * e[..., 0])
+
+class BVH:
+    def __init__(self, prim_lo, prim_hi):
+        prim_lo = np.asarray(prim_lo, dtype=float).reshape(-1, 3)
+        prim_hi = np.asarray(prim_hi, dtype=float).reshape(-1, 3)
+        self.prim_indices = np.arange(len(prim_lo))
+
+        if len(prim_lo) == 0:
+            self.node_lo = np.full((1, 3), np.inf)
+            self.node_hi = np.full((1, 3), -np.inf)
+            self.node_right = np.full(1, -1)
+            self.node_start = np.zeros(1, dtype=int)
+            self.node_count = np.zeros(1, dtype=int)
+        else:
+            self._build(prim_lo, prim_hi)
+        self.num_nodes = len(self.node_lo)
+        self._tables = None
+        self._inner_levels = None
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        # Rebuild from the dict produced by to_arrays(), skipping construction
+        bvh = cls.__new__(cls)
+        for name in ('node_lo', 'node_hi', 'node_right', 'node_start', 'node_count', 'prim_indices'):
+            setattr(bvh, name, np.asarray(arrays[name]))
+        bvh.num_nodes = len(bvh.node_lo)
+        bvh._tables = None
+        bvh._inner_levels = None
+        return bvh
+
+    def to_arrays(self):
+        return {
+            'node_lo': self.node_lo, 'node_hi': self.node_hi, 'node_right': self.node_right,
+            'node_start': self.node_start, 'node_count': self.node_count,
+            'prim_indices': self.prim_indices,
+        }
+
+    def _scalar_tables(self):
+        # Plain Python copies for the scalar traversal, which is faster on lists than on tiny
+        # arrays. Built on first scalar query only: for big meshes they cost far more memory
+        # than the arrays and the batched traversal never needs them.
+        if self._tables is None:
+            nodes = list(zip(self.node_lo.tolist(), self.node_hi.tolist(), self.node_right.tolist(),
+                             self.node_start.tolist(), self.node_count.tolist()))
+            self._tables = nodes, self.prim_indices.tolist()
+        return self._tables
+
+    def refit(self, prim_lo, prim_hi):
+        # New bounds for the same prims after they moved, keeping the topology: far cheaper
+        # than a rebuild, though traversal slows down as prims drift from where the tree
+        # was built. Leaves take their prims' bounds, then inner nodes are merged one tree
+        # level at a time from the bottom up.
+        if len(self.prim_indices) == 0:
+            return
+        prim_lo = np.asarray(prim_lo, dtype=float).reshape(-1, 3)
+        prim_hi = np.asarray(prim_hi, dtype=float).reshape(-1, 3)
+        leaves = np.flatnonzero(self.node_count > 0)
+        leaves = leaves[np.argsort(self.node_start[leaves])]
+        self.node_lo[leaves] = np.minimum.reduceat(prim_lo[self.prim_indices], self.node_start[leaves], axis=0)
+        self.node_hi[leaves] = np.maximum.reduceat(prim_hi[self.prim_indices], self.node_start[leaves], axis=0)
+
+        if self._inner_levels is None:
+            levels, frontier = [], np.array([0])
+            while len(frontier):
+                inner = frontier[self.node_count[frontier] == 0]
+                levels.append(inner)
+                frontier = np.concatenate([inner + 1, self.node_right[inner]])
+            self._inner_levels = levels[::-1]
+        for inner in self._inner_levels:
+            left, right = inner + 1, self.node_right[inner]
+            self.node_lo[inner] = np.minimum(self.node_lo[left], self.node_lo[right])
+            self.node_hi[inner] = np.maximum(self.node_hi[left], self.node_hi[right])
+        self._tables = None
+
+    # --- Construction ---
+
+    def _build(self, prim_lo, prim_hi):
+        # Top-down, one tree level at a time: all nodes of a level are split together with
+        # segmented array operations, so the Python overhead grows with tree depth instead
+        # of node count (a million prims build in seconds). Nodes are created breadth-first
+        # and renumbered depth-first at the end.
+        # Prims of the nodes still being split, kept contiguous per node and in prim_indices
+        # order so every step below works on sequential memory
+        ids, pos = self.prim_indices.copy(), np.arange(len(prim_lo))
+        lo_all, hi_all = prim_lo.copy(), prim_hi.copy()
+        centroids = (prim_lo + prim_hi) * 0.5
+        starts, counts = np.array([0]), np.array([len(prim_lo)])
+        levels = []
+        next_id = 1
+
+        while len(starts):
+            k = len(starts)
+            offsets = np.cumsum(counts) - counts
+            lo = np.minimum.reduceat(lo_all, offsets, axis=0)
+            hi = np.maximum.reduceat(hi_all, offsets, axis=0)
+
+            # Nodes with more than MAX_LEAF_SIZE prims are always split, the rest become
+            # leaves and their prims are already in place
+            split = counts > MAX_LEAF_SIZE
+            num_split = int(split.sum())
+            left = np.full(k, -1)
+            left[split] = next_id + 2 * np.arange(num_split)
+            levels.append((np.arange(next_id - k, next_id) if levels else np.array([0]), lo, hi, starts, counts, split, left))
+            next_id += 2 * num_split
+            if num_split == 0:
+                break
+
+            seg = np.repeat(np.arange(k), counts)
+            if num_split < k:
+                keep = split[seg]
+                ids, pos, lo_all, hi_all, centroids = ids[keep], pos[keep], lo_all[keep], hi_all[keep], centroids[keep]
+                starts, counts = starts[split], counts[split]
+                offsets = np.cumsum(counts) - counts
+                seg = np.repeat(np.arange(num_split), counts)
+            go_right = self._split_sides(lo_all, hi_all, centroids, seg, offsets, counts, lo[split], hi[split])
+
+            # Partition each node's prims: left side first, order kept within a side
+            order = np.argsort(seg * 2 + go_right, kind='stable')
+            ids, lo_all, hi_all, centroids = ids[order], lo_all[order], hi_all[order], centroids[order]
+            self.prim_indices[pos] = ids
+            n_left = counts - np.bincount(seg, weights=go_right, minlength=num_split).astype(int)
+
+            starts = np.stack([starts, starts + n_left], axis=1).ravel()
+            counts = np.stack([n_left, counts - n_left], axis=1).ravel()
+
+        # Subtree sizes bottom-up, then depth-first numbers top-down:
+        # left child = parent + 1, right child = parent + 1 + size(left subtree)
+        size = np.ones(next_id, dtype=int)
+        for ids, _, _, _, _, split, left in reversed(levels):
+            size[ids[split]] += size[left[split]] + size[left[split] + 1]
+        dfs = np.zeros(next_id, dtype=int)
+        for ids, _, _, _, _, split, left in levels:
+            parent = dfs[ids[split]]
+            dfs[left[split]] = parent + 1
+            dfs[left[split] + 1] = parent + 1 + size[left[split]]
+
+        self.node_lo = np.zeros((next_id, 3))
+        self.node_hi = np.zeros((next_id, 3))
+        self.node_right = np.full(next_id, -1)
+        self.node_start = np.zeros(next_id, dtype=int)
+        self.node_count = np.zeros(next_id, dtype=int)
+        for ids, lo, hi, starts, counts, split, left in levels:
+            node = dfs[ids]
+            self.node_lo[node], self.node_hi[node] = lo, hi
+            self.node_right[node[split]] = dfs[left[split] + 1]
+            self.node_start[node[~split]] = starts[~split]
+            self.node_count[node[~split]] = counts[~split]
+
+    def _split_sides(self, lo, hi, centroids, seg, offsets, counts, node_lo, node_hi):
+        # Binned SAH for every node of a level (segment seg of the prims), all three axes
+        # at once. Returns True for prims that go to the right child. Where SAH finds
+        # no usable plane the node is split at the median centroid of its longest axis.
+        k = len(counts)
+        rows = np.arange(k)
+        num_bins = min(NUM_BINS, int(counts.max()))  # deep levels only hold small nodes
+        c_lo = np.minimum.reduceat(centroids, offsets, axis=0)
+        c_hi = np.maximum.reduceat(centroids, offsets, axis=0)
+        extent = c_hi - c_lo
+
+        scale = np.divide(num_bins, extent, out=np.zeros_like(extent), where=extent > 0)
+        bins = np.minimum(((centroids - c_lo[seg]) * scale[seg]).astype(int), num_bins - 1)
+        flat = (((seg * 3)[:, None] + np.arange(3)) * num_bins + bins).ravel()  # (node, axis, bin)
+
+        bin_count = np.bincount(flat, minlength=k * 3 * num_bins).reshape(k, 3, num_bins)
+        bin_lo = np.full((k * 3 * num_bins, 3), np.inf)
+        bin_hi = np.full((k * 3 * num_bins, 3), -np.inf)
+        lo, hi = np.repeat(lo, 3, axis=0), np.repeat(hi, 3, axis=0)
+        for j in range(3):  # 1-D ufunc.at is several times faster than on rows
+            np.minimum.at(bin_lo[:, j], flat, lo[:, j])
+            np.maximum.at(bin_hi[:, j], flat, hi[:, j])
+        bin_lo = bin_lo.reshape(k, 3, num_bins, 3)
+        bin_hi = bin_hi.reshape(k, 3, num_bins, 3)
+
+        # Prefix (left of plane i+1) and suffix (right of it) sweeps per node and axis
+        left_count = np.cumsum(bin_count, axis=2)[:, :, :-1]
+        right_count = counts[:, None, None] - left_count
+        left_area = _area(np.minimum.accumulate(bin_lo, axis=2)[:, :, :-1], np.maximum.accumulate(bin_hi, axis=2)[:, :, :-1])
+        right_area = _area(np.minimum.accumulate(bin_lo[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:],
+                           np.maximum.accumulate(bin_hi[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:])
+
+        node_area = _area(node_lo, node_hi)
+        cost = TRAVERSAL_COST * node_area[:, None, None] + left_count * left_area + right_count * right_area
+        cost[(left_count == 0) | (right_count == 0) | (extent[:, :, None] <= 0)] = np.inf
+        cost = cost.reshape(k, -1)
+        best = cost.argmin(axis=1)
+        axis, i = np.divmod(best, num_bins - 1)
+        use_sah = cost[rows, best] < counts * node_area
+
+        boundary = c_lo[rows, axis] + extent[rows, axis] * (i + 1) / num_bins
+        go_right = centroids[np.arange(len(seg)), axis[seg]] > boundary[seg]
+        # Guard against float rounding putting everything on one side
+        n_left = counts - np.bincount(seg, weights=go_right, minlength=k).astype(int)
+        use_sah &= (n_left > 0) & (n_left < counts)
+
+        median = np.flatnonzero(~use_sah[seg])
+        if len(median):
+            long_axis = np.argmax(node_hi - node_lo, axis=1)
+            order = median[np.lexsort((centroids[median, long_axis[seg[median]]], seg[median]))]
+            rank = np.arange(len(order)) - np.searchsorted(seg[order], seg[order])
+            go_right[order] = rank >= counts[seg[order]] // 2
+        return go_right
+
+    # --- Queries ---
+
+    def closest_hit(self, origin, direction, intersect, t_max=float('inf'), counts=None):
+        # Scalar traversal. intersect(prim) returns the hit distance or inf.
+        # Returns (prim, dist), prim is -1 on a miss.
+        ox, oy, oz = (float(v) for v in origin)
+        inv = [1.0 / float(v) if v != 0 else float('inf') for v in direction]
+        best_t, best_prim = t_max, -1
+        if len(self.prim_indices) == 0:
+            return best_prim, best_t
+        nodes, prims = self._scalar_tables()
+        slab = _slab if counts is None else _counted_slab(counts)
+        if counts is not None:
+            intersect = _counted_intersect(intersect, counts)
+
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            lo, hi, right, start, count = nodes[node]
+            if not slab(ox, oy, oz, inv, lo, hi, best_t):
+                continue
+            if count:
+                for prim in prims[start:start + count]:
+                    t = intersect(prim)
+                    if t < best_t:
+                        best_t, best_prim = t, prim
+            else:
+                stack.append(right)
+                stack.append(node + 1)
+        return best_prim, best_t
+
+    def any_hit(self, origin, direction, intersect, t_max, counts=None):
+        # Scalar occlusion query: True as soon as any prim is hit closer than t_max
+        if len(self.prim_indices) == 0:
+            return False
+        ox, oy, oz = (float(v) for v in origin)
+        inv = [1.0 / float(v) if v != 0 else float('inf') for v in direction]
+        nodes, prims = self._scalar_tables()
+        slab = _slab if counts is None else _counted_slab(counts)
+        if counts is not None:
+            intersect = _counted_intersect(intersect, counts)
+
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            lo, hi, right, start, count = nodes[node]
+            if not slab(ox, oy, oz, inv, lo, hi, t_max):
+                continue
+            if count:
+                for prim in prims[start:start + count]:
+                    if intersect(prim) < t_max:
+                        return True
+            else:
+                stack.append(right)
+                stack.append(node + 1)
+        return False
+
+    def closest_hit_batch(self, origins, directions, intersect_pairs, t_max=None, counts=None):
+        # Breadth-first traversal over (ray, node) pairs, one tree level per iteration, so
+        # the Python overhead scales with tree depth instead of nodes visited.
+        # intersect_pairs(prims, ray_ids) returns one hit distance per (prim, ray) pair.
+        # Returns (prim, dist) arrays, prim is -1 on a miss.
+        n = len(directions)
+        best_t = np.full(n, np.inf) if t_max is None else np.array(t_max, dtype=float)
+        limit = None if t_max is None else best_t.copy()
+        best_prim = np.full(n, -1)
+        if len(self.prim_indices) == 0:
+            return best_prim, best_t
+
+        with np.errstate(divide='ignore'):
+            inv = np.where(directions == 0, np.inf, 1.0 / directions)
+
+        for chunk in range(0, n, BATCH_SIZE):
+            ray_ids = np.arange(chunk, min(chunk + BATCH_SIZE, n))
+            nodes = np.zeros(len(ray_ids), dtype=int)
+            while len(ray_ids):
+                if counts is not None:
+                    _count(counts[:, 1], ray_ids, chunk)
+                keep = _slab_batch(origins[ray_ids], inv[ray_ids], self.node_lo[nodes], self.node_hi[nodes], best_t[ray_ids])
+                ray_ids, nodes = ray_ids[keep], nodes[keep]
+
+                leaf = self.node_count[nodes] > 0
+                if leaf.any():
+                    pair_rays, prims = self._leaf_pairs(ray_ids[leaf], nodes[leaf])
+                    if counts is not None:
+                        _count(counts[:, 0], pair_rays, chunk)
+                    t = intersect_pairs(prims, pair_rays)
+                    if limit is not None:
+                        # A hit exactly at t_max leaves it to whatever set t_max
+                        t = np.where(t < limit[pair_rays], t, np.inf)
+                    np.minimum.at(best_t, pair_rays, t)
+                    won = (t == best_t[pair_rays]) & (t < np.inf)
+                    best_prim[pair_rays[won]] = prims[won]
+
+                inner = ~leaf
+                ray_ids = np.concatenate([ray_ids[inner], ray_ids[inner]])
+                nodes = np.concatenate([nodes[inner] + 1, self.node_right[nodes[inner]]])
+
+        return best_prim, best_t
+
+    def any_hit_batch(self, origins, directions, intersect_pairs, t_max, counts=None):
+        # Batched occlusion query; a ray leaves the frontier as soon as it is blocked
+        n = len(directions)
+        t_max = np.broadcast_to(np.asarray(t_max, dtype=float), (n,))
+        occluded = np.zeros(n, dtype=bool)
+        if len(self.prim_indices) == 0:
+            return occluded
+
+        with np.errstate(divide='ignore'):
+            inv = np.where(directions == 0, np.inf, 1.0 / directions)
+
+        for chunk in range(0, n, BATCH_SIZE):
+            ray_ids = np.arange(chunk, min(chunk + BATCH_SIZE, n))
+            nodes = np.zeros(len(ray_ids), dtype=int)
+            while len(ray_ids):
+                if counts is not None:
+                    _count(counts[:, 1], ray_ids, chunk)
+                keep = _slab_batch(origins[ray_ids], inv[ray_ids], self.node_lo[nodes], self.node_hi[nodes], t_max[ray_ids])
+                ray_ids, nodes = ray_ids[keep], nodes[keep]
+
+                leaf = self.node_count[nodes] > 0
+                if leaf.any():
+                    pair_rays, prims = self._leaf_pairs(ray_ids[leaf], nodes[leaf])
+                    if counts is not None:
+                        _count(counts[:, 0], pair_rays, chunk)
+                    blocked = intersect_pairs(prims, pair_rays) < t_max[pair_rays]
+                    occluded[pair_rays[blocked]] = True
+
+                inner = ~leaf & ~occluded[ray_ids]
+                ray_ids = np.concatenate([ray_ids[inner], ray_ids[inner]])
+                nodes = np.concatenate([nodes[inner] + 1, self.node_right[nodes[inner]]])
+
+        return occluded
+
+    def _leaf_pairs(self, ray_ids, nodes):
+        # Expand (ray, leaf) pairs into (ray, prim) pairs
+        counts = self.node_count[nodes]
+        pair_rays = np.repeat(ray_ids, counts)
+        offsets = np.arange(len(pair_rays)) - np.repeat(np.cumsum(counts) - counts, counts)
+        prims = self.prim_indices[np.repeat(self.node_start[nodes], counts) + offsets]
+        return pair_rays, prims
+
+def _count(column, ray_ids, chunk):
+    # column[ray] += occurrences of ray in ray_ids, all of which lie in [chunk, chunk + BATCH_SIZE)
+    hits = np.bincount(ray_ids - chunk)
+    column[chunk:chunk + len(hits)] += hits
+
+def _counted_slab(counts):
+    def slab(*args):
+        counts[1] += 1
+        return _slab(*args)
+    return slab
+
+def _counted_intersect(intersect, counts):
+    def counted(prim):
+        counts[0] += 1
+        return intersect(prim)
+    return counted
+
+def _slab(ox, oy, oz, inv, lo, hi, t_max):
+    # Ray/box overlap within [0, t_max). A NaN from 0 * inf (ray parallel to and on a slab
+    # plane) fails every comparison below and so leaves the interval untouched.
+    tmin, tmax = -float('inf'), float('inf')
+    for o, i, l, h in ((ox, inv[0], lo[0], hi[0]), (oy, inv[1], lo[1], hi[1]), (oz, inv[2], lo[2], hi[2])):
+        t0 = (l - o) * i
+        t1 = (h - o) * i
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > tmin:
+            tmin = t0
+        if t1 < tmax:
+            tmax = t1
+    return tmax >= tmin and tmax >= 0 and tmin < t_max
+
+def _slab_batch(origins, inv, lo, hi, t_max):
+    with np.errstate(invalid='ignore'):
+        t0 = (lo - origins) * inv
+        t1 = (hi - origins) * inv
+    # Same NaN convention as _slab: a parallel ray lying on the slab plane stays inside
+    t0[np.isnan(t0)] = -np.inf
+    t1[np.isnan(t1)] = np.inf
+    tmin = np.minimum(t0, t1).max(axis=-1)
+    tmax = np.maximum(t0, t1).min(axis=-1)
+    return (tmax >= tmin) & (tmax >= 0) & (tmin < t_max)
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Edge-avoiding a-trous wavelet denoiser for low-sample renders (Dammertz et al. 2010).
+#   image = render_batched(scene, lights, camera_pos, width, height, samples=4)
+#   clean = denoise(image, **render_features(scene, camera_pos, width, height, samples=4))
+#
+# Pass i blurs with a 5x5 B3-spline kernel whose taps lie 2**i pixels apart, so n
+# passes of 25 taps each cover 4 * (2**n - 1) + 1 pixels across. A tap's weight drops
+# with how much its color, normal, albedo and depth differ from the center pixel's. The guide
+# buffers are noise-free, so the blur stops at geometric and material edges, while the
+# color term, tightened every pass, keeps shadow and highlight edges. Whole-image
+# float32 array ops per tap; no Python loop over pixels.
+#
+# This tracer has no stochastic effects, so low-sample error is edge aliasing (plus
+# jitter noise from ProgressiveRenderer) rather than noise spread over the image, and
+# one pass works best; more passes are for noisier inputs.
+
+KERNEL = np.array([1, 4, 6, 4, 1], dtype=np.float32) / 16
+ITERATIONS = 1
+SIGMA_COLOR = 0.3    # halved every pass
+SIGMA_NORMAL = 0.3
+SIGMA_ALBEDO = 0.1
+SIGMA_DEPTH = 0.02   # relative depth difference per pixel of tap distance
+
+def _padded(image, pad):
+    widths = ((pad, pad), (pad, pad)) + ((0, 0),) * (image.ndim - 2)
+    return np.pad(image, widths, mode='edge')
+
+def _squared_distance(a, b):
+    diff = a - b
+    return np.einsum('ijk,ijk->ij', diff, diff)
+
+def denoise(color, normal, albedo, depth, iterations=ITERATIONS, sigma_color=SIGMA_COLOR,
+            sigma_normal=SIGMA_NORMAL, sigma_albedo=SIGMA_ALBEDO, sigma_depth=SIGMA_DEPTH):
+    # color/normal/albedo (height, width, 3), depth (height, width) with 0 where rays
+    # missed; returns the filtered (height, width, 3) float32 image
+    color = np.asarray(color, dtype=np.float32)
+    normal = np.asarray(normal, dtype=np.float32)
+    albedo = np.asarray(albedo, dtype=np.float32)
+    depth = np.asarray(depth, dtype=np.float32)
+    height, width = depth.shape
+    # Relative depth differences; misses (depth 0) only blend with other misses
+    inv_depth = 1 / np.maximum(depth, 1e-3)
+
+    guides = [(normal, 1 / sigma_normal ** 2), (albedo, 1 / sigma_albedo ** 2)]
+    for i in range(iterations):
+        step = 2 ** i
+        pad = 2 * step
+        depth_scale = inv_depth / (sigma_depth * step)
+        color_scale = 1 / (sigma_color * 0.5 ** i) ** 2
+        padded = [_padded(a, pad) for a in (color, normal, albedo, depth)]
+
+        total = np.zeros_like(color)
+        weight_sum = np.zeros((height, width), dtype=np.float32)
+        for ky in range(5):
+            for kx in range(5):
+                y0, x0 = pad + (ky - 2) * step, pad + (kx - 2) * step
+                tap_color, tap_normal, tap_albedo, tap_depth = (a[y0:y0 + height, x0:x0 + width] for a in padded)
+                exponent = _squared_distance(tap_color, color) * color_scale
+                exponent += np.abs(tap_depth - depth) * depth_scale
+                for (guide, scale), tap in zip(guides, (tap_normal, tap_albedo)):
+                    exponent += _squared_distance(tap, guide) * scale
+                weight = KERNEL[ky] * KERNEL[kx] * np.exp(-exponent)
+                total += tap_color * weight[..., None]
+                weight_sum += weight
+        # The center tap always has weight, so weight_sum > 0
+        color = total / weight_sum[..., None]
+    return color
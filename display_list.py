@@ -0,0 +1,158 @@
+import numpy as np
+
+# Retained-mode display list for static line art.
+#   shapes = DisplayList(SurfaceTarget(pygame.Surface((WIDTH, HEIGHT))))
+#   circle = shapes.add(midpoint_circle, 300, 300, 200)   # any rasterizer(target, *args)
+#   shapes.present(screen)                                # blits and updates only dirty rects
+#   shapes.update(circle, 320, 300, 200)                  # moved: re-rasterizes this one only
+#
+# Every shape is rasterized once into a recorder that keeps its pixel batches and
+# bounding box. The picture lives in a cached layer (any render target); adding,
+# moving or removing a shape marks its old and new boxes dirty, and redraw() clears
+# just those boxes and replays the recorded pixels of the shapes overlapping them,
+# in the order they were added. present() then copies the dirty boxes of the layer
+# to the window with one blit each and passes the same rectangles to
+# pygame.display.update. With nothing dirty it does nothing at all.
+
+MAX_DIRTY = 16  # more dirty rectangles than this are merged into their bounding box
+
+class _Recorder:
+    # Render target that keeps one shape's drawing calls for replay
+    def __init__(self):
+        self.ops = []  # ('pixels', xs, ys, color), ('rect', x0, y0, x1, y1, color) or
+                       # ('spans', ys, x0s, x1s, color), all inclusive
+
+    def set_pixels(self, xs, ys, color):
+        xs = np.asarray(xs).ravel().astype(np.intp, copy=False)
+        ys = np.asarray(ys).ravel().astype(np.intp, copy=False)
+        if len(xs):
+            self.ops.append(('pixels', xs, ys, np.asarray(color)))
+
+    def set_at(self, pos, color):
+        self.set_pixels([pos[0]], [pos[1]], color)
+
+    def fill_rect(self, x0, y0, x1, y1, color):
+        if x1 >= x0 and y1 >= y0:
+            self.ops.append(('rect', x0, y0, x1, y1, np.asarray(color)))
+
+    def fill_spans(self, ys, x0s, x1s, color):
+        ys, x0s, x1s = (np.asarray(a).ravel().astype(np.intp, copy=False) for a in (ys, x0s, x1s))
+        keep = x1s >= x0s
+        if keep.any():
+            self.ops.append(('spans', ys[keep], x0s[keep], x1s[keep], np.asarray(color)))
+
+    def bounds(self):
+        # Half-open (x0, y0, x1, y1) around everything drawn, or None
+        boxes = []
+        for op, *rest in self.ops:
+            if op == 'pixels':
+                xs, ys, _ = rest
+                boxes.append((xs.min(), ys.min(), xs.max(), ys.max()))
+            elif op == 'spans':
+                ys, x0s, x1s, _ = rest
+                boxes.append((x0s.min(), ys.min(), x1s.max(), ys.max()))
+            else:
+                boxes.append(tuple(rest[:4]))
+        if not boxes:
+            return None
+        x0, y0, x1, y1 = np.array(boxes).T
+        return int(x0.min()), int(y0.min()), int(x1.max()) + 1, int(y1.max()) + 1
+
+    def replay(self, target, rect):
+        # Draw the recorded calls into target, limited to the half-open rect
+        x0, y0, x1, y1 = rect
+        for op, *rest in self.ops:
+            if op == 'pixels':
+                xs, ys, color = rest
+                inside = (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+                if inside.any():
+                    target.set_pixels(xs[inside], ys[inside], color[inside] if color.ndim == 2 else color)
+            elif op == 'spans':
+                ys, x0s, x1s, color = rest
+                a, c = np.maximum(x0s, x0), np.minimum(x1s, x1 - 1)
+                inside = (ys >= y0) & (ys < y1) & (c >= a)
+                if inside.any():
+                    target.fill_spans(ys[inside], a[inside], c[inside], color)
+            else:
+                a, b, c, d, color = rest
+                a, b, c, d = max(a, x0), max(b, y0), min(c, x1 - 1), min(d, y1 - 1)
+                if c >= a and d >= b:
+                    target.fill_rect(a, b, c, d, color)
+
+class _Shape:
+    def __init__(self, draw, args):
+        self.draw, self.args = draw, args
+        self.recording = _Recorder()
+        draw(self.recording, *args)
+        self.bounds = self.recording.bounds()
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def _contains(a, b):
+    return a[0] <= b[0] and a[1] <= b[1] and b[2] <= a[2] and b[3] <= a[3]
+
+class DisplayList:
+    def __init__(self, layer, background=(0, 0, 0)):
+        self.layer = layer            # render target caching the composed picture
+        self.background = background
+        self.shapes = {}              # handle -> _Shape, in drawing order
+        self.next_handle = 0
+        self.dirty = [(0, 0, layer.width, layer.height)]
+        self.rasterized = 0           # rasterizer calls so far, for checking what gets redone
+
+    def _shape(self, draw, args):
+        self.rasterized += 1
+        return _Shape(draw, args)
+
+    def _touch(self, bounds):
+        if bounds is not None:
+            self.dirty.append(bounds)
+
+    def add(self, draw, *args):
+        # Register draw(target, *args); returns a handle for update() and remove()
+        handle = self.next_handle
+        self.next_handle += 1
+        self.shapes[handle] = shape = self._shape(draw, args)
+        self._touch(shape.bounds)
+        return handle
+
+    def update(self, handle, *args):
+        # New arguments for a shape, e.g. moved; keeps its place in the drawing order
+        old = self.shapes[handle]
+        self.shapes[handle] = new = self._shape(old.draw, args)
+        self._touch(old.bounds)
+        self._touch(new.bounds)
+
+    def remove(self, handle):
+        self._touch(self.shapes.pop(handle).bounds)
+
+    def redraw(self):
+        # Recompose the dirty parts of the layer; returns them as half-open rects
+        width, height = self.layer.width, self.layer.height
+        rects = [(max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)) for x0, y0, x1, y1 in self.dirty]
+        rects = list(dict.fromkeys(rect for rect in rects if rect[0] < rect[2] and rect[1] < rect[3]))
+        rects = [rect for rect in rects if not any(other != rect and _contains(other, rect) for other in rects)]
+        if len(rects) > MAX_DIRTY:
+            x0, y0, x1, y1 = np.array(rects).T
+            rects = [(int(x0.min()), int(y0.min()), int(x1.max()), int(y1.max()))]
+        self.dirty = []
+
+        for rect in rects:
+            x0, y0, x1, y1 = rect
+            self.layer.fill_rect(x0, y0, x1 - 1, y1 - 1, self.background)
+            for shape in self.shapes.values():
+                if shape.bounds is not None and _overlaps(shape.bounds, rect):
+                    shape.recording.replay(self.layer, rect)
+        return rects
+
+    def present(self, surface):
+        # Blit the dirty parts of a SurfaceTarget layer onto surface (the window) and
+        # update just those rectangles; returns how many there were
+        import pygame
+        rects = [pygame.Rect(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in self.redraw()]
+        for rect in rects:
+            surface.blit(self.layer.surface, rect, rect)
+        if rects:
+            pygame.display.update(rects)
+        return len(rects)
@@ -0,0 +1,50 @@
+import argparse
+import importlib
+import midpoint
+from render_target import ArrayTarget
+
+# Headless runs of the 2D rasterizer demos: the drawing goes into a NumPy array
+# (render_target.ArrayTarget) instead of a window and is saved as PNG, so no display
+# is needed.
+#   python draw_cli.py smile -o smile.png
+#   python draw_cli.py circle 400 300 100 -o circle.png
+#   python draw_cli.py lines 10 20 200 120 --width 1024 --height 768
+
+# name -> (demo module, integer parameters of its draw(target, ...))
+DRAWINGS = {
+    'smile': ('smile_pygame', []),
+    'house': ('house', []),
+    'football': ('pygame_football', []),
+    'circle': ('circle_pygame', ['xc', 'yc', 'r']),
+    'ellipse': ('ellipse', ['xc', 'yc', 'rx', 'ry']),
+    'lines': ('2d_pygame', ['x1', 'y1', 'x2', 'y2']),           # line plus transformed copies
+    'transforms': ('2d_trial', ['x1', 'y1', 'x2', 'y2']),
+    'dda': ('import_pygame', ['x1', 'y1', 'x2', 'y2']),
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render a 2D rasterizer demo to PNG without a display.")
+    drawings = parser.add_subparsers(dest='drawing', required=True)
+    for name, (module, params) in DRAWINGS.items():
+        sub = drawings.add_parser(name, help=f"draw() from {module}.py")
+        for param in params:
+            sub.add_argument(param, type=int)
+        sub.add_argument('--width', type=int, help="default: the demo window's width")
+        sub.add_argument('--height', type=int, help="default: the demo window's height")
+        sub.add_argument('-o', '--output', default=f'{name}.png')
+        sub.add_argument('--cache-stats', action='store_true', help="print the circle/ellipse offsets cache's hit/miss counts")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    module_name, params = DRAWINGS[args.drawing]
+    module = importlib.import_module(module_name)
+    target = ArrayTarget(args.width or module.WIDTH, args.height or module.HEIGHT, module.BLACK)
+    module.draw(target, *(getattr(args, param) for param in params))
+    target.save(args.output)
+    print(f"Saved {args.output} ({target.width}x{target.height})")
+    if args.cache_stats:
+        print(midpoint.offsets.report())
+
+if __name__ == "__main__":
+    main()
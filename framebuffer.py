@@ -0,0 +1,59 @@
+import numpy as np
+from image_io import to_uint8
+
+# Framebuffer for the pygame window: a float32 (height, width, 3) color buffer that
+# renders write or accumulate samples into, and a uint8 copy of it for display. Writes
+# mark their rectangle dirty; present() copies only the dirty rectangles into the
+# window surface through pygame.surfarray.pixels3d, a view of the surface's own
+# pixels, so nothing is converted or reallocated per frame.
+#
+#   fb = Framebuffer(width, height)
+#   fb.update(x0, y0, tile)      # (h, w, 3) floats in [0, 1]
+#   fb.present(screen)           # copies the changed tiles and updates the display
+#
+# Works without pygame for everything but present().
+
+class Framebuffer:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.color = np.zeros((height, width, 3), dtype=np.float32)
+        self.weight = np.zeros((height, width), dtype=np.float32)  # samples summed by accumulate()
+        self.display = np.zeros((height, width, 3), dtype=np.uint8)
+        self.dirty = []  # (x0, y0, x1, y1) rectangles not yet presented
+
+    def update(self, x0, y0, pixels):
+        # Replace a block, e.g. a finished tile or scanline
+        h, w = pixels.shape[:2]
+        self.color[y0:y0 + h, x0:x0 + w] = pixels
+        self.weight[y0:y0 + h, x0:x0 + w] = 1
+        self.display[y0:y0 + h, x0:x0 + w] = to_uint8(pixels)
+        self.dirty.append((x0, y0, x0 + w, y0 + h))
+
+    def accumulate(self, x0, y0, pixels):
+        # Add one more sample per pixel of a block; the display shows the running mean
+        h, w = pixels.shape[:2]
+        color, weight = self.color[y0:y0 + h, x0:x0 + w], self.weight[y0:y0 + h, x0:x0 + w]
+        color += pixels
+        weight += 1
+        self.display[y0:y0 + h, x0:x0 + w] = to_uint8(color / weight[..., None])
+        self.dirty.append((x0, y0, x0 + w, y0 + h))
+
+    def image(self):
+        # (height, width, 3) float image: the mean of the accumulated samples
+        return self.color / np.maximum(self.weight, 1)[..., None]
+
+    def present(self, surface):
+        # Copy the dirty rectangles into the surface in place and update just those
+        # parts of the display; returns the number of rectangles
+        import pygame
+        if not self.dirty:
+            return 0
+        pixels = pygame.surfarray.pixels3d(surface)  # (width, height, 3) view, locks the surface
+        rects = []
+        for x0, y0, x1, y1 in self.dirty:
+            pixels[x0:x1, y0:y1] = self.display[y0:y1, x0:x1].transpose(1, 0, 2)
+            rects.append(pygame.Rect(x0, y0, x1 - x0, y1 - y0))
+        del pixels
+        pygame.display.update(rects)
+        self.dirty = []
+        return len(rects)
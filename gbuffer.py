@@ -0,0 +1,163 @@
+import numpy as np
+from raytracer import (MAX_DEPTH, compile_scene, dot_rows, light_directions, light_visibility,
+                       normalize_rows, primary_ray_directions, shade_hits)
+
+# G-buffer cache for incremental re-renders.
+#
+# One render records, per pixel and bounce, the ray, the primitive it hit, the hit
+# point and normal, and whether each light is visible from that point. Since every
+# hit spawns its mirror ray while recording (whatever the material's reflection),
+# the recorded paths depend on geometry only:
+#   - material edits (colors, coefficients, reflection) and light colors re-shade
+#     the recorded hits in one vectorized pass, no rays traced;
+#   - moving a light re-traces only that light's shadow rays;
+#   - moving or resizing primitives re-traces only the paths from the first bounce
+#     they can affect, plus shadow rays they may newly block or unblock.
+#
+#   cache = GBuffer(scene, lights, camera_pos, width, height)
+#   scene.material_params['reflection'][2] = 0.5; scene.materials_changed()
+#   image = cache.render()
+#
+# Adding or removing primitives renumbers them, so that needs a new GBuffer.
+
+class GBuffer:
+    def __init__(self, objects, lights, camera_pos, width, height, max_depth=MAX_DEPTH):
+        self.scene = compile_scene(objects)
+        self.light_positions = np.array([pos for pos, _ in lights], dtype=float).reshape(-1, 3)
+        self.light_colors = [color for _, color in lights]
+        self.camera_pos = np.asarray(camera_pos, dtype=float)
+        self.width, self.height = width, height
+
+        # Dense (pixel, bounce) records; prim is -1 where the ray missed or doesn't exist
+        num_pixels, depths = width * height, max_depth + 1
+        self.has_ray = np.zeros((num_pixels, depths), dtype=bool)
+        self.origins = np.zeros((num_pixels, depths, 3))
+        self.directions = np.zeros((num_pixels, depths, 3))
+        self.prim = np.full((num_pixels, depths), -1)
+        self.dist = np.full((num_pixels, depths), np.inf)
+        self.points = np.zeros((num_pixels, depths, 3))
+        self.normals = np.zeros((num_pixels, depths, 3))
+        self.lit = np.zeros((len(self.light_positions), num_pixels, depths), dtype=bool)
+
+        pixels = np.arange(num_pixels)
+        self.has_ray[:, 0] = True
+        self.origins[:, 0] = self.camera_pos
+        self.directions[:, 0] = primary_ray_directions(width, height)
+        self._trace(pixels, np.zeros(num_pixels, dtype=int))
+
+    def lights(self):
+        return list(zip(self.light_positions, self.light_colors))
+
+    def _trace(self, pixels, start):
+        # Re-record the paths of `pixels` from bounce start[i] on, using the ray already
+        # stored at that bounce
+        depths = self.prim.shape[1]
+        for depth in range(depths):
+            starting = pixels[start == depth]
+            ids = starting if depth == 0 else np.concatenate([ids, starting])
+            self.has_ray[ids, depth:] = False
+            self.prim[ids, depth:] = -1
+            self.dist[ids, depth:] = np.inf
+            self.has_ray[ids, depth] = True
+            if len(ids) == 0:
+                continue
+
+            origins, directions = self.origins[ids, depth], self.directions[ids, depth]
+            prim, dist = self.scene.closest_hit_batch(origins, directions)
+            hit = prim >= 0
+            ids, prim, dist = ids[hit], prim[hit], dist[hit]
+            origins, directions = origins[hit], directions[hit]
+
+            hit_points = origins + directions * dist[:, None]
+            normals = self.scene.normals_batch(prim, hit_points, directions)
+            hit_points = hit_points + normals * 1e-4
+            self.prim[ids, depth], self.dist[ids, depth] = prim, dist
+            self.points[ids, depth], self.normals[ids, depth] = hit_points, normals
+            if len(self.light_positions):
+                to_light, dist_to_light = light_directions(hit_points, self.light_positions)
+                self.lit[:, ids, depth] = light_visibility(self.scene, hit_points, to_light, dist_to_light)
+
+            # Every hit spawns its mirror ray so reflection edits never need new rays
+            if depth + 1 < depths:
+                self.origins[ids, depth + 1] = hit_points
+                self.directions[ids, depth + 1] = normalize_rows(directions - 2 * dot_rows(directions, normals)[:, None] * normals)
+
+    # --- Edits ---
+
+    def set_lights(self, lights):
+        # New light list; only lights whose position changed (or that are new) get their
+        # shadow rays traced again, color changes are free
+        positions = np.array([pos for pos, _ in lights], dtype=float).reshape(-1, 3)
+        lit = np.zeros((len(positions),) + self.prim.shape, dtype=bool)
+        keep = min(len(positions), len(self.light_positions))
+        lit[:keep] = self.lit[:keep]
+        moved = [i for i in range(len(positions))
+                 if i >= keep or not np.array_equal(positions[i], self.light_positions[i])]
+
+        self.light_positions, self.light_colors, self.lit = positions, [color for _, color in lights], lit
+        if moved:
+            hits = np.nonzero(self.prim >= 0)
+            to_light, dist_to_light = light_directions(self.points[hits], positions[moved])
+            visible = light_visibility(self.scene, self.points[hits], to_light, dist_to_light)
+            for i, lit_i in zip(moved, visible):
+                self.lit[i][hits] = lit_i
+        return len(moved)
+
+    def geometry_changed(self, prims):
+        # Call after moving or resizing the primitives `prims` in the scene arrays.
+        # Returns the number of paths re-traced. The prims keep their numbers, so the
+        # BVHs are refitted rather than rebuilt.
+        self.scene.geometry_changed(refit=True)
+
+        # A path changes from the first bounce that hit a changed primitive or now hits one sooner
+        affected = np.isin(self.prim, prims)
+        for prim in prims:
+            rays = np.nonzero(self.has_ray & ~affected)
+            dist = self.scene.prim_distances(prim, self.origins[rays], self.directions[rays])
+            closer = dist < self.dist[rays]
+            affected[rays[0][closer], rays[1][closer]] = True
+        pixels = np.flatnonzero(affected.any(axis=1))
+        start = affected[pixels].argmax(axis=1)
+
+        # Shadow rays of the hits that stay: a changed primitive may now block a lit one,
+        # and any blocked one may have been blocked by it
+        keep = self.prim >= 0
+        keep[pixels] = keep[pixels] & (np.arange(keep.shape[1]) < start[:, None])
+        hits = np.nonzero(keep)
+        if len(self.light_positions) and len(hits[0]):
+            points = self.points[hits]
+            to_light, dist_to_light = light_directions(points, self.light_positions)
+            lit = self.lit[:, hits[0], hits[1]]
+            for i in range(len(self.light_positions)):
+                for prim in prims:
+                    open_ids = np.flatnonzero(lit[i])
+                    lit[i, open_ids] = self.scene.prim_distances(prim, points[open_ids], to_light[i, open_ids]) >= dist_to_light[i, open_ids]
+                blocked = np.flatnonzero(~lit[i])
+                lit[i, blocked] = light_visibility(self.scene, points[blocked], to_light[i:i + 1, blocked], dist_to_light[i:i + 1, blocked])[0]
+            self.lit[:, hits[0], hits[1]] = lit
+
+        self._trace(pixels, start)
+        return len(pixels)
+
+    # --- Shading ---
+
+    def render(self):
+        # (height, width, 3) image from the cached hits with the scene's current materials
+        # and the current light colors; no rays are traced
+        scene = self.scene
+        reflection = scene.material_params['reflection'][scene.prim_materials]
+        lights = self.lights()
+        num_pixels, depths = self.prim.shape
+
+        result = np.zeros((num_pixels, 3))
+        for depth in reversed(range(depths)):
+            ids = np.flatnonzero(self.prim[:, depth] >= 0)
+            prim = self.prim[ids, depth]
+            local = shade_hits(self.origins[ids, depth], self.directions[ids, depth], prim,
+                               self.points[ids, depth], self.normals[ids, depth], scene, lights,
+                               self.lit[:, ids, depth])
+            r = reflection[prim]
+            color = np.where((r > 0)[:, None], local * (1 - r[:, None]) + result[ids] * r[:, None], local)
+            result = np.zeros((num_pixels, 3))
+            result[ids] = np.clip(color, 0, 1)
+        return result.reshape(self.height, self.width, 3)
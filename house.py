@@ -1,15 +1,15 @@
 import pygame
 import sys
-pygame.init()
+from display_list import DisplayList
+from render_target import SurfaceTarget
 WIDTH,HEIGHT= 800,600
-screen=pygame.display.set_mode((WIDTH,HEIGHT))
-pygame.display.set_caption("DDA algorithm")
 WHITE=(255,255,255)
 BLACK=(0,0,0)
 
 
 
-def dda_line_draw(x1,y1,x2,y2):
+def dda_line_draw(target,x1,y1,x2,y2):
+    # Pixels are collected and written to the target as one batch
     dx=x2-x1
     dy=y2-y1
     if abs(dx)>abs(dy):
@@ -20,10 +20,34 @@ def dda_line_draw(x1,y1,x2,y2):
     Yinc=dy/step
     x=x1
     y=y1
+    xs=[]
+    ys=[]
     for i in range(step-1):
         x=x+Xinc
         y=y+Yinc
-        screen.set_at((round(x),round(y)),WHITE)
+        xs.append(round(x))
+        ys.append(round(y))
+    target.set_pixels(xs,ys,WHITE)
+
+
+# (rasterizer, args...) for every part of the picture
+SHAPES=[
+    (dda_line_draw,100,50,150,100),
+    (dda_line_draw,100,50,50,100),
+    (dda_line_draw,50,100,150,100),
+
+    (dda_line_draw,50,100,50,200),
+    (dda_line_draw,150,100,150,200),
+    (dda_line_draw,50,200,150,200),
+
+    (dda_line_draw,75,150,75,200),
+    (dda_line_draw,125,150,125,200),
+    (dda_line_draw,75,150,125,150),
+]
+
+def draw(target):
+    for draw_shape,*args in SHAPES:
+        draw_shape(target,*args)
 
 
 def main():
@@ -31,26 +55,22 @@ def main():
     # y1=int(input("Enter y1:"))
     # x2=int(input("Enter x2:"))
     # y2=int(input("Enter y2:"))
+    pygame.init()
+    screen=pygame.display.set_mode((WIDTH,HEIGHT))
+    pygame.display.set_caption("DDA algorithm")
+    # Rasterized once into a cached layer; the loop sleeps on events and only
+    # re-composites what changed (nothing, for this static picture)
+    shapes=DisplayList(SurfaceTarget(pygame.Surface((WIDTH,HEIGHT))),BLACK)
+    for shape in SHAPES:
+        shapes.add(*shape)
     while True:
-        for event in pygame.event.get():
-            if event.type==pygame.QUIT: 
-                pygame.quit()
-                sys.exit()
-        screen.fill(BLACK)
-        
-        dda_line_draw(100,50,150,100)
-        dda_line_draw(100,50,50,100)
-        dda_line_draw(50,100,150,100)
-
-        dda_line_draw(50,100,50,200)
-        dda_line_draw(150,100,150,200)
-        dda_line_draw(50,200,150,200)
-        
-        dda_line_draw(75,150,75,200)
-        dda_line_draw(125,150,125,200)        
-        dda_line_draw(75,150,125,150)        
-
-        pygame.display.flip()
+        shapes.present(screen)
+        event=pygame.event.wait()
+        if event.type==pygame.QUIT: 
+            pygame.quit()
+            sys.exit()
+        elif event.type in (pygame.VIDEOEXPOSE,pygame.WINDOWEXPOSED):
+            pygame.display.flip()
         
 if __name__=="__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import struct
+import zlib
+import numpy as np
+
+# Dependency-free image writers for headless renders.
+# Images are (height, width, 3) arrays, row 0 at the top.
+
+def to_uint8(image):
+    # Float [0, 1] -> 8-bit, rounded
+    return (np.clip(image, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+def png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+def png_header(width, height):
+    # Signature plus IHDR for 8-bit RGB, no interlacing
+    return b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+def _png_rows(pixels):
+    # Scanlines with the filter type 0 (None) byte in front of each
+    pixels = pixels if pixels.dtype == np.uint8 else to_uint8(pixels)
+    height = pixels.shape[0]
+    return np.concatenate([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, -1)], axis=1).tobytes()
+
+def write_png(path, image):
+    height, width, _ = image.shape
+    with open(path, 'wb') as f:
+        f.write(png_header(width, height))
+        f.write(png_chunk(b'IDAT', zlib.compress(_png_rows(image), 6)))
+        f.write(png_chunk(b'IEND', b''))
+
+def write_pfm(path, image):
+    # Portable float map: little-endian float32, scanlines stored bottom to top
+    height, width, _ = image.shape
+    with open(path, 'wb') as f:
+        f.write(f'PF\n{width} {height}\n-1.0\n'.encode('ascii'))
+        f.write(np.ascontiguousarray(image[::-1], dtype='<f4').tobytes())
+
+# Black -> purple -> orange -> yellow -> white, for heatmaps
+HEAT_STOPS = np.array([[0, 0, 0], [0.35, 0.05, 0.55], [0.9, 0.3, 0.1], [1, 0.85, 0.1], [1, 1, 1]])
+
+def heat_colors(values, scale=None):
+    # (h, w) values -> (h, w, 3) false-color image in [0, 1]; scale (default: the
+    # 99th percentile, so a few extreme pixels don't wash out the rest) maps to white
+    values = np.asarray(values, dtype=float)
+    if scale is None:
+        scale = np.percentile(values, 99) if values.size else 1.0
+    t = np.clip(values / (scale or 1.0), 0, 1) * (len(HEAT_STOPS) - 1)
+    positions = np.arange(len(HEAT_STOPS))
+    return np.stack([np.interp(t, positions, HEAT_STOPS[:, c]) for c in range(3)], axis=-1)
+
+# --- Streaming writers ---
+# For images too large to hold in memory: rows arrive band by band through
+# write_rows(), and state() after a band is enough for a new writer, given it as
+# state=, to reopen the partly written file and continue after the last band.
+
+class PNGStreamWriter:
+    # 8-bit RGB PNG. Every band becomes its own IDAT chunk of raw deflate data ending
+    # on a full flush, so no compressor state carries over between bands; the zlib
+    # header and Adler-32 trailer around the deflate stream are written by hand, with
+    # the running checksum kept in the resume state.
+    def __init__(self, path, width, height, state=None):
+        self.width, self.height = width, height
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        if state is None:
+            self.file = open(path, 'wb')
+            self.file.write(png_header(width, height))
+            self.file.write(png_chunk(b'IDAT', b'\x78\x9c'))  # zlib header: deflate, 32K window, level 6
+            self.rows, self.adler = 0, 1
+        else:
+            self.file = open(path, 'r+b')
+            self.file.seek(state['offset'])
+            self.file.truncate()
+            self.rows, self.adler = state['rows'], state['adler']
+
+    def write_rows(self, pixels):
+        raw = _png_rows(pixels)
+        self.adler = zlib.adler32(raw, self.adler)
+        self.file.write(png_chunk(b'IDAT', self.compressor.compress(raw) + self.compressor.flush(zlib.Z_FULL_FLUSH)))
+        self.file.flush()
+        self.rows += len(pixels)
+
+    def state(self):
+        return {'rows': self.rows, 'offset': self.file.tell(), 'adler': self.adler}
+
+    def close(self):
+        # Finishes the PNG once all rows are in; otherwise leaves it resumable
+        if self.rows == self.height:
+            tail = self.compressor.flush(zlib.Z_FINISH) + struct.pack('>I', self.adler & 0xffffffff)
+            self.file.write(png_chunk(b'IDAT', tail))
+            self.file.write(png_chunk(b'IEND', b''))
+        self.file.close()
+
+class PPMStreamWriter:
+    # Binary PPM (P6) through a memory-mapped file allocated at full size up front;
+    # bands are copied into the map and flushed, so only touched pages are resident
+    def __init__(self, path, width, height, state=None):
+        self.width, self.height = width, height
+        header = f'P6\n{width} {height}\n255\n'.encode('ascii')
+        if state is None:
+            with open(path, 'wb') as f:
+                f.write(header)
+                f.truncate(len(header) + width * height * 3)
+        self.pixels = np.memmap(path, dtype=np.uint8, mode='r+', offset=len(header), shape=(height, width, 3))
+        self.rows = state['rows'] if state is not None else 0
+
+    def write_rows(self, pixels):
+        self.pixels[self.rows:self.rows + len(pixels)] = pixels if pixels.dtype == np.uint8 else to_uint8(pixels)
+        self.pixels.flush()
+        self.rows += len(pixels)
+
+    def state(self):
+        return {'rows': self.rows}
+
+    def close(self):
+        self.pixels.flush()
+        del self.pixels
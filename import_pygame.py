@@ -1,15 +1,14 @@
 import pygame
 import sys
-pygame.init()
+from render_target import SurfaceTarget
 WIDTH,HEIGHT= 800,600
-screen=pygame.display.set_mode((WIDTH,HEIGHT))
-pygame.display.set_caption("DDA algorithm")
 WHITE=(255,255,255)
 BLACK=(0,0,0)
 
 
 
-def dda_line_draw(x1,y1,x2,y2):
+def dda_line_draw(target,x1,y1,x2,y2):
+    # Pixels are collected and written to the target as one batch
     dx=x2-x1
     dy=y2-y1
     if dx>dy:
@@ -20,10 +19,18 @@ def dda_line_draw(x1,y1,x2,y2):
     Yinc=dy/step
     x=x1
     y=y1
+    xs=[]
+    ys=[]
     for i in range(step-1):
         x=x+Xinc
         y=y+Yinc
-        screen.set_at((round(x),round(y)),WHITE)
+        xs.append(round(x))
+        ys.append(round(y))
+    target.set_pixels(xs,ys,WHITE)
+
+
+def draw(target,x1,y1,x2,y2):
+    dda_line_draw(target,x1,y1,x2,y2)
 
 
 def main():
@@ -31,14 +38,18 @@ def main():
     y1=int(input("Enter y1:"))
     x2=int(input("Enter x2:"))
     y2=int(input("Enter y2:"))
+    pygame.init()
+    screen=pygame.display.set_mode((WIDTH,HEIGHT))
+    pygame.display.set_caption("DDA algorithm")
+    target=SurfaceTarget(screen)
     while True:
         for event in pygame.event.get():
             if event.type==pygame.QUIT: 
                 pygame.quit()
                 sys.exit()
-        screen.fill(BLACK)
+        target.fill(BLACK)
         
-        dda_line_draw(x1,y1,x2,y2)
+        draw(target,x1,y1,x2,y2)
         pygame.display.flip()
         
 if __name__=="__main__":
@@ -0,0 +1,366 @@
+import numpy as np
+from numba import njit, prange
+
+# Compiled backend for the batched tracer (needs Numba; raytracer.py falls back to
+# NumPy without it). Each ray runs the whole branchy per-ray logic of trace_ray -
+# BVH traversal, the per-light shadow loop and the reflection chain - in nopython
+# code, one ray per prange iteration. Kernels are compiled with cache=True, so only
+# the first run on a machine pays the JIT warm-up; later runs load them from
+# __pycache__.
+#
+# The arithmetic follows the NumPy functions in raytracer.py operation by operation,
+# so both backends render the same image up to float rounding.
+
+def _rays(a):
+    # C-contiguous, writable float64 so every call reuses one compiled signature
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    return a if a.flags.writeable else a.copy()
+
+def _ints(a):
+    return np.ascontiguousarray(a, dtype=np.int64)
+
+def pack(scene):
+    # Flat arrays for the kernels. The sphere BVH (if the scene uses one) and the mesh
+    # BVHs are concatenated into one node forest; mesh prim indices become global
+    # triangle numbers.
+    forest = []
+    sphere_root = -1
+    if scene.uses_bvh() and scene.num_spheres:
+        sphere_root = 0
+        forest.append((scene.build_bvh(), 0))
+    mesh_roots = []
+    for i, offset in enumerate(scene.mesh_face_offsets[:-1]):
+        if scene.mesh_face_offsets[i + 1] > offset:
+            mesh_roots.append(sum(bvh.num_nodes for bvh, _ in forest))
+            forest.append((scene.build_mesh_bvh(i), offset))
+
+    node_lo, node_hi, node_right, node_start, node_count, prim_indices = ([] for _ in range(6))
+    nodes = prims = 0
+    for bvh, prim_offset in forest:
+        node_lo.append(bvh.node_lo)
+        node_hi.append(bvh.node_hi)
+        node_right.append(np.where(bvh.node_right >= 0, bvh.node_right + nodes, -1))
+        node_start.append(bvh.node_start + prims)
+        node_count.append(bvh.node_count)
+        prim_indices.append(bvh.prim_indices + prim_offset)
+        nodes, prims = nodes + bvh.num_nodes, prims + len(bvh.prim_indices)
+    if forest:
+        node_lo, node_hi = np.concatenate(node_lo), np.concatenate(node_hi)
+        node_right, node_start, node_count, prim_indices = (
+            np.concatenate(a) for a in (node_right, node_start, node_count, prim_indices))
+    else:
+        node_lo, node_hi = np.zeros((0, 3)), np.zeros((0, 3))
+        node_right = node_start = node_count = prim_indices = np.zeros(0, dtype=int)
+
+    # Traversal stack depth: the deepest tree of the forest
+    depth, frontier = 0, np.array([sphere_root] * (sphere_root >= 0) + mesh_roots, dtype=int)
+    while len(frontier):
+        depth += 1
+        inner = frontier[node_count[frontier] == 0]
+        frontier = np.concatenate([inner + 1, node_right[inner]])
+
+    # material_params is keyed in MATERIAL_PARAMS order: ambient, diffuse, specular, shininess, reflection
+    material_table = np.stack(list(scene.material_params.values()), axis=1)
+    return (
+        _rays(scene.sphere_centers), _rays(scene.sphere_radii),
+        _rays(scene.plane_points), _rays(scene.plane_normals),
+        _rays(scene._tri_data), _rays(scene.tri_normals), scene.num_spheres, scene.mesh_start,
+        _rays(node_lo), _rays(node_hi), _ints(node_right), _ints(node_start), _ints(node_count),
+        _ints(prim_indices), sphere_root, _ints(mesh_roots), depth + 1,
+        _ints(scene.prim_materials), _rays(scene.material_colors), _rays(material_table.reshape(-1, 5)),
+    )
+
+# --- Primitive intersection (one ray, scalar components) ---
+
+@njit(cache=True)
+def _hit_sphere(centers, radii, i, ox, oy, oz, dx, dy, dz):
+    cx, cy, cz = ox - centers[i, 0], oy - centers[i, 1], oz - centers[i, 2]
+    a = dx * dx + dy * dy + dz * dz
+    b = 2.0 * (cx * dx + cy * dy + cz * dz)
+    c = (cx * cx + cy * cy + cz * cz) - radii[i] * radii[i]
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return np.inf
+    sqrt_disc = np.sqrt(discriminant)
+    dist1 = (-b - sqrt_disc) / (2 * a)
+    if dist1 > 0.001:
+        return dist1
+    dist2 = (-b + sqrt_disc) / (2 * a)
+    if dist2 > 0.001:
+        return dist2
+    return np.inf
+
+@njit(cache=True)
+def _hit_plane(points, normals, i, ox, oy, oz, dx, dy, dz):
+    nx, ny, nz = normals[i, 0], normals[i, 1], normals[i, 2]
+    denom = dx * nx + dy * ny + dz * nz
+    if abs(denom) <= 1e-6:
+        return np.inf
+    t = ((points[i, 0] - ox) * nx + (points[i, 1] - oy) * ny + (points[i, 2] - oz) * nz) / denom
+    return t if t > 0.001 else np.inf
+
+@njit(cache=True)
+def _hit_triangle(tris, i, ox, oy, oz, dx, dy, dz):
+    # Moller-Trumbore on (v0, e1, e2) rows, two-sided like intersect_triangles
+    e1x, e1y, e1z = tris[i, 3], tris[i, 4], tris[i, 5]
+    e2x, e2y, e2z = tris[i, 6], tris[i, 7], tris[i, 8]
+    px, py, pz = dy * e2z - dz * e2y, dz * e2x - dx * e2z, dx * e2y - dy * e2x
+    det = e1x * px + e1y * py + e1z * pz
+    if abs(det) <= 1e-12:
+        return np.inf
+    sx, sy, sz = ox - tris[i, 0], oy - tris[i, 1], oz - tris[i, 2]
+    qx, qy, qz = sy * e1z - sz * e1y, sz * e1x - sx * e1z, sx * e1y - sy * e1x
+    inv = 1.0 / det
+    u = (sx * px + sy * py + sz * pz) * inv
+    v = (dx * qx + dy * qy + dz * qz) * inv
+    t = (e2x * qx + e2y * qy + e2z * qz) * inv
+    if u >= 0 and v >= 0 and u + v <= 1 and t > 0.001:
+        return t
+    return np.inf
+
+@njit(cache=True)
+def _slab_axis(o, inv, lo, hi, tmin, tmax):
+    # One axis of bvh._slab_batch, including its NaN convention for parallel rays
+    t0, t1 = (lo - o) * inv, (hi - o) * inv
+    if np.isnan(t0):
+        t0 = -np.inf
+    if np.isnan(t1):
+        t1 = np.inf
+    return max(tmin, min(t0, t1)), min(tmax, max(t0, t1))
+
+@njit(cache=True)
+def _slab(node_lo, node_hi, node, ox, oy, oz, ix, iy, iz, t_max):
+    tmin, tmax = _slab_axis(ox, ix, node_lo[node, 0], node_hi[node, 0], -np.inf, np.inf)
+    tmin, tmax = _slab_axis(oy, iy, node_lo[node, 1], node_hi[node, 1], tmin, tmax)
+    tmin, tmax = _slab_axis(oz, iz, node_lo[node, 2], node_hi[node, 2], tmin, tmax)
+    return tmax >= tmin and tmax >= 0 and tmin < t_max
+
+@njit(cache=True)
+def _inverse(d):
+    return np.inf if d == 0 else 1.0 / d
+
+# --- Scene queries (one ray) ---
+
+@njit(cache=True)
+def _closest_hit(scene, stack, ox, oy, oz, dx, dy, dz):
+    (centers, radii, plane_points, plane_normals, tris, _, num_spheres, mesh_start,
+     node_lo, node_hi, node_right, node_start, node_count, prim_indices, sphere_root, mesh_roots,
+     _, _, _, _) = scene
+    prim, best = -1, np.inf
+    ix, iy, iz = _inverse(dx), _inverse(dy), _inverse(dz)
+
+    if sphere_root < 0:
+        for i in range(num_spheres):
+            t = _hit_sphere(centers, radii, i, ox, oy, oz, dx, dy, dz)
+            if t < best:
+                prim, best = i, t
+
+    for i in range(len(plane_points)):
+        t = _hit_plane(plane_points, plane_normals, i, ox, oy, oz, dx, dy, dz)
+        if t < best:
+            prim, best = num_spheres + i, t
+
+    # Sphere tree (if any) first, then one tree per mesh; kind is their root's position
+    num_trees = len(mesh_roots) + (1 if sphere_root >= 0 else 0)
+    for tree in range(num_trees):
+        spheres = sphere_root >= 0 and tree == 0
+        root = sphere_root if spheres else mesh_roots[tree - (1 if sphere_root >= 0 else 0)]
+        top = 0
+        stack[0] = root
+        while top >= 0:
+            node = stack[top]
+            top -= 1
+            if not _slab(node_lo, node_hi, node, ox, oy, oz, ix, iy, iz, best):
+                continue
+            count = node_count[node]
+            if count:
+                for k in range(node_start[node], node_start[node] + count):
+                    p = prim_indices[k]
+                    if spheres:
+                        t = _hit_sphere(centers, radii, p, ox, oy, oz, dx, dy, dz)
+                        if t < best:
+                            prim, best = p, t
+                    else:
+                        t = _hit_triangle(tris, p, ox, oy, oz, dx, dy, dz)
+                        if t < best:
+                            prim, best = mesh_start + p, t
+            else:
+                stack[top + 1] = node_right[node]
+                stack[top + 2] = node + 1
+                top += 2
+    return prim, best
+
+@njit(cache=True)
+def _any_hit(scene, stack, ox, oy, oz, dx, dy, dz, t_max):
+    (centers, radii, plane_points, plane_normals, tris, _, num_spheres, _,
+     node_lo, node_hi, node_right, node_start, node_count, prim_indices, sphere_root, mesh_roots,
+     _, _, _, _) = scene
+    for i in range(len(plane_points)):
+        if _hit_plane(plane_points, plane_normals, i, ox, oy, oz, dx, dy, dz) < t_max:
+            return True
+    if sphere_root < 0:
+        for i in range(num_spheres):
+            if _hit_sphere(centers, radii, i, ox, oy, oz, dx, dy, dz) < t_max:
+                return True
+
+    ix, iy, iz = _inverse(dx), _inverse(dy), _inverse(dz)
+    num_trees = len(mesh_roots) + (1 if sphere_root >= 0 else 0)
+    for tree in range(num_trees):
+        spheres = sphere_root >= 0 and tree == 0
+        root = sphere_root if spheres else mesh_roots[tree - (1 if sphere_root >= 0 else 0)]
+        top = 0
+        stack[0] = root
+        while top >= 0:
+            node = stack[top]
+            top -= 1
+            if not _slab(node_lo, node_hi, node, ox, oy, oz, ix, iy, iz, t_max):
+                continue
+            count = node_count[node]
+            if count:
+                for k in range(node_start[node], node_start[node] + count):
+                    p = prim_indices[k]
+                    if spheres:
+                        t = _hit_sphere(centers, radii, p, ox, oy, oz, dx, dy, dz)
+                    else:
+                        t = _hit_triangle(tris, p, ox, oy, oz, dx, dy, dz)
+                    if t < t_max:
+                        return True
+            else:
+                stack[top + 1] = node_right[node]
+                stack[top + 2] = node + 1
+                top += 2
+    return False
+
+@njit(cache=True)
+def _normalize(x, y, z):
+    norm = np.sqrt(x * x + y * y + z * z)
+    if norm == 0:
+        return x, y, z
+    return x / norm, y / norm, z / norm
+
+@njit(cache=True)
+def _normal(scene, prim, px, py, pz, dx, dy, dz):
+    centers, _, _, plane_normals, _, tri_normals, num_spheres, mesh_start = scene[:8]
+    if prim < num_spheres:
+        return _normalize(px - centers[prim, 0], py - centers[prim, 1], pz - centers[prim, 2])
+    if prim >= mesh_start:
+        i = prim - mesh_start
+        nx, ny, nz = tri_normals[i, 0], tri_normals[i, 1], tri_normals[i, 2]
+        if nx * dx + ny * dy + nz * dz > 0:
+            return -nx, -ny, -nz
+        return nx, ny, nz
+    i = prim - num_spheres
+    return plane_normals[i, 0], plane_normals[i, 1], plane_normals[i, 2]
+
+# --- Batch entry points ---
+
+@njit(parallel=True, cache=True)
+def _closest_hit_kernel(scene, origins, directions, prim, dist):
+    for r in prange(len(directions)):
+        stack = np.empty(scene[16], dtype=np.int64)
+        prim[r], dist[r] = _closest_hit(scene, stack, origins[r, 0], origins[r, 1], origins[r, 2],
+                                        directions[r, 0], directions[r, 1], directions[r, 2])
+
+@njit(parallel=True, cache=True)
+def _any_hit_kernel(scene, origins, directions, t_max, occluded):
+    for r in prange(len(directions)):
+        stack = np.empty(scene[16], dtype=np.int64)
+        occluded[r] = _any_hit(scene, stack, origins[r, 0], origins[r, 1], origins[r, 2],
+                               directions[r, 0], directions[r, 1], directions[r, 2], t_max[r])
+
+@njit(parallel=True, cache=True)
+def _trace_kernel(scene, origins, directions, light_positions, light_colors, max_depth, min_weight, colors):
+    prim_materials, material_colors, material_table = scene[17], scene[18], scene[19]
+    for r in prange(len(directions)):
+        stack = np.empty(scene[16], dtype=np.int64)
+        local = np.zeros((max_depth + 1, 3))
+        reflection = np.zeros(max_depth + 1)
+        ox, oy, oz = origins[r, 0], origins[r, 1], origins[r, 2]
+        dx, dy, dz = directions[r, 0], directions[r, 1], directions[r, 2]
+        weight = 1.0
+        bounces = 0
+
+        for depth in range(max_depth + 1):
+            prim, t = _closest_hit(scene, stack, ox, oy, oz, dx, dy, dz)
+            if prim < 0:
+                break
+            bounces = depth + 1
+            px, py, pz = ox + dx * t, oy + dy * t, oz + dz * t
+            nx, ny, nz = _normal(scene, prim, px, py, pz, dx, dy, dz)
+            # Nudge hit point slightly along normal to avoid self-intersection artifacts
+            px, py, pz = px + nx * 1e-4, py + ny * 1e-4, pz + nz * 1e-4
+
+            # Phong shading as in shade_hits
+            m = prim_materials[prim]
+            ambient, diffuse, specular, shininess, r_coef = (
+                material_table[m, 0], material_table[m, 1], material_table[m, 2], material_table[m, 3], material_table[m, 4])
+            cr, cg, cb = material_colors[m, 0], material_colors[m, 1], material_colors[m, 2]
+            red, green, blue = cr * ambient, cg * ambient, cb * ambient
+            if len(light_positions):
+                vx, vy, vz = _normalize(ox - px, oy - py, oz - pz)
+                for i in range(len(light_positions)):
+                    lx, ly, lz = light_positions[i, 0] - px, light_positions[i, 1] - py, light_positions[i, 2] - pz
+                    dist_to_light = np.sqrt(lx * lx + ly * ly + lz * lz)
+                    lx, ly, lz = _normalize(lx, ly, lz)
+                    lit = 0.0 if _any_hit(scene, stack, px, py, pz, lx, ly, lz, dist_to_light) else 1.0
+
+                    n_dot_l = nx * lx + ny * ly + nz * lz
+                    illumination = max(0.0, n_dot_l) * lit
+                    red += cr * (diffuse * illumination) * light_colors[i, 0]
+                    green += cg * (diffuse * illumination) * light_colors[i, 1]
+                    blue += cb * (diffuse * illumination) * light_colors[i, 2]
+
+                    rx, ry, rz = _normalize(2 * n_dot_l * nx - lx, 2 * n_dot_l * ny - ly, 2 * n_dot_l * nz - lz)
+                    spec = max(0.0, rx * vx + ry * vy + rz * vz) ** shininess * lit
+                    red += (specular * spec) * light_colors[i, 0]
+                    green += (specular * spec) * light_colors[i, 1]
+                    blue += (specular * spec) * light_colors[i, 2]
+            local[depth, 0], local[depth, 1], local[depth, 2] = red, green, blue
+            reflection[depth] = r_coef
+
+            if not (r_coef > 0 and weight * r_coef > min_weight):
+                break
+            k = 2 * (dx * nx + dy * ny + dz * nz)
+            dx, dy, dz = _normalize(dx - k * nx, dy - k * ny, dz - k * nz)
+            ox, oy, oz = px, py, pz
+            weight *= r_coef
+
+        # Combine back to front, clipping at every bounce like resolve_bounces
+        red = green = blue = 0.0
+        for depth in range(bounces - 1, -1, -1):
+            r_coef = reflection[depth]
+            if r_coef > 0:
+                red = local[depth, 0] * (1 - r_coef) + red * r_coef
+                green = local[depth, 1] * (1 - r_coef) + green * r_coef
+                blue = local[depth, 2] * (1 - r_coef) + blue * r_coef
+            else:
+                red, green, blue = local[depth, 0], local[depth, 1], local[depth, 2]
+            red, green, blue = min(max(red, 0.0), 1.0), min(max(green, 0.0), 1.0), min(max(blue, 0.0), 1.0)
+        colors[r, 0], colors[r, 1], colors[r, 2] = red, green, blue
+
+def closest_hit(scene, origins, directions):
+    # Same contract as Scene.closest_hit_batch; scene is pack() output
+    directions = _rays(directions)
+    origins = _rays(np.broadcast_to(origins, directions.shape))
+    prim = np.empty(len(directions), dtype=np.int64)
+    dist = np.empty(len(directions))
+    _closest_hit_kernel(scene, origins, directions, prim, dist)
+    return prim, dist
+
+def any_hit(scene, origins, directions, t_max):
+    directions = _rays(directions)
+    origins = _rays(np.broadcast_to(origins, directions.shape))
+    t_max = _rays(np.broadcast_to(t_max, (len(directions),)))
+    occluded = np.empty(len(directions), dtype=np.bool_)
+    _any_hit_kernel(scene, origins, directions, t_max, occluded)
+    return occluded
+
+def trace(scene, origins, directions, lights, max_depth, min_weight):
+    # Same contract as raytracer.trace_rays
+    directions = _rays(directions)
+    origins = _rays(np.broadcast_to(origins, directions.shape))
+    light_positions = _rays(np.array([pos for pos, _ in lights], dtype=float).reshape(-1, 3))
+    light_colors = _rays(np.array([color for _, color in lights], dtype=float).reshape(-1, 3))
+    colors = np.empty((len(directions), 3))
+    _trace_kernel(scene, origins, directions, light_positions, light_colors, max_depth, float(min_weight), colors)
+    return colors
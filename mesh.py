@@ -0,0 +1,91 @@
+import io
+import numpy as np
+
+# Wavefront OBJ reading and writing for TriangleMesh.
+#
+# Only geometry is read: "v" positions and "f" faces. Texture/normal indices
+# (f 1/2/3), groups and materials are ignored, polygons are fan-triangulated
+# and negative (relative) indices are resolved. The file is split into lines
+# with array operations on its bytes and the numbers are parsed by np.loadtxt,
+# so a million-triangle file never turns into a million Python objects.
+
+_SPACE, _TAB, _NEWLINE, _RETURN, _SLASH = (ord(c) for c in ' \t\n\r/')
+
+def _lines_of(buf):
+    # Line index of every byte (a newline belongs to the line it ends) and line start offsets
+    newline = buf == _NEWLINE
+    line_id = np.cumsum(newline, dtype=np.int32) - newline
+    starts = np.concatenate([[0], np.flatnonzero(newline)[:-1] + 1])
+    return line_id, starts
+
+def _is_space(buf):
+    return (buf == _SPACE) | (buf == _TAB) | (buf == _NEWLINE) | (buf == _RETURN)
+
+def _parse(text, dtype, usecols=None):
+    return np.loadtxt(io.BytesIO(text), dtype=dtype, usecols=usecols, ndmin=2)
+
+def load_obj(path):
+    # Returns (vertices (V, 3) float, faces (F, 3) int), faces index into vertices from 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    buf = np.frombuffer(data, dtype=np.uint8)
+    line_id, starts = _lines_of(buf)
+
+    # Keyword of each line from its first two bytes: "v " / "f " (or a tab)
+    second = buf[np.minimum(starts + 1, len(buf) - 1)]
+    spaced = (second == _SPACE) | (second == _TAB)
+    vertex_lines = (buf[starts] == ord('v')) & spaced
+    face_lines = (buf[starts] == ord('f')) & spaced
+
+    if vertex_lines.any():
+        vertices = _parse(buf[vertex_lines[line_id]].tobytes(), float, usecols=(1, 2, 3))
+    else:
+        vertices = np.zeros((0, 3))
+    if not face_lines.any():
+        return vertices, np.zeros((0, 3), dtype=int)
+
+    # Face lines without the "f" and with everything from a '/' to the end of its token
+    # dropped, leaving plain vertex indices
+    text = buf[face_lines[line_id]].copy()
+    text[np.concatenate([[0], np.flatnonzero(text == _NEWLINE)[:-1] + 1])] = _SPACE
+    space = _is_space(text)
+    slashes = np.cumsum(text == _SLASH, dtype=np.int32)
+    text = text[slashes <= np.maximum.accumulate(np.where(space, slashes, 0))]
+
+    # Vertices per face, from the token starts on each line
+    space = _is_space(text)
+    token_start = ~space & np.concatenate([[True], space[:-1]])
+    face_id, _ = _lines_of(text)
+    sizes = np.bincount(face_id[token_start], minlength=face_id[-1] + 1)
+
+    if (sizes == 3).all():
+        faces = _parse(text.tobytes(), int)
+        source = np.arange(len(faces))
+    else:
+        # Fan-triangulate each polygon size separately, then restore file order
+        parts, rows_of, fan_of = [], [], []
+        for size in np.unique(sizes[sizes >= 3]):
+            rows = np.flatnonzero(sizes == size)
+            polygons = _parse(text[np.isin(face_id, rows)].tobytes(), int)
+            for i in range(1, size - 1):
+                parts.append(polygons[:, [0, i, i + 1]])
+                rows_of.append(rows)
+                fan_of.append(np.full(len(rows), i))
+        source, fan = np.concatenate(rows_of), np.concatenate(fan_of)
+        order = np.lexsort((fan, source))
+        faces, source = np.concatenate(parts)[order], source[order]
+
+    # OBJ indices are 1-based; negative ones count back from the last vertex defined
+    # before the face
+    vertices_before = np.cumsum(vertex_lines)[face_lines][source]
+    faces = np.where(faces < 0, faces + vertices_before[:, None], faces - 1)
+    if faces.size and (faces.min() < 0 or faces.max() >= len(vertices)):
+        raise ValueError(f"{path}: face index out of range")
+    return vertices, faces
+
+def save_obj(path, vertices, faces):
+    with open(path, 'w') as f:
+        np.savetxt(f, np.asarray(vertices, dtype=float).reshape(-1, 3), fmt='v %.9g %.9g %.9g')
+        np.savetxt(f, np.asarray(faces, dtype=int).reshape(-1, 3) + 1, fmt='f %d %d %d')
@@ -0,0 +1,247 @@
+from collections import OrderedDict
+import numpy as np
+
+# Vectorized midpoint circles and ellipses.
+#   draw_circles(target, [(xc, yc, r), ...], WHITE)
+#   draw_ellipses(target, [(xc, yc, rx, ry), ...], WHITE, filled=True)
+#
+# Same pixels as the old midpoint loops of circle_pygame.py and ellipse.py, quirks
+# included: the circle plots (x, y) only after stepping x (so never (0, r) around the
+# center) and the ellipse's region 2 runs down to y = -1. The one exception is the
+# circle loop's stray first pixel, (0, r) in absolute coordinates whatever the center:
+# it isn't drawn, as it would stretch every circle's bounds (and the display list's
+# dirty rectangles) to x = 0.
+#
+# The loops never need walking. Each decision variable is the implicit function at
+# the next midpoint, so after stepping to x the circle's y is the smallest y with
+# (2y + 1)^2 >= 4 (r^2 - x^2); the ellipse's region 1 is the same with the axes
+# scaled, and region 2 steps x to the smallest x with ry^2 (2x + 1)^2 > 4 rx^2 (ry^2 - y^2).
+# Where that target jumps by more than a pixel (each loop overshoots its region by a
+# step or so) the loop still moves one pixel per step, which a running max adds back.
+# Checked pixel for pixel against the loops for every circle up to r = 3000 and every
+# ellipse up to 90 x 90, plus random larger ones.
+#
+# One octant (quadrant) per distinct radius comes out of a few integer array ops, is
+# mirrored in bulk and offset to every center with that radius; all shapes then go to
+# the target in one set_pixels call. Filled shapes are one fill_spans call instead,
+# each row spanning the outline pixels on it.
+#
+# Mirrored offsets (and span widths) are kept per radius in an LRU cache, the module's
+# `offsets` unless draw_*(..., cache=...) says otherwise, so drawing the same radius
+# again at any center is one vector add. It holds at most max_bytes of arrays,
+# evicting the least recently used; offsets.report() gives its hit/miss counts.
+
+CACHE_BYTES = 16 << 20  # default budget of the offsets cache
+
+def _smallest_cover(t, a):
+    # Smallest y >= 0 per element with a * (2y + 1)^2 >= t (integer arrays): the
+    # float square root gives q ~ sqrt(t / a), then one exact correction each way
+    q = np.ceil(np.sqrt(np.maximum(t, 0) / a)).astype(np.int64)
+    q += a * q * q < t
+    q -= (q > 0) & (a * (q - 1) * (q - 1) >= t)
+    return q // 2
+
+def _step_down(start, y):
+    # The loop's y after each step when it moves to y[k] but by one at most per step:
+    # y_k = max(y_{k-1} - 1, y[k]) from y_0 = start, i.e. a running max of y[j] + j
+    k = np.arange(1, len(y) + 1)
+    return np.maximum(np.maximum.accumulate(y + k), start) - k
+
+def circle_octant(r):
+    # (x, y) of every step of the midpoint circle loop, before mirroring
+    if r <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    x = np.arange(1, int(r / np.sqrt(2)) + 3, dtype=np.int64)
+    y = _smallest_cover(4 * (r * r - x * x), 1)
+    # One step moves y by one at most; only matters where the loop overshoots 45 degrees
+    y = _step_down(r, y)
+    # The loop stops after the first step that reaches x >= y
+    last = np.argmax(x >= y)
+    return x[:last + 1], y[:last + 1]
+
+def _ellipse_loop(rx, ry):
+    # ellipse.py's loop itself, for the degenerate rx <= 0 or ry <= 0 where the
+    # region tests don't behave like an ellipse. rx = ry = 0 would never leave
+    # region 1 (0 <= 0 forever) and draws nothing here
+    if rx == 0 and ry == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    x, y = 0, ry
+    p1 = (ry * ry) - (rx * rx * ry) + (0.25 * rx * rx)
+    dx, dy = 2 * ry * ry * x, 2 * rx * rx * y
+    points = []
+    while dx <= dy:
+        x += 1
+        dx = dx + (2 * ry * ry)
+        if p1 < 0:
+            p1 = p1 + dx + (ry * ry)
+        else:
+            y -= 1
+            dy = dy - (2 * rx * rx)
+            p1 = p1 + dx - dy + (ry * ry)
+        points.append((x, y))
+    p2 = ((ry * ry) * ((x + 0.5) * (x + 0.5))) + ((rx * rx) * ((y - 1) * (y - 1))) - (rx * rx * ry * ry)
+    while y >= 0:
+        y -= 1
+        dy = dy - (2 * rx * rx)
+        if p2 > 0:
+            p2 = p2 + (rx * rx) - dy
+        else:
+            x += 1
+            dx = dx + (2 * ry * ry)
+            p2 = p2 + dx - dy + (rx * rx)
+        points.append((x, y))
+    points = np.array(points, dtype=np.int64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+def ellipse_quadrant(rx, ry):
+    # (x, y) of every step of the midpoint ellipse loop (both regions), before mirroring
+    if rx <= 0 or ry <= 0:
+        return _ellipse_loop(rx, ry)
+    rx2, ry2 = rx * rx, ry * ry
+
+    # Region 1 steps x; it stops after the first step where the slope passes -1
+    x1 = np.arange(1, rx + 2, dtype=np.int64)
+    y1 = _step_down(ry, _smallest_cover(4 * ry2 * (rx2 - x1 * x1), rx2))
+    last = np.argmax(ry2 * x1 > rx2 * y1)
+    x1, y1 = x1[:last + 1], y1[:last + 1]
+
+    # Region 2 steps y down to 0, x moving towards its target by one at most per step
+    # (the target only grows down to y = 0); the loop's last step to y = -1 is taken
+    # directly: x still steps if it lags behind the target of y = 1
+    y2 = np.arange(y1[-1] - 1, -1, -1, dtype=np.int64)
+    target = np.maximum(_smallest_cover(4 * rx2 * (ry2 - y2 * y2) + 1, ry2), x1[-1])
+    x2 = -_step_down(-x1[-1], -target)
+    x = x2[-1] if len(x2) else x1[-1]
+    x += x < _smallest_cover(np.array([4 * rx2 * (ry2 - 1) + 1]), ry2)[0]
+    return np.concatenate([x1, x2, [x]]), np.concatenate([y1, y2, [-1]])
+
+# --- Offsets cache ---
+
+class OffsetCache:
+    # LRU of origin-centered offset arrays keyed by shape and radius. Cached arrays are
+    # read-only; entries bigger than the whole budget are computed but not kept
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> tuple of arrays, least recently used first
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, compute, *args):
+        # The arrays for key, from compute(*args) on a miss
+        arrays = self.entries.get(key)
+        if arrays is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return arrays
+        self.misses += 1
+        arrays = tuple(compute(*args))
+        for a in arrays:
+            a.flags.writeable = False
+        size = sum(a.nbytes for a in arrays)
+        if size <= self.max_bytes:
+            self.entries[key] = arrays
+            self.bytes += size
+            self.resize(self.max_bytes)
+        return arrays
+
+    def resize(self, max_bytes):
+        # New budget; evicts least recently used entries until it fits
+        self.max_bytes = max_bytes
+        while self.bytes > max_bytes:
+            _, arrays = self.entries.popitem(last=False)
+            self.bytes -= sum(a.nbytes for a in arrays)
+            self.evictions += 1
+
+    def clear(self):
+        # Empties the cache and starts its statistics afresh
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def hit_rate(self):
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def report(self):
+        return (f"offsets cache: {self.hits} hits, {self.misses} misses ({self.hit_rate():.1%} hit rate), "
+                f"{self.evictions} evictions, {len(self.entries)} entries, "
+                f"{self.bytes / 1024:.1f} of {self.max_bytes / 1024:.0f} KiB")
+
+offsets = OffsetCache()
+
+def _lookup(cache, key, compute, *args):
+    return compute(*args) if cache is None else cache.get(key, compute, *args)
+
+# --- Drawing ---
+
+def _by_radius(shapes, width):
+    # Group (N, width) rows by their radius columns: yields (radii, centers)
+    shapes = np.asarray(shapes, dtype=np.int64).reshape(-1, width)
+    radii, inverse, counts = np.unique(shapes[:, 2:], axis=0, return_inverse=True, return_counts=True)
+    groups = np.split(shapes[np.argsort(inverse.ravel(), kind='stable'), :2], np.cumsum(counts)[:-1])
+    yield from zip(radii.tolist(), groups)
+
+def _offset(centers, dx, dy):
+    # Every offset around every center, flattened
+    return (centers[:, :1] + dx[None, :]).ravel(), (centers[:, 1:] + dy[None, :]).ravel()
+
+def _row_spans(dx, dy):
+    # Rows and half-widths of the filled shape, each row as wide as the outline
+    # offsets on it
+    rows, inverse = np.unique(dy, return_inverse=True)
+    half = np.zeros(len(rows), dtype=dx.dtype)
+    np.maximum.at(half, inverse.ravel(), np.abs(dx))
+    return rows, half
+
+def _spans(centers, rows, half):
+    # Horizontal spans (rows, left, right) around every center
+    cx, cy = centers[:, :1], centers[:, 1:]
+    return (cy + rows[None, :]).ravel(), (cx - half[None, :]).ravel(), (cx + half[None, :]).ravel()
+
+def _draw(target, parts, color, filled):
+    # One set_pixels or fill_spans call for the pieces of every group
+    if parts:
+        arrays = [np.concatenate(column) for column in zip(*parts)]
+        if filled:
+            target.fill_spans(*arrays, color)
+        else:
+            target.set_pixels(*arrays, color)
+
+def circle_offsets(r, lower_half=False):
+    # Mirrored outline offsets from the center; lower_half keeps the four octants
+    # below it (smile_pygame.py's mouth)
+    x, y = circle_octant(r)
+    x, y = x.astype(np.int32), y.astype(np.int32)
+    if lower_half:
+        return np.concatenate([x, -x, y, -y]), np.concatenate([y, y, x, x])
+    return np.concatenate([x, -x, x, -x, y, -y, y, -y]), np.concatenate([y, y, -y, -y, x, x, -x, -x])
+
+def ellipse_offsets(rx, ry):
+    x, y = ellipse_quadrant(rx, ry)
+    x, y = x.astype(np.int32), y.astype(np.int32)
+    return np.concatenate([x, -x, x, -x]), np.concatenate([y, y, -y, -y])
+
+def _circle_spans(r, lower_half):
+    return _row_spans(*circle_offsets(r, lower_half))
+
+def _ellipse_spans(rx, ry):
+    return _row_spans(*ellipse_offsets(rx, ry))
+
+def draw_circles(target, circles, color, filled=False, lower_half=False, cache=offsets):
+    # circles: (N, 3) rows of (xc, yc, r); cache=None computes every radius afresh
+    parts = []
+    for (r,), centers in _by_radius(circles, 3):
+        if filled:
+            parts.append(_spans(centers, *_lookup(cache, ('circle spans', r, lower_half), _circle_spans, r, lower_half)))
+            continue
+        parts.append(_offset(centers, *_lookup(cache, ('circle', r, lower_half), circle_offsets, r, lower_half)))
+    _draw(target, parts, color, filled)
+
+def draw_ellipses(target, ellipses, color, filled=False, cache=offsets):
+    # ellipses: (N, 4) rows of (xc, yc, rx, ry)
+    parts = []
+    for (rx, ry), centers in _by_radius(ellipses, 4):
+        if filled:
+            parts.append(_spans(centers, *_lookup(cache, ('ellipse spans', rx, ry), _ellipse_spans, rx, ry)))
+        else:
+            parts.append(_offset(centers, *_lookup(cache, ('ellipse', rx, ry), ellipse_offsets, rx, ry)))
+    _draw(target, parts, color, filled)
@@ -0,0 +1,173 @@
+import math
+import sys
+import time
+import numpy as np
+from raytracer import MAX_DEPTH, compile_scene, default_scene, sample_directions, trace_rays
+
+# Interactive preview for tuning a scene.
+#   python preview.py [scene.json]
+# Every view change is shown at 1/8 resolution first and then refined through
+# 1/4, 1/2 and full resolution. Rendering happens in bands of rows with the event
+# queue drained in between, so the window never stalls and moving the camera
+# abandons whatever refinement is in flight.
+#
+# Controls: WASD move, R/F up/down, arrow keys or left-drag look around,
+# mouse wheel dolly, Esc quits.
+
+WIDTH, HEIGHT = 400, 300
+LEVELS = [8, 4, 2, 1]   # downscale factors, coarsest first
+BAND_RAYS = 8192        # rays per band between two event checks
+MOVE_SPEED = 3.0        # units per second
+TURN_SPEED = 1.5        # radians per second
+MOUSE_SENSITIVITY = 0.005
+
+class Camera:
+    # Position plus yaw (around +y) and pitch (around the camera's x axis);
+    # yaw = pitch = 0 looks down -z like the fixed camera in raytracer.main()
+    def __init__(self, position, yaw=0.0, pitch=0.0):
+        self.position = np.asarray(position, dtype=float)
+        self.yaw, self.pitch = yaw, pitch
+
+    def rotation(self):
+        # Columns are the camera's right, up and backward axes in world space
+        cy, sy = math.cos(self.yaw), math.sin(self.yaw)
+        cp, sp = math.cos(self.pitch), math.sin(self.pitch)
+        return np.array([
+            [cy, -sy * sp, -sy * cp],
+            [0.0, cp, -sp],
+            [sy, cy * sp, cy * cp],
+        ])
+
+    def move(self, forward, right, up):
+        # Forward moves along the view direction flattened onto the ground plane
+        cy, sy = math.cos(self.yaw), math.sin(self.yaw)
+        self.position = self.position + np.array([sy * forward + cy * right, up, -cy * forward + sy * right])
+
+    def turn(self, yaw, pitch):
+        self.yaw += yaw
+        self.pitch = min(max(self.pitch + pitch, -1.5), 1.5)
+
+def render_band(scene, lights, camera, width, height, level, y0, y1, max_depth=MAX_DEPTH):
+    # Rows y0:y1 of the 1/level image: one ray through the center of each level x level
+    # block of the full-resolution frame, so every level shows exactly the same view
+    cols = -(-width // level)
+    xs, ys = np.meshgrid((np.arange(cols) + 0.5) * level, (np.arange(y0, y1) + 0.5) * level)
+    directions = sample_directions(width, height, xs.ravel(), ys.ravel()) @ camera.rotation().T
+    return trace_rays(camera.position, directions, scene, lights, max_depth).reshape(y1 - y0, cols, 3)
+
+class Refinement:
+    # Walks the levels band by band; restart() drops whatever was in flight
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.restart()
+
+    def restart(self):
+        self.level_index, self.row = 0, 0
+
+    @property
+    def done(self):
+        return self.level_index == len(LEVELS)
+
+    @property
+    def level(self):
+        return LEVELS[self.level_index]
+
+    def next_band(self):
+        # (level, y0, y1) of the next band in 1/level rows, advancing past it
+        level = self.level
+        rows = -(-self.height // level)
+        cols = -(-self.width // level)
+        y0 = self.row
+        y1 = min(rows, y0 + max(1, BAND_RAYS // cols))
+        self.row = y1
+        if y1 == rows:
+            self.level_index, self.row = self.level_index + 1, 0
+        return level, y0, y1
+
+def main(argv=None):
+    import pygame
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from scene import load_scene
+        scene = load_scene(argv[0])
+        lights, camera = scene.lights(), Camera(scene.camera)
+    else:
+        objects, lights, camera_pos = default_scene()
+        scene, camera = compile_scene(objects), Camera(camera_pos)
+    if scene.uses_bvh():
+        scene.build_bvh()
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Mini Ray Tracer - preview")
+    refinement = Refinement(WIDTH, HEIGHT)
+    clock = pygame.time.Clock()
+
+    move_keys = {
+        pygame.K_w: (1, 0, 0), pygame.K_s: (-1, 0, 0),
+        pygame.K_d: (0, 1, 0), pygame.K_a: (0, -1, 0),
+        pygame.K_r: (0, 0, 1), pygame.K_f: (0, 0, -1),
+    }
+    turn_keys = {
+        pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0),
+        pygame.K_UP: (0, 1), pygame.K_DOWN: (0, -1),
+    }
+
+    level_start = time.perf_counter()
+    running = True
+    while running:
+        pressed = pygame.key.get_pressed()
+        holding = any(pressed[key] for key in move_keys) or any(pressed[key] for key in turn_keys)
+        # Sleep in the event queue once the image is final and nothing is held down
+        events = pygame.event.get() if holding or not refinement.done else [pygame.event.wait()]
+        dt = min(clock.tick() / 1000, 0.1)
+
+        moved = False
+        for event in events:
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                camera.turn(event.rel[0] * MOUSE_SENSITIVITY, -event.rel[1] * MOUSE_SENSITIVITY)
+                moved = True
+            elif event.type == pygame.MOUSEWHEEL:
+                camera.move(event.y * 0.5, 0, 0)
+                moved = True
+
+        if holding:
+            pressed = pygame.key.get_pressed()
+            for key, (forward, right, up) in move_keys.items():
+                if pressed[key]:
+                    camera.move(forward * MOVE_SPEED * dt, right * MOVE_SPEED * dt, up * MOVE_SPEED * dt)
+                    moved = True
+            for key, (yaw, pitch) in turn_keys.items():
+                if pressed[key]:
+                    camera.turn(yaw * TURN_SPEED * dt, pitch * TURN_SPEED * dt)
+                    moved = True
+
+        if moved:
+            refinement.restart()
+            level_start = time.perf_counter()
+        if not running or refinement.done:
+            continue
+
+        # One band, upscaled to full resolution and written straight into the window
+        level, y0, y1 = refinement.next_band()
+        band = render_band(scene, lights, camera, WIDTH, HEIGHT, level, y0, y1)
+        block = np.repeat(np.repeat(band, level, axis=0), level, axis=1)
+        top, bottom = y0 * level, min(y1 * level, HEIGHT)
+        pixels = pygame.surfarray.pixels3d(screen)
+        pixels[:, top:bottom] = (block[:bottom - top, :WIDTH].transpose(1, 0, 2) * 255).astype(np.uint8)
+        del pixels
+        pygame.display.update(pygame.Rect(0, top, WIDTH, bottom - top))
+
+        if refinement.row == 0:
+            # A level just finished
+            level_time = time.perf_counter() - level_start
+            pygame.display.set_caption(f"Mini Ray Tracer - preview 1/{level} in {level_time * 1000:.0f} ms")
+            level_start = time.perf_counter()
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
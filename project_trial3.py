@@ -1,27 +1,17 @@
 import math
 from PIL import Image
+from vec3 import sub, scale, dot, madd, reflect
 
 WIDTH = 400
 HEIGHT = 300
 MAX_DEPTH = 3
 
 # ---------- Vector ----------
-class Vec:
-    def __init__(self, x, y, z):
-        self.x, self.y, self.z = x, y, z
+# Vectors are float tuples, math from vec3 (no object allocation per operator)
 
-    def __add__(self, o): return Vec(self.x+o.x, self.y+o.y, self.z+o.z)
-    def __sub__(self, o): return Vec(self.x-o.x, self.y-o.y, self.z-o.z)
-    def __mul__(self, k): return Vec(self.x*k, self.y*k, self.z*k)
-
-    def dot(self, o): return self.x*o.x + self.y*o.y + self.z*o.z
-
-    def norm(self):
-        m = math.sqrt(self.dot(self))
-        return self * (1/m)
-
-    def reflect(self, n):
-        return self - n * 2 * self.dot(n)
+def norm(v):
+    m = math.sqrt(dot(v, v))
+    return scale(v, 1/m)
 
 
 # ---------- Objects ----------
@@ -33,9 +23,9 @@ class Sphere:
         self.reflection = reflection
 
     def intersect(self, origin, dir):
-        oc = origin - self.center
-        b = 2 * oc.dot(dir)
-        c = oc.dot(oc) - self.radius*self.radius
+        oc = sub(origin, self.center)
+        b = 2 * dot(oc, dir)
+        c = dot(oc, oc) - self.radius*self.radius
         disc = b*b - 4*c
         if disc < 0:
             return None
@@ -46,13 +36,13 @@ class Sphere:
 
 
 # ---------- Scene ----------
-camera = Vec(0, 0, -1)
-light = Vec(5, 5, -10)
+camera = (0.0, 0.0, -1.0)
+light = (5.0, 5.0, -10.0)
 
 objects = [
-    Sphere(Vec(0, 0, 3), 1, (255, 60, 60), 0.4),
-    Sphere(Vec(2, 0, 4), 1, (60, 255, 60), 0.3),
-    Sphere(Vec(-2, 0, 4), 1, (60, 60, 255), 0.5),
+    Sphere((0.0, 0.0, 3.0), 1, (255, 60, 60), 0.4),
+    Sphere((2.0, 0.0, 4.0), 1, (60, 255, 60), 0.3),
+    Sphere((-2.0, 0.0, 4.0), 1, (60, 60, 255), 0.5),
 ]
 
 # ---------- Ray Trace ----------
@@ -69,17 +59,18 @@ def trace(origin, dir, depth):
     if not hit_obj:
         return (20, 20, 30)  # background
 
-    hit = origin + dir * min_t
-    normal = (hit - hit_obj.center).norm()
+    hit = madd(origin, dir, min_t)
+    normal = norm(sub(hit, hit_obj.center))
 
     # lighting
-    light_dir = (light - hit).norm()
-    diffuse = max(normal.dot(light_dir), 0)
+    light_dir = norm(sub(light, hit))
+    diffuse = max(dot(normal, light_dir), 0)
 
     # shadow check
     shadow = False
+    shadow_origin = madd(hit, normal, 0.001)
     for obj in objects:
-        if obj != hit_obj and obj.intersect(hit + normal*0.001, light_dir):
+        if obj != hit_obj and obj.intersect(shadow_origin, light_dir):
             shadow = True
             break
 
@@ -92,8 +83,8 @@ def trace(origin, dir, depth):
     if depth <= 0 or hit_obj.reflection <= 0:
         return base
 
-    refl_dir = dir.reflect(normal).norm()
-    refl_color = trace(hit + normal*0.001, refl_dir, depth-1)
+    refl_dir = norm(reflect(dir, normal))
+    refl_color = trace(madd(hit, normal, 0.001), refl_dir, depth-1)
 
     return tuple(
         int(base[i]*(1-hit_obj.reflection) + refl_color[i]*hit_obj.reflection)
@@ -102,20 +93,48 @@ def trace(origin, dir, depth):
 
 
 # ---------- Render ----------
-img = Image.new("RGB", (WIDTH, HEIGHT))
-pixels = img.load()
-
-for y in range(HEIGHT):
-    for x in range(WIDTH):
+def render_row(y, width=WIDTH, height=HEIGHT):
+    # One scanline as a list of (r, g, b)
+    row = []
+    for x in range(width):
         # screen space → ray direction
-        px = (2*(x+0.5)/WIDTH - 1) * WIDTH/HEIGHT
-        py = 1 - 2*(y+0.5)/HEIGHT
-        dir = Vec(px, py, 1).norm()
-
-        color = trace(camera, dir, MAX_DEPTH)
-        pixels[x, y] = color
-
-    print(f"Row {y+1}/{HEIGHT}")
-
-img.save("raytrace_output.png")
-print("Done → saved as raytrace_output.png")
+        px = (2*(x+0.5)/width - 1) * width/height
+        py = 1 - 2*(y+0.5)/height
+        dir = norm((px, py, 1.0))
+
+        row.append(trace(camera, dir, MAX_DEPTH))
+    return row
+
+def render(width=WIDTH, height=HEIGHT, log=print):
+    img = Image.new("RGB", (width, height))
+    pixels = img.load()
+
+    for y in range(height):
+        for x, color in enumerate(render_row(y, width, height)):
+            pixels[x, y] = color
+
+        log(f"Row {y+1}/{height}")
+
+    return img
+
+def render_streaming(path, width=WIDTH, height=HEIGHT, log=print):
+    # Each row goes straight into a streaming PNG, so memory stays flat for any size
+    import numpy as np
+    from image_io import PNGStreamWriter
+    writer = PNGStreamWriter(path, width, height)
+    try:
+        for y in range(height):
+            writer.write_rows(np.array([render_row(y, width, height)], dtype=np.uint8))
+            log(f"Row {y+1}/{height}")
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    import sys
+    if "--stream" in sys.argv:
+        render_streaming("raytrace_output.png")
+    else:
+        img = render()
+        img.save("raytrace_output.png")
+    print("Done → saved as raytrace_output.png")
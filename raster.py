@@ -0,0 +1,58 @@
+import numpy as np
+
+# Batched Bresenham line rasterizer.
+#   draw_lines(target, [(x1, y1, x2, y2), ...], WHITE)   # target: see render_target.py
+#
+# Gives exactly the pixels of the bresenham() loop in 2d_trial.py (all eight octants,
+# both endpoints included), but for an (N, 4) array of segments at once. After i
+# steps along the major axis of length m, the decision variable has moved the other
+# axis floor((2 * d * i + m) / (2 * m)) times (d its length), and the major axis
+# itself fits the same formula with d = m. So every pixel is computed directly
+# instead of walked: floor(i * d / m + 0.5 + 0.25 / m) in float64, where the 0.25 / m
+# keeps exact integers from rounding down and is too small to reach the next one
+# (exact up to segments about a million pixels long). Long horizontal and vertical
+# runs are written as slices (fill_rect); everything else is one set_pixels batch.
+
+SLICE_MIN = 64  # single-color axis-aligned segments at least this long are written as slices
+
+def segment_pixels(segments):
+    # (xs, ys, counts): every pixel of every segment in drawing order, counts[k]
+    # pixels for segment k
+    segments = np.asarray(segments, dtype=np.int32).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T
+    dx, dy = np.abs(x2 - x1), np.abs(y2 - y1)
+    major = np.maximum(dx, dy)
+    counts = major + 1
+    start = np.cumsum(counts) - counts
+
+    # Written in terms of the global pixel index k = start + i, saving a per-pixel subtraction;
+    # max(major, 1) only guards zero-length segments
+    k = np.arange(counts.sum(), dtype=np.float64)
+    m = np.maximum(major, 1).astype(np.float64)
+    offset = 0.5 + 0.25 / m
+
+    def axis(a1, a2, d):
+        slope = d / m
+        steps = (k * np.repeat(slope, counts) + np.repeat(offset - start * slope, counts)).astype(np.int32)
+        return np.repeat(a1, counts) + np.repeat(np.sign(a2 - a1), counts) * steps
+
+    return axis(x1, x2, dx), axis(y1, y2, dy), counts
+
+def draw_lines(target, segments, color):
+    # color is one RGB triple or an (N, 3) array with one per segment, later segments
+    # drawn over earlier ones
+    segments = np.asarray(segments, dtype=np.int32).reshape(-1, 4)
+    colors = np.asarray(color, dtype=np.uint8)
+
+    if colors.ndim == 1:
+        # Drawing order doesn't matter with one color, so long runs can go first as slices
+        x1, y1, x2, y2 = segments.T
+        runs = ((x1 == x2) | (y1 == y2)) & (np.abs(x2 - x1) + np.abs(y2 - y1) >= SLICE_MIN)
+        for xa, ya, xb, yb in np.sort(segments[runs].reshape(-1, 2, 2), axis=1).reshape(-1, 4).tolist():
+            target.fill_rect(xa, ya, xb, yb, colors)
+        segments = segments[~runs]
+
+    xs, ys, counts = segment_pixels(segments)
+    if colors.ndim == 2:
+        colors = np.repeat(colors, counts, axis=0)
+    target.set_pixels(xs, ys, colors)
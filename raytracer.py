@@ -1,6 +1,23 @@
-import pygame
 import numpy as np
 import math
+import os
+import sys
+import time
+import vec3
+from bvh import BVH
+from mesh import load_obj
+
+# Batched queries and trace_rays run on compiled kernels (kernels.py) when Numba is
+# installed, on NumPy otherwise. RAYTRACER_BACKEND=numpy forces the NumPy path.
+BACKENDS = ('numba', 'numpy')
+BACKEND = os.environ.get('RAYTRACER_BACKEND', 'numba')
+if BACKEND not in BACKENDS:
+    raise ValueError(f"RAYTRACER_BACKEND must be one of {', '.join(BACKENDS)}, not {BACKEND!r}")
+if BACKEND == 'numba':
+    try:
+        import kernels
+    except ImportError:
+        BACKEND = 'numpy'
 
 # --- Vector Math Helpers ---
 def normalize(v):
@@ -9,6 +26,71 @@ def normalize(v):
         return v
     return v / norm
 
+def normalize_rows(v):
+    # Row-wise normalize for (N, 3) arrays; zero rows are left untouched like normalize()
+    norm = np.sqrt(np.einsum('ij,ij->i', v, v))[:, None]
+    return np.divide(v, norm, out=v.copy(), where=norm != 0)
+
+def dot_rows(a, b):
+    return np.einsum('ij,ij->i', a, b)
+
+def intersect_spheres(centers, radii, origins, directions):
+    # Row-wise ray/sphere distances (inf on a miss), same arithmetic as Sphere.intersect.
+    # centers/radii broadcast against the (N, 3) rays.
+    oc = origins - centers
+    a = dot_rows(directions, directions)
+    b = 2.0 * np.einsum('ij,ij->i', oc, directions)
+    c = np.einsum('ij,ij->i', oc, oc) - radii * radii
+    discriminant = b * b - 4 * a * c
+
+    sqrt_disc = np.sqrt(np.maximum(discriminant, 0))
+    dist1 = (-b - sqrt_disc) / (2 * a)
+    dist2 = (-b + sqrt_disc) / (2 * a)
+
+    dist = np.where(dist1 > 0.001, dist1, np.where(dist2 > 0.001, dist2, np.inf))
+    dist[discriminant < 0] = np.inf
+    return dist
+
+def intersect_planes(points, normals, origins, directions):
+    # Row-wise ray/plane distances (inf on a miss), same arithmetic as Plane.intersect
+    denom = dot_rows(directions, np.broadcast_to(normals, directions.shape))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = dot_rows(points - origins, np.broadcast_to(normals, directions.shape)) / denom
+    return np.where((np.abs(denom) > 1e-6) & (t > 0.001), t, np.inf)
+
+def cross_rows(a, b):
+    a, b = np.broadcast_arrays(a, b)
+    return np.stack([a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1],
+                     a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2],
+                     a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]], axis=-1)
+
+def intersect_triangles(v0, e1, e2, origins, directions):
+    # Row-wise Moller-Trumbore ray/triangle distances (inf on a miss). Triangles are given
+    # as a corner and the two edges leaving it, broadcast against the (N, 3) rays; both
+    # faces of a triangle are hit.
+    v0, e1, e2, origins, directions = np.broadcast_arrays(v0, e1, e2, origins, directions)
+    p = cross_rows(directions, e2)
+    det = dot_rows(e1, p)
+    s = origins - v0
+    q = cross_rows(s, e1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / det
+        u = dot_rows(s, p) * inv
+        v = dot_rows(directions, q) * inv
+        t = dot_rows(e2, q) * inv
+        # Edge-on and zero-area triangles (det == 0) give inf/nan above; the det test drops them
+        hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0.001)
+    return np.where(hit, t, np.inf)
+
+def triangle_edges(vertices, faces):
+    # (v0, e1, e2) arrays for intersect_triangles
+    v0 = vertices[faces[:, 0]]
+    return v0, vertices[faces[:, 1]] - v0, vertices[faces[:, 2]] - v0
+
+MAX_DEPTH = 3
+DENSE_LIMIT = 16  # below this many spheres a brute-force test beats walking a BVH
+MATERIAL_PARAMS = ('ambient', 'diffuse', 'specular', 'shininess', 'reflection')
+
 # --- Classes ---
 
 class Ray:
@@ -52,9 +134,23 @@ class Sphere:
             
         return float('inf')
 
+    def intersect_batch(self, origins, directions):
+        # Same test as intersect() for (N, 3) arrays of rays; misses are inf
+        return intersect_spheres(self.center, self.radius, origins, directions)
+
+    def occludes(self, ray, t_max):
+        # Any-hit test for shadow rays: is there a hit closer than t_max?
+        return self.intersect(ray) < t_max
+
+    def occluded_batch(self, origins, directions, t_max):
+        return self.intersect_batch(origins, directions) < t_max
+
     def normal(self, point):
         return normalize(point - self.center)
 
+    def normal_batch(self, points):
+        return normalize_rows(points - self.center)
+
 class Plane:
     def __init__(self, point, normal, material):
         self.point = np.array(point)
@@ -69,14 +165,639 @@ class Plane:
                 return t
         return float('inf')
 
+    def intersect_batch(self, origins, directions):
+        return intersect_planes(self.point, self.normal, origins, directions)
+
+    def occludes(self, ray, t_max):
+        return self.intersect(ray) < t_max
+
+    def occluded_batch(self, origins, directions, t_max):
+        return self.intersect_batch(origins, directions) < t_max
+
     def normal_at(self, point):
         return self.normal
 
+    def normal_batch(self, points):
+        return np.broadcast_to(self.normal, points.shape)
+
+class TriangleMesh:
+    # Indexed triangle mesh: vertices (V, 3), faces (F, 3) vertex indices, one material.
+    # Triangles only exist as rows of these arrays (and of the derived corner/edge
+    # arrays), never as objects. Ray queries go through a BVH over the mesh's triangles,
+    # built on first use. Shading uses flat face normals, front side counter-clockwise.
+    def __init__(self, vertices, faces, material, bvh=None):
+        self.vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype=int).reshape(-1, 3)
+        self.material = material
+        self.v0, self.e1, self.e2 = triangle_edges(self.vertices, self.faces)
+        self.face_normals = normalize_rows(cross_rows(self.e1, self.e2))
+        self.bvh = bvh
+
+    @classmethod
+    def from_obj(cls, path, material):
+        vertices, faces = load_obj(path)
+        return cls(vertices, faces, material)
+
+    def build_bvh(self):
+        if self.bvh is None:
+            corners = self.vertices[self.faces]
+            self.bvh = BVH(corners.min(axis=1), corners.max(axis=1))
+        return self.bvh
+
+    def closest_hit_batch(self, origins, directions, t_max=None):
+        # Returns (triangle, dist) arrays, triangle is -1 on a miss
+        def intersect_pairs(tris, ids):
+            return intersect_triangles(self.v0[tris], self.e1[tris], self.e2[tris], origins[ids], directions[ids])
+        return self.build_bvh().closest_hit_batch(origins, directions, intersect_pairs, t_max)
+
+    def intersect(self, ray):
+        ray6 = (*vec3.vec(ray.origin), *vec3.vec(ray.direction))
+        v0, e1, e2 = self.v0, self.e1, self.e2
+        return self.build_bvh().closest_hit(
+            ray.origin, ray.direction, lambda p: _hit_triangle(ray6, (*v0[p].tolist(), *e1[p].tolist(), *e2[p].tolist())))[1]
+
+    def intersect_batch(self, origins, directions):
+        return self.closest_hit_batch(origins, directions)[1]
+
+    def occludes(self, ray, t_max):
+        ray6 = (*vec3.vec(ray.origin), *vec3.vec(ray.direction))
+        v0, e1, e2 = self.v0, self.e1, self.e2
+        return self.build_bvh().any_hit(
+            ray.origin, ray.direction, lambda p: _hit_triangle(ray6, (*v0[p].tolist(), *e1[p].tolist(), *e2[p].tolist())), t_max)
+
+    def occluded_batch(self, origins, directions, t_max):
+        def intersect_pairs(tris, ids):
+            return intersect_triangles(self.v0[tris], self.e1[tris], self.e2[tris], origins[ids], directions[ids])
+        return self.build_bvh().any_hit_batch(origins, directions, intersect_pairs, t_max)
+
+    def normal_at(self, point):
+        # Face normal of the triangle `point` lies on (the per-object tracer only passes a
+        # hit point); a linear scan, the packed Scene looks normals up by triangle instead
+        s = point - self.v0
+        n = cross_rows(self.e1, self.e2)
+        nn = dot_rows(n, n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = dot_rows(cross_rows(s, self.e2), n) / nn
+            v = dot_rows(cross_rows(self.e1, s), n) / nn
+            off_plane = np.abs(dot_rows(s, self.face_normals))
+        off_plane[~((u >= -1e-9) & (v >= -1e-9) & (u + v <= 1 + 1e-9))] = np.inf
+        return self.face_normals[np.argmin(off_plane)]
+
+class AcceleratedScene(list):
+    # Drop-in replacement for the objects list: spheres go into a BVH, unbounded
+    # planes stay in a flat list. Build it once the scene is final; later edits
+    # to the list are not picked up by the BVH. A prebuilt bvh (e.g. from the
+    # scene cache) must have been built over the same spheres in the same order.
+    def __init__(self, objects, bvh=None):
+        super().__init__(objects)
+        self.spheres = [obj for obj in self if isinstance(obj, Sphere)]
+        self.sphere_ids = np.array([i for i, obj in enumerate(self) if isinstance(obj, Sphere)], dtype=int)
+        self.others = [(i, obj) for i, obj in enumerate(self) if not isinstance(obj, Sphere)]
+
+        self.centers = np.array([s.center for s in self.spheres], dtype=float).reshape(-1, 3)
+        self.radii = np.array([s.radius for s in self.spheres], dtype=float)
+        extent = self.radii[:, None]
+        self.bvh = bvh if bvh is not None else BVH(self.centers - extent, self.centers + extent)
+        self.packed = None  # compile_scene() result, built on first use
+
+    def closest_hit(self, ray, counts=None):
+        spheres = self.spheres
+        prim, closest_dist = self.bvh.closest_hit(ray.origin, ray.direction, lambda p: spheres[p].intersect(ray),
+                                                  counts=counts)
+        closest_obj = spheres[prim] if prim >= 0 else None
+
+        if counts is not None:
+            counts[0] += len(self.others)
+        for _, obj in self.others:
+            dist = obj.intersect(ray)
+            if dist < closest_dist:
+                closest_dist = dist
+                closest_obj = obj
+
+        return closest_obj, closest_dist
+
+    def closest_hit_batch(self, origins, directions):
+        def intersect_pairs(prims, ids):
+            return intersect_spheres(self.centers[prims], self.radii[prims], origins[ids], directions[ids])
+
+        prim, closest_dist = self.bvh.closest_hit_batch(origins, directions, intersect_pairs)
+        closest_idx = np.full(len(directions), -1)
+        closest_idx[prim >= 0] = self.sphere_ids[prim[prim >= 0]]
+
+        for i, obj in self.others:
+            dist = obj.intersect_batch(origins, directions)
+            closer = dist < closest_dist
+            closest_dist[closer] = dist[closer]
+            closest_idx[closer] = i
+
+        return closest_idx, closest_dist
+
+    def any_hit(self, ray, t_max, counts=None):
+        for _, obj in self.others:
+            if counts is not None:
+                counts[0] += 1
+            if obj.occludes(ray, t_max):
+                return True
+        spheres = self.spheres
+        return self.bvh.any_hit(ray.origin, ray.direction, lambda p: spheres[p].intersect(ray), t_max, counts)
+
+    def any_hit_batch(self, origins, directions, t_max):
+        # Planes first: they are cheap and block a lot of shadow rays on their own
+        occluded = np.zeros(len(directions), dtype=bool)
+        for _, obj in self.others:
+            open_ids = np.flatnonzero(~occluded)
+            occluded[open_ids] = obj.occluded_batch(origins[open_ids], directions[open_ids], t_max[open_ids])
+
+        open_ids = np.flatnonzero(~occluded)
+        o, d = origins[open_ids], directions[open_ids]
+
+        def intersect_pairs(prims, ids):
+            return intersect_spheres(self.centers[prims], self.radii[prims], o[ids], d[ids])
+
+        occluded[open_ids] = self.bvh.any_hit_batch(o, d, intersect_pairs, t_max[open_ids])
+        return occluded
+
+# --- Packed Scene ---
+
+class Scene:
+    # Structure-of-arrays form of a scene that the tracers consume: one contiguous
+    # array per attribute and materials by index. Primitives are numbered spheres
+    # first, then planes, then the triangles of all meshes (from mesh_start on), so the
+    # kind of a prim is a range check rather than an isinstance. Mesh faces index into
+    # that mesh's slice of mesh_vertices; both are concatenated over meshes, with
+    # mesh_vertex_offsets/mesh_face_offsets (length meshes + 1) marking the slices.
+    # Build it from the authoring classes with compile_scene() or Scene.from_objects(),
+    # or load it from a file with scene.load_scene().
+    def __init__(self, material_names, material_colors, material_params,
+                 sphere_centers, sphere_radii, sphere_materials,
+                 plane_points, plane_normals, plane_materials,
+                 light_positions=(), light_colors=(), camera=(0, 0, 0), bvh=None,
+                 mesh_vertices=(), mesh_faces=(), mesh_vertex_offsets=(0,), mesh_face_offsets=(0,),
+                 mesh_materials=(), mesh_bvhs=None):
+        self.material_names = list(material_names)
+        self.material_colors = np.asarray(material_colors, dtype=float).reshape(-1, 3)
+        self.material_params = {name: np.asarray(material_params[name], dtype=float).reshape(-1) for name in MATERIAL_PARAMS}
+        self.sphere_centers = np.asarray(sphere_centers, dtype=float).reshape(-1, 3)
+        self.sphere_radii = np.asarray(sphere_radii, dtype=float).reshape(-1)
+        self.sphere_materials = np.asarray(sphere_materials, dtype=int).reshape(-1)
+        self.plane_points = np.asarray(plane_points, dtype=float).reshape(-1, 3)
+        self.plane_normals = np.asarray(plane_normals, dtype=float).reshape(-1, 3)
+        self.plane_materials = np.asarray(plane_materials, dtype=int).reshape(-1)
+        self.light_positions = np.asarray(light_positions, dtype=float).reshape(-1, 3)
+        self.light_colors = np.asarray(light_colors, dtype=float).reshape(-1, 3)
+        self.camera = np.asarray(camera, dtype=float)
+        self.mesh_vertices = np.asarray(mesh_vertices, dtype=float).reshape(-1, 3)
+        self.mesh_faces = np.asarray(mesh_faces, dtype=int).reshape(-1, 3)
+        self.mesh_vertex_offsets = np.asarray(mesh_vertex_offsets, dtype=int).reshape(-1)
+        self.mesh_face_offsets = np.asarray(mesh_face_offsets, dtype=int).reshape(-1)
+        self.mesh_materials = np.asarray(mesh_materials, dtype=int).reshape(-1)
+        self.use_bvh = None  # None picks by sphere count, True/False forces it (meshes always use theirs)
+
+        self.num_spheres = len(self.sphere_centers)
+        self.mesh_start = self.num_spheres + len(self.plane_points)
+        self.materials_changed()
+        self.geometry_changed()
+        self.bvh = bvh
+        if mesh_bvhs is not None:
+            self.mesh_bvhs = list(mesh_bvhs)
+
+    def materials_changed(self):
+        # Call after editing material colors/params or prim material indices in place
+        triangle_materials = np.repeat(self.mesh_materials, np.diff(self.mesh_face_offsets))
+        self.prim_materials = np.concatenate([self.sphere_materials, self.plane_materials, triangle_materials])
+        self._prim_material_list = self.prim_materials[:self.mesh_start].tolist()
+        self._kernel_data = None
+        self._material_tuples = [
+            (tuple(color), *(float(self.material_params[name][i]) for name in MATERIAL_PARAMS))
+            for i, color in enumerate(self.material_colors.tolist())
+        ]
+
+    def geometry_changed(self, refit=False):
+        # Call after moving or resizing spheres/planes or moving mesh vertices in place;
+        # the BVHs are rebuilt on next use. refit=True refits the BVHs built so far
+        # instead (see BVH.refit), which is much cheaper for small per-frame motions.
+        self._sphere_tuples = [(*c, r) for c, r in zip(self.sphere_centers.tolist(), self.sphere_radii.tolist())]
+        self._plane_tuples = [(*p, *n) for p, n in zip(self.plane_points.tolist(), self.plane_normals.tolist())]
+        self._kernel_data = None
+        if refit and self.bvh is not None:
+            extent = self.sphere_radii[:, None]
+            self.bvh.refit(self.sphere_centers - extent, self.sphere_centers + extent)
+        else:
+            self.bvh = None
+
+        # Triangles of all meshes with global vertex indices, as corner + edges
+        vertex_base = np.repeat(self.mesh_vertex_offsets[:-1], np.diff(self.mesh_face_offsets))
+        self.tri_v0, self.tri_e1, self.tri_e2 = triangle_edges(self.mesh_vertices, self.mesh_faces + vertex_base[:, None])
+        self.tri_normals = normalize_rows(cross_rows(self.tri_e1, self.tri_e2))
+        self._tri_data = np.concatenate([self.tri_v0, self.tri_e1, self.tri_e2], axis=1)
+        if refit:
+            for i, bvh in enumerate(self.mesh_bvhs):
+                if bvh is not None:
+                    corners = self._mesh_corners(i)
+                    bvh.refit(corners.min(axis=1), corners.max(axis=1))
+        else:
+            self.mesh_bvhs = [None] * len(self.mesh_materials)
+
+    @classmethod
+    def from_objects(cls, objects, lights=(), camera_pos=(0, 0, 0)):
+        # Pack Sphere/Plane instances; shared Material instances become one material index
+        materials = []
+        index = {}
+        for obj in objects:
+            if id(obj.material) not in index:
+                index[id(obj.material)] = len(materials)
+                materials.append(obj.material)
+        spheres = [obj for obj in objects if isinstance(obj, Sphere)]
+        planes = [obj for obj in objects if isinstance(obj, Plane)]
+        meshes = [obj for obj in objects if isinstance(obj, TriangleMesh)]
+
+        # An AcceleratedScene's BVH indexes its spheres in this same order
+        bvh = objects.bvh if isinstance(objects, AcceleratedScene) else None
+        return cls(
+            [f'material{i}' for i in range(len(materials))],
+            [m.color for m in materials],
+            {name: [getattr(m, name) for m in materials] for name in MATERIAL_PARAMS},
+            [s.center for s in spheres], [s.radius for s in spheres], [index[id(s.material)] for s in spheres],
+            [p.point for p in planes], [p.normal for p in planes], [index[id(p.material)] for p in planes],
+            [pos for pos, _ in lights], [color for _, color in lights], camera_pos, bvh,
+            np.concatenate([m.vertices for m in meshes]) if meshes else (),
+            np.concatenate([m.faces for m in meshes]) if meshes else (),
+            np.cumsum([0] + [len(m.vertices) for m in meshes]), np.cumsum([0] + [len(m.faces) for m in meshes]),
+            [index[id(m.material)] for m in meshes], [m.bvh for m in meshes],
+        )
+
+    def build_bvh(self):
+        if self.bvh is None:
+            extent = self.sphere_radii[:, None]
+            self.bvh = BVH(self.sphere_centers - extent, self.sphere_centers + extent)
+        return self.bvh
+
+    def build_mesh_bvh(self, i):
+        if self.mesh_bvhs[i] is None:
+            corners = self._mesh_corners(i)
+            self.mesh_bvhs[i] = BVH(corners.min(axis=1), corners.max(axis=1))
+        return self.mesh_bvhs[i]
+
+    def _mesh_corners(self, i):
+        # (faces, 3, 3) corner positions of mesh i
+        f0, f1 = self.mesh_face_offsets[i], self.mesh_face_offsets[i + 1]
+        return self.mesh_vertices[self.mesh_faces[f0:f1] + self.mesh_vertex_offsets[i]]
+
+    def kernel_data(self):
+        # Arrays for the compiled backend, packed on first use after a change (or a use_bvh flip)
+        if self._kernel_data is None or self._kernel_data[0] != self.uses_bvh():
+            self._kernel_data = (self.uses_bvh(), kernels.pack(self))
+        return self._kernel_data[1]
+
+    def uses_bvh(self):
+        if self.use_bvh is None:
+            return self.num_spheres > DENSE_LIMIT
+        return self.use_bvh
+
+    # --- Authoring-API views ---
+
+    def materials(self):
+        return [
+            Material(color, **{name: self.material_params[name][i] for name in MATERIAL_PARAMS})
+            for i, color in enumerate(self.material_colors)
+        ]
+
+    def objects(self):
+        # Sphere/Plane/TriangleMesh instances, spheres first in array order so the BVH indices line up
+        materials = self.materials()
+        objects = [Sphere(c, r, materials[m]) for c, r, m in zip(self.sphere_centers, self.sphere_radii, self.sphere_materials)]
+        objects += [Plane(p, n, materials[m]) for p, n, m in zip(self.plane_points, self.plane_normals, self.plane_materials)]
+        for i, m in enumerate(self.mesh_materials):
+            v0, v1 = self.mesh_vertex_offsets[i:i + 2]
+            f0, f1 = self.mesh_face_offsets[i:i + 2]
+            objects.append(TriangleMesh(self.mesh_vertices[v0:v1], self.mesh_faces[f0:f1], materials[m], self.mesh_bvhs[i]))
+        return AcceleratedScene(objects, self.build_bvh())
+
+    def lights(self):
+        return list(zip(self.light_positions, self.light_colors))
+
+    # --- Serialization ---
+
+    def to_arrays(self):
+        arrays = {
+            'material_names': np.array(self.material_names),
+            'material_colors': self.material_colors,
+            'sphere_centers': self.sphere_centers, 'sphere_radii': self.sphere_radii,
+            'sphere_materials': self.sphere_materials,
+            'plane_points': self.plane_points, 'plane_normals': self.plane_normals,
+            'plane_materials': self.plane_materials,
+            'light_positions': self.light_positions, 'light_colors': self.light_colors,
+            'camera': self.camera,
+            'mesh_vertices': self.mesh_vertices, 'mesh_faces': self.mesh_faces,
+            'mesh_vertex_offsets': self.mesh_vertex_offsets, 'mesh_face_offsets': self.mesh_face_offsets,
+            'mesh_materials': self.mesh_materials,
+        }
+        arrays.update({'material_' + name: values for name, values in self.material_params.items()})
+        return arrays
+
+    def bvh_arrays(self):
+        # All BVHs (built if needed) as arrays for to_arrays()-style storage:
+        # bvh_* for the spheres, mesh<i>_bvh_* per mesh
+        arrays = {'bvh_' + name: values for name, values in self.build_bvh().to_arrays().items()}
+        for i in range(len(self.mesh_materials)):
+            arrays.update({f'mesh{i}_bvh_' + name: values for name, values in self.build_mesh_bvh(i).to_arrays().items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        def stored_bvh(prefix):
+            if prefix + 'node_lo' not in arrays:
+                return None
+            return BVH.from_arrays({name[len(prefix):]: arrays[name] for name in arrays if name.startswith(prefix)})
+
+        num_meshes = len(arrays.get('mesh_materials', ()))
+        return cls(
+            [str(name) for name in arrays['material_names']], arrays['material_colors'],
+            {name: arrays['material_' + name] for name in MATERIAL_PARAMS},
+            arrays['sphere_centers'], arrays['sphere_radii'], arrays['sphere_materials'],
+            arrays['plane_points'], arrays['plane_normals'], arrays['plane_materials'],
+            arrays['light_positions'], arrays['light_colors'], arrays['camera'], stored_bvh('bvh_'),
+            arrays.get('mesh_vertices', ()), arrays.get('mesh_faces', ()),
+            arrays.get('mesh_vertex_offsets', (0,)), arrays.get('mesh_face_offsets', (0,)),
+            arrays.get('mesh_materials', ()), [stored_bvh(f'mesh{i}_bvh_') for i in range(num_meshes)],
+        )
+
+    # --- Scalar queries (one ray) ---
+    # Plain float math on tuples (see vec3); pass origin/direction as float tuples for speed.
+    # counts is optional instrumentation, see bvh.py; the flat loops count their tests
+    # through local counting copies of the hit functions, the BVHs count their own.
+
+    def closest_hit(self, origin, direction, counts=None):
+        # Returns (prim, dist), prim is -1 on a miss
+        ray = (*origin, *direction)
+        spheres = self._sphere_tuples
+        prim, best = -1, float('inf')
+        hit_sphere, hit_plane = _hit_sphere, _hit_plane
+        if counts is not None:
+            hit_sphere, hit_plane = _counted(_hit_sphere, counts), _counted(_hit_plane, counts)
+
+        if self.uses_bvh():
+            prim, best = self.build_bvh().closest_hit(origin, direction, lambda p: _hit_sphere(ray, spheres[p]),
+                                                      counts=counts)
+        else:
+            for i, sphere in enumerate(spheres):
+                t = hit_sphere(ray, sphere)
+                if t < best:
+                    prim, best = i, t
+
+        for i, plane in enumerate(self._plane_tuples):
+            t = hit_plane(ray, plane)
+            if t < best:
+                prim, best = self.num_spheres + i, t
+
+        tris = self._tri_data
+        for i, offset in enumerate(self.mesh_face_offsets[:-1].tolist()):
+            tri, t = self.build_mesh_bvh(i).closest_hit(
+                origin, direction, lambda p: _hit_triangle(ray, tris[offset + p].tolist()), best, counts)
+            if tri >= 0:
+                prim, best = self.mesh_start + offset + tri, t
+
+        return prim, best
+
+    def any_hit(self, origin, direction, t_max, counts=None):
+        ray = (*origin, *direction)
+        hit_sphere, hit_plane = _hit_sphere, _hit_plane
+        if counts is not None:
+            hit_sphere, hit_plane = _counted(_hit_sphere, counts), _counted(_hit_plane, counts)
+        for plane in self._plane_tuples:
+            if hit_plane(ray, plane) < t_max:
+                return True
+
+        spheres = self._sphere_tuples
+        if self.uses_bvh():
+            if self.build_bvh().any_hit(origin, direction, lambda p: _hit_sphere(ray, spheres[p]), t_max, counts):
+                return True
+        else:
+            for sphere in spheres:
+                if hit_sphere(ray, sphere) < t_max:
+                    return True
+
+        tris = self._tri_data
+        for i, offset in enumerate(self.mesh_face_offsets[:-1].tolist()):
+            if self.build_mesh_bvh(i).any_hit(origin, direction, lambda p: _hit_triangle(ray, tris[offset + p].tolist()),
+                                              t_max, counts):
+                return True
+        return False
+
+    # Triangles are shaded from whichever side the ray arrives: winding in real assets
+    # is unreliable, so with a ray direction given their normal is flipped to face it.
+
+    def normal(self, prim, point, direction=None):
+        if prim < self.num_spheres:
+            return normalize(point - self.sphere_centers[prim])
+        if prim >= self.mesh_start:
+            normal = self.tri_normals[prim - self.mesh_start]
+            return -normal if direction is not None and np.dot(normal, direction) > 0 else normal
+        return self.plane_normals[prim - self.num_spheres]
+
+    def normal_tuple(self, prim, point, direction=None):
+        # normal() for float-tuple points (vec3)
+        if prim < self.num_spheres:
+            return vec3.normalize(vec3.sub(point, self._sphere_tuples[prim][:3]))
+        if prim >= self.mesh_start:
+            normal = tuple(self.tri_normals[prim - self.mesh_start].tolist())
+            return vec3.scale(normal, -1.0) if direction is not None and vec3.dot(normal, direction) > 0 else normal
+        return self._plane_tuples[prim - self.num_spheres][3:]
+
+    def prim_material_tuple(self, prim):
+        # (color, ambient, diffuse, specular, shininess, reflection) as Python floats
+        if prim >= self.mesh_start:
+            return self._material_tuples[int(self.prim_materials[prim])]
+        return self._material_tuples[self._prim_material_list[prim]]
+
+    # --- Batched queries ((N, 3) arrays of rays) ---
+
+    def closest_hit_batch(self, origins, directions, counts=None):
+        # Returns (prim, dist) arrays, prim is -1 on a miss. counts (N, 2) is optional
+        # instrumentation (see bvh.py) and keeps the query on the NumPy path.
+        if BACKEND == 'numba' and counts is None:
+            return kernels.closest_hit(self.kernel_data(), origins, directions)
+        if self.uses_bvh():
+            def intersect_pairs(prims, ids):
+                return intersect_spheres(self.sphere_centers[prims], self.sphere_radii[prims], origins[ids], directions[ids])
+            prim, best = self.build_bvh().closest_hit_batch(origins, directions, intersect_pairs, counts=counts)
+        else:
+            if counts is not None:
+                counts[:, 0] += self.num_spheres
+            prim = np.full(len(directions), -1)
+            best = np.full(len(directions), np.inf)
+            for i in range(self.num_spheres):
+                dist = intersect_spheres(self.sphere_centers[i], self.sphere_radii[i], origins, directions)
+                closer = dist < best
+                best[closer] = dist[closer]
+                prim[closer] = i
+
+        if counts is not None:
+            counts[:, 0] += len(self.plane_points)
+        for i in range(len(self.plane_points)):
+            dist = intersect_planes(self.plane_points[i], self.plane_normals[i], origins, directions)
+            closer = dist < best
+            best[closer] = dist[closer]
+            prim[closer] = self.num_spheres + i
+
+        for i, offset in enumerate(self.mesh_face_offsets[:-1]):
+            tri, best = self.build_mesh_bvh(i).closest_hit_batch(
+                origins, directions, self._triangle_pairs(offset, origins, directions), best, counts)
+            closer = tri >= 0
+            prim[closer] = self.mesh_start + offset + tri[closer]
+
+        return prim, best
+
+    def _triangle_pairs(self, offset, origins, directions):
+        # BVH intersect_pairs callback for the mesh whose triangles start at `offset`
+        def intersect_pairs(tris, ids):
+            tris = tris + offset
+            return intersect_triangles(self.tri_v0[tris], self.tri_e1[tris], self.tri_e2[tris], origins[ids], directions[ids])
+        return intersect_pairs
+
+    def any_hit_batch(self, origins, directions, t_max, counts=None):
+        # Planes first: they are cheap and block a lot of shadow rays on their own.
+        # Rays leave the test as soon as something blocks them.
+        if BACKEND == 'numba' and counts is None:
+            return kernels.any_hit(self.kernel_data(), origins, directions, t_max)
+        t_max = np.broadcast_to(t_max, (len(directions),))
+        occluded = np.zeros(len(directions), dtype=bool)
+        if counts is not None:
+            counts[:, 0] += len(self.plane_points)
+        for i in range(len(self.plane_points)):
+            occluded |= intersect_planes(self.plane_points[i], self.plane_normals[i], origins, directions) < t_max
+
+        open_ids = np.flatnonzero(~occluded)
+        o, d = origins[open_ids], directions[open_ids]
+        if self.uses_bvh():
+            def intersect_pairs(prims, ids):
+                return intersect_spheres(self.sphere_centers[prims], self.sphere_radii[prims], o[ids], d[ids])
+            sub = None if counts is None else np.zeros((len(open_ids), 2), dtype=counts.dtype)
+            occluded[open_ids] = self.build_bvh().any_hit_batch(o, d, intersect_pairs, t_max[open_ids], sub)
+            if counts is not None:
+                counts[open_ids] += sub
+        else:
+            for i in range(self.num_spheres):
+                if counts is not None:
+                    counts[open_ids, 0] += 1
+                blocked = intersect_spheres(self.sphere_centers[i], self.sphere_radii[i], o, d) < t_max[open_ids]
+                occluded[open_ids[blocked]] = True
+                keep = ~blocked
+                open_ids, o, d = open_ids[keep], o[keep], d[keep]
+
+        for i, offset in enumerate(self.mesh_face_offsets[:-1]):
+            open_ids = np.flatnonzero(~occluded)
+            o, d = origins[open_ids], directions[open_ids]
+            sub = None if counts is None else np.zeros((len(open_ids), 2), dtype=counts.dtype)
+            occluded[open_ids] = self.build_mesh_bvh(i).any_hit_batch(
+                o, d, self._triangle_pairs(offset, o, d), t_max[open_ids], sub)
+            if counts is not None:
+                counts[open_ids] += sub
+        return occluded
+
+    def prim_distances(self, prim, origins, directions):
+        # Hit distances of a batch of rays against the single primitive `prim`
+        if prim < self.num_spheres:
+            return intersect_spheres(self.sphere_centers[prim], self.sphere_radii[prim], origins, directions)
+        if prim >= self.mesh_start:
+            i = prim - self.mesh_start
+            return intersect_triangles(self.tri_v0[i], self.tri_e1[i], self.tri_e2[i], origins, directions)
+        i = prim - self.num_spheres
+        return intersect_planes(self.plane_points[i], self.plane_normals[i], origins, directions)
+
+    def normals_batch(self, prim, points, directions=None):
+        normals = np.empty_like(points)
+        sphere_hit = prim < self.num_spheres
+        triangle_hit = prim >= self.mesh_start
+        plane_hit = ~sphere_hit & ~triangle_hit
+        normals[sphere_hit] = normalize_rows(points[sphere_hit] - self.sphere_centers[prim[sphere_hit]])
+        normals[plane_hit] = self.plane_normals[prim[plane_hit] - self.num_spheres]
+        normals[triangle_hit] = self.tri_normals[prim[triangle_hit] - self.mesh_start]
+        if directions is not None and triangle_hit.any():
+            n = normals[triangle_hit]
+            n[dot_rows(n, directions[triangle_hit]) > 0] *= -1
+            normals[triangle_hit] = n
+        return normals
+
+def _counted(hit, counts):
+    # hit function that also counts its calls in counts[0] (instrumentation)
+    def counted(*args):
+        counts[0] += 1
+        return hit(*args)
+    return counted
+
+def _hit_sphere(ray, sphere):
+    # Sphere.intersect on floats; ray is (ox, oy, oz, dx, dy, dz), sphere (cx, cy, cz, r)
+    ox, oy, oz, dx, dy, dz = ray
+    cx, cy, cz, r = sphere
+    ocx, ocy, ocz = ox - cx, oy - cy, oz - cz
+    a = dx * dx + dy * dy + dz * dz
+    b = 2.0 * (ocx * dx + ocy * dy + ocz * dz)
+    c = ocx * ocx + ocy * ocy + ocz * ocz - r * r
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return float('inf')
+    sqrt_disc = math.sqrt(discriminant)
+    dist1 = (-b - sqrt_disc) / (2 * a)
+    if dist1 > 0.001:
+        return dist1
+    dist2 = (-b + sqrt_disc) / (2 * a)
+    if dist2 > 0.001:
+        return dist2
+    return float('inf')
+
+def _hit_plane(ray, plane):
+    # Plane.intersect on floats; plane is (px, py, pz, nx, ny, nz)
+    ox, oy, oz, dx, dy, dz = ray
+    px, py, pz, nx, ny, nz = plane
+    denom = dx * nx + dy * ny + dz * nz
+    if abs(denom) > 1e-6:
+        t = ((px - ox) * nx + (py - oy) * ny + (pz - oz) * nz) / denom
+        if t > 0.001:
+            return t
+    return float('inf')
+
+def _hit_triangle(ray, tri):
+    # intersect_triangles for one ray; tri is (v0, e1, e2) flattened to 9 floats
+    ox, oy, oz, dx, dy, dz = ray
+    ax, ay, az, e1x, e1y, e1z, e2x, e2y, e2z = tri
+    px, py, pz = dy * e2z - dz * e2y, dz * e2x - dx * e2z, dx * e2y - dy * e2x
+    det = e1x * px + e1y * py + e1z * pz
+    if abs(det) <= 1e-12:
+        return float('inf')
+    inv = 1.0 / det
+    sx, sy, sz = ox - ax, oy - ay, oz - az
+    u = (sx * px + sy * py + sz * pz) * inv
+    if u < 0 or u > 1:
+        return float('inf')
+    qx, qy, qz = sy * e1z - sz * e1y, sz * e1x - sx * e1z, sx * e1y - sy * e1x
+    v = (dx * qx + dy * qy + dz * qz) * inv
+    if v < 0 or u + v > 1:
+        return float('inf')
+    t = (e2x * qx + e2y * qy + e2z * qz) * inv
+    return t if t > 0.001 else float('inf')
+
+def compile_scene(objects):
+    # Packed form of an objects list; an AcceleratedScene keeps its packed copy (and BVH)
+    if isinstance(objects, Scene):
+        return objects
+    if isinstance(objects, AcceleratedScene):
+        if objects.packed is None:
+            objects.packed = Scene.from_objects(objects)
+        return objects.packed
+    return Scene.from_objects(objects)
+
 # --- Ray Tracer Engine ---
 
-def get_closest_object(ray, objects):
+def get_closest_object(ray, objects, counts=None):
+    # counts: optional [tests, nodes] instrumentation, see bvh.py
+    if isinstance(objects, AcceleratedScene):
+        return objects.closest_hit(ray, counts)
+
     closest_dist = float('inf')
     closest_obj = None
+    if counts is not None:
+        counts[0] += len(objects)
     
     for obj in objects:
         dist = obj.intersect(ray)
@@ -86,11 +807,30 @@ def get_closest_object(ray, objects):
             
     return closest_obj, closest_dist
 
-def trace_ray(ray, objects, lights, depth):
-    if depth > 3:
+def is_occluded(ray, objects, t_max, counts=None):
+    # Shadow query: stops at the first object closer than t_max
+    if isinstance(objects, AcceleratedScene):
+        return objects.any_hit(ray, t_max, counts)
+
+    for obj in objects:
+        if counts is not None:
+            counts[0] += 1
+        if obj.occludes(ray, t_max):
+            return True
+    return False
+
+def trace_ray(ray, objects, lights, depth, stats=None):
+    # stats: optional RayStats, every scene query then gets counted and timed
+    if isinstance(objects, Scene):
+        return trace_ray_packed(ray, objects, lights, depth, stats)
+    if depth > MAX_DEPTH:
         return np.zeros(3)
 
-    closest_obj, closest_dist = get_closest_object(ray, objects)
+    if stats is None:
+        closest_obj, closest_dist = get_closest_object(ray, objects)
+    else:
+        closest_obj, closest_dist = stats.query('primary' if depth == 0 else 'reflection', depth,
+                                                get_closest_object, ray, objects)
 
     if closest_obj is None:
         return np.zeros(3) # Background color (black)
@@ -98,11 +838,13 @@ def trace_ray(ray, objects, lights, depth):
     # Hit point and normal
     hit_point = ray.origin + ray.direction * closest_dist
     
-    # Handle normal calculation differently for Plane vs Sphere
+    # Handle normal calculation differently for Plane/TriangleMesh vs Sphere
     if isinstance(closest_obj, Sphere):
         normal = closest_obj.normal(hit_point)
-    else: # Plane
+    else: # Plane or TriangleMesh
         normal = closest_obj.normal_at(hit_point)
+        if isinstance(closest_obj, TriangleMesh) and np.dot(normal, ray.direction) > 0:
+            normal = -normal  # two-sided, see Scene.normal
 
     # Nudge hit point slightly along normal to avoid self-intersection artifacts
     hit_point = hit_point + normal * 1e-4
@@ -120,10 +862,13 @@ def trace_ray(ray, objects, lights, depth):
         
         # Shadow check
         shadow_ray = Ray(hit_point, to_light)
-        shadow_obj, shadow_dist = get_closest_object(shadow_ray, objects)
-        
+
         # If no object is blocking the light (or object is further than the light)
-        if shadow_dist >= dist_to_light:
+        if stats is None:
+            occluded = is_occluded(shadow_ray, objects, dist_to_light)
+        else:
+            occluded = stats.query('shadow', depth, is_occluded, shadow_ray, objects, dist_to_light)
+        if not occluded:
             # Diffuse
             illumination = max(0, np.dot(normal, to_light))
             color += material.color * material.diffuse * illumination * light_color
@@ -138,20 +883,471 @@ def trace_ray(ray, objects, lights, depth):
     if material.reflection > 0:
         reflected_dir = normalize(ray.direction - 2 * np.dot(ray.direction, normal) * normal)
         reflected_ray = Ray(hit_point, reflected_dir)
-        reflected_color = trace_ray(reflected_ray, objects, lights, depth + 1)
+        reflected_color = trace_ray(reflected_ray, objects, lights, depth + 1, stats)
         color = color * (1 - material.reflection) + reflected_color * material.reflection
 
     return np.clip(color, 0, 1)
 
-# --- Main Configuration & Loop ---
+def trace_ray_packed(ray, scene, lights, depth, stats=None):
+    # trace_ray on a packed Scene: hits are primitive indices, materials are table
+    # lookups and all vector math runs on float tuples (vec3)
+    lights = [(vec3.vec(pos), vec3.vec(color)) for pos, color in lights]
+    color = _trace_tuple(vec3.vec(ray.origin), vec3.vec(ray.direction), scene, lights, depth, stats)
+    return np.array(color)
 
-def main():
-    WIDTH, HEIGHT = 400, 300 # Low res for performance in pure Python
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Mini Ray Tracer")
+def _trace_tuple(origin, direction, scene, lights, depth, stats=None):
+    if depth > MAX_DEPTH:
+        return vec3.ZERO
+
+    if stats is None:
+        prim, closest_dist = scene.closest_hit(origin, direction)
+    else:
+        prim, closest_dist = stats.query('primary' if depth == 0 else 'reflection', depth,
+                                         scene.closest_hit, origin, direction)
+
+    if prim < 0:
+        return vec3.ZERO # Background color (black)
+
+    # Hit point and normal
+    hit_point = vec3.madd(origin, direction, closest_dist)
+    normal = scene.normal_tuple(prim, hit_point, direction)
+
+    # Nudge hit point slightly along normal to avoid self-intersection artifacts
+    hit_point = vec3.madd(hit_point, normal, 1e-4)
+
+    mat_color, ambient, diffuse, specular, shininess, reflection = scene.prim_material_tuple(prim)
+
+    # Ambient
+    color = vec3.scale(mat_color, ambient)
+
+    # Lights (Diffuse + Specular + Shadows)
+    for light_pos, light_color in lights:
+        to_light = vec3.sub(light_pos, hit_point)
+        dist_to_light = vec3.length(to_light)
+        to_light = vec3.normalize(to_light)
+
+        # If no object is blocking the light (or object is further than the light)
+        if stats is None:
+            occluded = scene.any_hit(hit_point, to_light, dist_to_light)
+        else:
+            occluded = stats.query('shadow', depth, scene.any_hit, hit_point, to_light, dist_to_light)
+        if not occluded:
+            # Diffuse
+            n_dot_l = vec3.dot(normal, to_light)
+            illumination = max(0, n_dot_l)
+            color = vec3.madd_mul(color, mat_color, light_color, diffuse * illumination)
+
+            # Specular
+            to_camera = vec3.normalize(vec3.sub(origin, hit_point))
+            reflected_light = vec3.normalize(vec3.sub(vec3.scale(normal, 2 * n_dot_l), to_light))
+            spec = max(0, vec3.dot(reflected_light, to_camera)) ** shininess
+            color = vec3.madd(color, light_color, specular * spec)
+
+    # Reflection (Recursive)
+    if reflection > 0:
+        reflected_dir = vec3.normalize(vec3.reflect(direction, normal))
+        reflected_color = _trace_tuple(hit_point, reflected_dir, scene, lights, depth + 1, stats)
+        color = vec3.lerp(color, reflected_color, reflection)
+
+    return vec3.clip01(color)
+
+# --- Batched Ray Tracer ---
+# Same shading model as trace_ray, but every stage works on (N, 3) arrays of rays.
+
+class RayStats:
+    # Opt-in instrumentation for the tracers (trace_ray, trace_rays, render_batched and
+    # the tile renderer take one as stats=...). Counts rays per kind and bounce depth
+    # and times the scene queries per kind. With detailed=True it also counts
+    # intersection tests and BVH nodes visited and, in the batched tracer, charges them
+    # to the pixel each ray came from for heatmap(); those counts need the NumPy query
+    # path. Passing one makes trace_rays take the wavefront path even on the compiled
+    # backend, so the kinds can be told apart. Without one none of this runs.
+    KINDS = ('primary', 'reflection', 'shadow')
+
+    def __init__(self, detailed=False):
+        self.detailed = detailed
+        self.rays = dict.fromkeys(self.KINDS, 0)
+        self.seconds = dict.fromkeys(self.KINDS, 0.0)
+        self.depth_rays = {kind: [] for kind in self.KINDS}  # rays per bounce depth
+        self.tests = dict.fromkeys(self.KINDS, 0)
+        self.nodes = dict.fromkeys(self.KINDS, 0)
+        self.shadow_early_exits = 0  # shadow rays that stopped at their first blocker
+        self.tile_seconds = []       # (tile, seconds) from the tile renderer
+        self.cost_windows = []       # (window, per-pixel tests + nodes) pieces of the heatmap
+        # Set by the batched tracer while it records: the bounce depth, the primary ray
+        # each active ray descends from and the cost charged to every primary ray
+        self.depth, self.roots, self.ray_cost = 0, None, None
+
+    def record(self, kind, num_rays, seconds, counts=None, occluded=None):
+        # One scene query over num_rays rays; counts are its (tests, nodes) per ray and
+        # occluded its shadow results
+        self.rays[kind] += num_rays
+        self.seconds[kind] += seconds
+        depth_rays = self.depth_rays[kind]
+        depth_rays.extend([0] * (self.depth + 1 - len(depth_rays)))
+        depth_rays[self.depth] += num_rays
+        if occluded is not None:
+            self.shadow_early_exits += int(np.count_nonzero(occluded))
+        if counts is not None:
+            counts = np.asarray(counts).reshape(-1, 2)
+            self.tests[kind] += int(counts[:, 0].sum())
+            self.nodes[kind] += int(counts[:, 1].sum())
+            if self.roots is not None and len(self.roots):
+                # Shadow batches are (lights, hits) flattened; fold them onto the hits.
+                # A bounce where nothing was hit has no cost to charge
+                cost = counts.sum(axis=1).reshape(-1, len(self.roots)).sum(axis=0)
+                self.ray_cost += np.bincount(self.roots, weights=cost, minlength=len(self.ray_cost))
+
+    def query(self, kind, depth, query, *args):
+        # Runs one scalar scene query (which must take counts=) and records it
+        counts = [0, 0]
+        start = time.perf_counter()
+        result = query(*args, counts=counts)
+        self.depth, self.roots = depth, None
+        self.record(kind, 1, time.perf_counter() - start, counts, occluded=[result] if kind == 'shadow' else None)
+        return result
+
+    def merge(self, other):
+        # Adds another RayStats (e.g. one tile's) into this one
+        for kind in self.KINDS:
+            self.rays[kind] += other.rays[kind]
+            self.seconds[kind] += other.seconds[kind]
+            self.tests[kind] += other.tests[kind]
+            self.nodes[kind] += other.nodes[kind]
+            mine, theirs = self.depth_rays[kind], other.depth_rays[kind]
+            mine.extend([0] * (len(theirs) - len(mine)))
+            for depth, rays in enumerate(theirs):
+                mine[depth] += rays
+        self.shadow_early_exits += other.shadow_early_exits
+        self.tile_seconds += other.tile_seconds
+        self.cost_windows += other.cost_windows
+
+    def rays_per_second(self):
+        return {kind: self.rays[kind] / self.seconds[kind] if self.seconds[kind] else 0.0 for kind in self.KINDS}
+
+    def heatmap(self, width, height):
+        # (height, width) intersection tests + BVH nodes per pixel, over all its rays
+        cost = np.zeros((height, width))
+        for (x0, y0, x1, y1), window_cost in self.cost_windows:
+            cost[y0:y1, x0:x1] += window_cost
+        return cost
+
+    def report(self):
+        lines = [f"{'kind':<11} {'rays':>10} {'query s':>8} {'rays/s':>9} {'tests/ray':>9} {'nodes/ray':>9}  rays per depth"]
+        rates = self.rays_per_second()
+        for kind in self.KINDS:
+            rays = max(self.rays[kind], 1)
+            lines.append(f"{kind:<11} {self.rays[kind]:>10} {self.seconds[kind]:>8.3f} {rates[kind]:>9.3g} "
+                         f"{self.tests[kind] / rays:>9.2f} {self.nodes[kind] / rays:>9.2f}  {self.depth_rays[kind]}")
+        lines.append(f"shadow early exits: {self.shadow_early_exits} of {self.rays['shadow']} shadow rays")
+        if self.tile_seconds:
+            seconds = [s for _, s in self.tile_seconds]
+            slowest_tile, slowest = max(self.tile_seconds, key=lambda t: t[1])
+            lines.append(f"tiles: {len(seconds)}, mean {np.mean(seconds) * 1000:.1f} ms, "
+                         f"slowest {slowest * 1000:.1f} ms at {slowest_tile}")
+        return '\n'.join(lines)
+
+def get_closest_object_batch(origins, directions, objects):
+    # Returns the index into objects of the closest hit per ray (-1 on a miss) and its distance
+    if isinstance(objects, AcceleratedScene):
+        return objects.closest_hit_batch(origins, directions)
+
+    closest_dist = np.full(len(directions), np.inf)
+    closest_idx = np.full(len(directions), -1)
+
+    for i, obj in enumerate(objects):
+        dist = obj.intersect_batch(origins, directions)
+        closer = dist < closest_dist
+        closest_dist[closer] = dist[closer]
+        closest_idx[closer] = i
+
+    return closest_idx, closest_dist
+
+def is_occluded_batch(origins, directions, objects, t_max):
+    # Batched shadow query; rays drop out of the test as soon as something blocks them
+    if isinstance(objects, AcceleratedScene):
+        return objects.any_hit_batch(origins, directions, t_max)
+
+    occluded = np.zeros(len(directions), dtype=bool)
+    for obj in objects:
+        open_ids = np.flatnonzero(~occluded)
+        if len(open_ids) == 0:
+            break
+        occluded[open_ids] = obj.occluded_batch(origins[open_ids], directions[open_ids], t_max[open_ids])
+    return occluded
+
+def light_directions(hit_points, light_pos):
+    # Unit directions and distances from every hit point to every light, shapes (L, N, 3) and (L, N)
+    to_light = light_pos[:, None, :] - hit_points[None, :, :]
+    dist_to_light = np.sqrt(np.einsum('lij,lij->li', to_light, to_light))
+    return normalize_rows(to_light.reshape(-1, 3)).reshape(to_light.shape), dist_to_light
+
+def light_visibility(scene, hit_points, to_light, dist_to_light, stats=None):
+    # (L, N) bool, True where the light is unblocked; one batch of L * N shadow rays
+    start = time.perf_counter()
+    shadow_origins = np.broadcast_to(hit_points, to_light.shape).reshape(-1, 3)
+    counts = np.zeros((len(shadow_origins), 2), dtype=int) if stats is not None and stats.detailed else None
+    occluded = scene.any_hit_batch(shadow_origins, to_light.reshape(-1, 3), dist_to_light.ravel(), counts)
+    if stats is not None:
+        stats.record('shadow', len(occluded), time.perf_counter() - start, counts, occluded)
+    return ~occluded.reshape(dist_to_light.shape)
+
+def shade_hits(origins, directions, prim, hit_points, normals, scene, lights, lit=None, stats=None):
+    # Local (non-reflected) Phong shading for a batch of hits; shadow rays for all lights go
+    # out together unless their visibility `lit` (L, N) is passed in
+    m = scene.prim_materials[prim]
+    params = scene.material_params
+    mat_color = scene.material_colors[m]
+    diffuse = params['diffuse'][m]
+    specular = params['specular'][m]
+    shininess = params['shininess'][m]
+
+    # Ambient
+    color = mat_color * params['ambient'][m][:, None]
+    if not lights:
+        return color
+
+    light_pos = np.array([pos for pos, _ in lights], dtype=float)
+    to_light, dist_to_light = light_directions(hit_points, light_pos)
+    if lit is None:
+        lit = light_visibility(scene, hit_points, to_light, dist_to_light, stats)
 
-    # Scene Setup
+    to_camera = normalize_rows(origins - hit_points)
+    for i, (_, light_color) in enumerate(lights):
+        # Diffuse
+        n_dot_l = dot_rows(normals, to_light[i])
+        illumination = np.maximum(0, n_dot_l) * lit[i]
+        color += mat_color * (diffuse * illumination)[:, None] * light_color
+
+        # Specular
+        reflected_light = normalize_rows(2 * n_dot_l[:, None] * normals - to_light[i])
+        spec = np.maximum(0, dot_rows(reflected_light, to_camera)) ** shininess * lit[i]
+        color += (specular * spec)[:, None] * light_color
+
+    return color
+
+def trace_rays(origins, directions, objects, lights, max_depth=MAX_DEPTH, min_weight=0.0, stats=None):
+    # Wavefront version of trace_ray: each bounce intersects, shades and spawns the
+    # next generation for all active rays at once. Rays that miss, hit a non-reflective
+    # material or whose throughput (product of reflection coefficients) drops to
+    # min_weight or below are dropped from the active arrays. stats is an optional RayStats.
+    num_rays = len(directions)
+    origins = np.broadcast_to(origins, directions.shape)
+    scene = compile_scene(objects)
+    if BACKEND == 'numba' and stats is None:
+        return kernels.trace(scene.kernel_data(), origins, directions, lights, max_depth, min_weight)
+    reflection = scene.material_params['reflection'][scene.prim_materials]
+
+    parent = np.arange(len(directions))
+    weight = np.ones(len(directions))
+    generations = []
+    root = parent  # primary ray each active ray descends from, for stats
+    if stats is not None and stats.detailed:
+        stats.ray_cost = np.zeros(num_rays)
+
+    for depth in range(max_depth + 1):
+        if len(directions) == 0:
+            break
+
+        start = time.perf_counter()
+        counts = None
+        if stats is not None:
+            stats.depth, stats.roots = depth, root
+            counts = np.zeros((len(directions), 2), dtype=int) if stats.detailed else None
+        closest_prim, closest_dist = scene.closest_hit_batch(origins, directions, counts)
+        if stats is not None:
+            stats.record('primary' if depth == 0 else 'reflection', len(directions), time.perf_counter() - start, counts)
+        hit = closest_prim >= 0
+
+        # Compact to the rays that hit something; misses contribute background (black)
+        prim = closest_prim[hit]
+        origins, directions = origins[hit], directions[hit]
+        parent, weight, root = parent[hit], weight[hit], root[hit]
+        if stats is not None:
+            stats.roots = root
+        hit_points = origins + directions * closest_dist[hit][:, None]
+
+        normals = scene.normals_batch(prim, hit_points, directions)
+
+        # Nudge hit point slightly along normal to avoid self-intersection artifacts
+        hit_points = hit_points + normals * 1e-4
+
+        local = shade_hits(origins, directions, prim, hit_points, normals, scene, lights, stats=stats)
+        r = reflection[prim]
+        generations.append((parent, local, r))
+
+        # Spawn the next generation from reflective hits
+        spawn = (r > 0) & (weight * r > min_weight)
+        d, n = directions[spawn], normals[spawn]
+        directions = normalize_rows(d - 2 * dot_rows(d, n)[:, None] * n)
+        origins = hit_points[spawn]
+        parent = np.flatnonzero(spawn)
+        weight, root = weight[spawn] * r[spawn], root[spawn]
+
+    return resolve_bounces(generations, num_rays)
+
+def resolve_bounces(generations, num_rays):
+    # Combine per-bounce (parent, local, reflection) back to front, clipping at every
+    # bounce like trace_ray does; parent indexes the previous generation's rows
+    result = np.zeros((0, 3))
+    child_parent = np.zeros(0, dtype=int)
+    for parent, local, r in reversed(generations):
+        reflected = np.zeros_like(local)
+        reflected[child_parent] = result
+        color = np.where((r > 0)[:, None], local * (1 - r[:, None]) + reflected * r[:, None], local)
+        result, child_parent = np.clip(color, 0, 1), parent
+
+    colors = np.zeros((num_rays, 3))
+    colors[child_parent] = result
+    return colors
+
+def sample_offsets(samples):
+    # Sub-pixel sample positions on a regular stratified grid; a single sample is the pixel center
+    cols = math.ceil(math.sqrt(samples))
+    rows = math.ceil(samples / cols)
+    return [((i % cols + 0.5) / cols, (i // cols + 0.5) / rows) for i in range(samples)]
+
+def primary_ray_directions(width, height, window=None, offset=(0.5, 0.5)):
+    # Unit directions through (x + offset[0], y + offset[1]) for every pixel, row-major (y, x),
+    # FOV 90 as in the scanline loop. window=(x0, y0, x1, y1) restricts them to a sub-rectangle.
+    x0, y0, x1, y1 = window if window is not None else (0, 0, width, height)
+    xs, ys = np.meshgrid(np.arange(x0, x1) + offset[0], np.arange(y0, y1) + offset[1])
+    return sample_directions(width, height, xs.ravel(), ys.ravel())
+
+def sample_directions(width, height, xs, ys):
+    # Unit directions through continuous image coordinates, e.g. (x + 0.5, y + 0.5) for a pixel center
+    ratio = width / height
+    px = (2 * xs / width - 1) * ratio * math.tan(math.pi / 4)
+    py = (1 - 2 * ys / height) * math.tan(math.pi / 4)
+    return normalize_rows(np.stack([px, py, -np.ones_like(px)], axis=-1))
+
+def render_batched(objects, lights, camera_pos, width, height, max_depth=MAX_DEPTH, window=None, samples=1, stats=None):
+    # Whole-frame (or window) render averaging `samples` stratified rays per pixel;
+    # returns a (rows, cols, 3) float image in [0, 1]
+    x0, y0, x1, y1 = window if window is not None else (0, 0, width, height)
+    colors = np.zeros(((y1 - y0) * (x1 - x0), 3))
+    cost = np.zeros(len(colors))
+    for offset in sample_offsets(samples):
+        directions = primary_ray_directions(width, height, window, offset)
+        origins = np.broadcast_to(np.asarray(camera_pos, dtype=float), directions.shape)
+        colors += trace_rays(origins, directions, objects, lights, max_depth, stats=stats)
+        if stats is not None and stats.detailed:
+            cost += stats.ray_cost
+    if stats is not None and stats.detailed:
+        stats.cost_windows.append(((x0, y0, x1, y1), cost.reshape(y1 - y0, x1 - x0)))
+    return (colors / samples).reshape(y1 - y0, x1 - x0, 3)
+
+def render_features(objects, camera_pos, width, height, window=None, samples=1):
+    # Guide buffers for denoise.py at the first hit of the same sample rays as
+    # render_batched, averaged per pixel: (rows, cols, 3) 'normal' and 'albedo' (the
+    # material color) and (rows, cols) 'depth' (hit distance); zero where rays miss.
+    # Costs one closest-hit query per sample, no shading or shadow rays.
+    scene = compile_scene(objects)
+    x0, y0, x1, y1 = window if window is not None else (0, 0, width, height)
+    num_pixels = (y1 - y0) * (x1 - x0)
+    normal, albedo, depth = np.zeros((num_pixels, 3)), np.zeros((num_pixels, 3)), np.zeros(num_pixels)
+    for offset in sample_offsets(samples):
+        directions = primary_ray_directions(width, height, window, offset)
+        origins = np.broadcast_to(np.asarray(camera_pos, dtype=float), directions.shape)
+        prim, dist = scene.closest_hit_batch(origins, directions)
+        hit = np.flatnonzero(prim >= 0)
+        points = origins[hit] + directions[hit] * dist[hit][:, None]
+        normal[hit] += scene.normals_batch(prim[hit], points, directions[hit])
+        albedo[hit] += scene.material_colors[scene.prim_materials[prim[hit]]]
+        depth[hit] += dist[hit]
+    shape = (y1 - y0, x1 - x0)
+    return {'normal': (normal / samples).reshape(shape + (3,)),
+            'albedo': (albedo / samples).reshape(shape + (3,)),
+            'depth': (depth / samples).reshape(shape)}
+
+# --- Progressive Anti-Aliasing ---
+
+class ProgressiveRenderer:
+    # Accumulates samples pass by pass: every step() adds one stratified, jittered
+    # sample to each pixel that hasn't converged yet, so image() is usable after any
+    # pass. A pixel's samples walk through a strata x strata grid of sub-pixel cells
+    # (random start per pixel, random position inside each cell). It stops once it
+    # has min_samples and the standard error of its mean is at most `threshold` in
+    # every channel, or at max_samples; flat regions stop after min_samples while
+    # edges and reflections keep sampling. Neighbours of noisy pixels first take
+    # one sample per cell so edges missed by the first samples still get found.
+    def __init__(self, objects, lights, camera_pos, width, height, max_depth=MAX_DEPTH,
+                 strata=4, min_samples=2, max_samples=64, threshold=0.01, seed=0):
+        self.objects = compile_scene(objects)
+        self.lights = lights
+        self.camera_pos = np.asarray(camera_pos, dtype=float)
+        self.width, self.height = width, height
+        self.max_depth = max_depth
+        self.strata = strata
+        self.min_samples, self.max_samples = min_samples, max_samples
+        self.threshold = threshold
+        self.edge_samples = min(strata * strata, max_samples)
+
+        num_pixels = width * height
+        self.rng = np.random.default_rng(seed)
+        self.cell_order = self.rng.permutation(strata * strata)
+        self.first_cell = self.rng.integers(strata * strata, size=num_pixels)
+        self.sum = np.zeros((num_pixels, 3))
+        self.sum_sq = np.zeros((num_pixels, 3))
+        self.count = np.zeros(num_pixels, dtype=int)
+        self.active = np.ones(num_pixels, dtype=bool)
+        self.passes = 0
+
+    def step(self):
+        # One pass over the active pixels; returns how many were sampled (0 once converged)
+        pixels = np.flatnonzero(self.active)
+        if len(pixels) == 0:
+            return 0
+        cells = self.cell_order[(self.first_cell[pixels] + self.count[pixels]) % len(self.cell_order)]
+        jitter = self.rng.random((len(pixels), 2))
+        xs = pixels % self.width + (cells % self.strata + jitter[:, 0]) / self.strata
+        ys = pixels // self.width + (cells // self.strata + jitter[:, 1]) / self.strata
+
+        directions = sample_directions(self.width, self.height, xs, ys)
+        colors = trace_rays(self.camera_pos, directions, self.objects, self.lights, self.max_depth)
+
+        self.sum[pixels] += colors
+        self.sum_sq[pixels] += colors * colors
+        self.count[pixels] += 1
+        self._update_active()
+        self.passes += 1
+        return len(pixels)
+
+    def _update_active(self):
+        n = np.maximum(self.count, 1)[:, None]
+        mean = self.sum / n
+        variance = np.maximum(self.sum_sq / n - mean * mean, 0)
+        # Standard error of the mean from the unbiased sample variance: sqrt(var / (n - 1))
+        error = np.sqrt(variance / np.maximum(n - 1, 1)).max(axis=1)
+        noisy = (self.count >= 2) & (error > self.threshold)
+
+        # A few samples can all land on one side of an edge and look converged, so
+        # the 3x3 neighbourhood of a noisy pixel gets at least edge_samples (one per cell)
+        grid = np.pad(noisy.reshape(self.height, self.width), 1)
+        near_noisy = np.zeros((self.height, self.width), dtype=bool)
+        for dy in range(3):
+            for dx in range(3):
+                near_noisy |= grid[dy:dy + self.height, dx:dx + self.width]
+        required = np.where(near_noisy.ravel(), self.edge_samples, self.min_samples)
+
+        self.active = (self.count < self.max_samples) & ((self.count < required) | noisy)
+
+    def image(self):
+        # Current estimate as a (height, width, 3) float image; unsampled pixels are black
+        mean = self.sum / np.maximum(self.count, 1)[:, None]
+        return mean.reshape(self.height, self.width, 3)
+
+    def render(self, on_pass=None):
+        # Step until every pixel has converged. on_pass(self) runs after each pass and may
+        # return False to stop early (e.g. to show intermediate images).
+        while self.step():
+            if on_pass is not None and on_pass(self) is False:
+                break
+        return self.image()
+
+# --- Main Configuration & Loop ---
+
+def default_scene():
     materials = {
         'red': Material([1.0, 0.0, 0.0], reflection=0.2),
         'green': Material([0.0, 1.0, 0.0], reflection=0.2),
@@ -173,54 +1369,103 @@ def main():
     ]
 
     camera_pos = np.array([0, 1, 0])
-    
+    return objects, lights, camera_pos
+
+def main(mode='tiles'):
+    # pygame is only needed for the window; headless renders (render_cli.py) never import it
+    import pygame
+    from framebuffer import Framebuffer
+
+    WIDTH, HEIGHT = 400, 300 # Low res for performance in pure Python
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Mini Ray Tracer")
+
+    objects, lights, camera_pos = default_scene()
+
     # Precompute rays
     ratio = WIDTH / HEIGHT
-    screen_arr = np.zeros((WIDTH, HEIGHT, 3))
+    framebuffer = Framebuffer(WIDTH, HEIGHT)
     
     print("Rendering...")
-    
-    # Scanline rendering
-    for y in range(HEIGHT):
-        # Handle events to keep window responsive
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return
-
-        for x in range(WIDTH):
-            # Screen space coordinates
-            # Map x from [0, WIDTH] to [-1, 1] * ratio
-            # Map y from [0, HEIGHT] to [1, -1]
+
+    if mode == 'tiles':
+        from tile_renderer import render_tiles
+        closed = []
+
+        def show_tile(tile, tile_framebuffer):
+            # Present each finished tile as it arrives and keep the window responsive
+            x0, y0, x1, y1 = tile
+            framebuffer.update(x0, y0, tile_framebuffer[y0:y1, x0:x1])
+            framebuffer.present(screen)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    closed.append(True)
+                    return False
+
+        render_tiles(objects, lights, camera_pos, WIDTH, HEIGHT, on_tile=show_tile)
+        if closed:
+            pygame.quit()
+            return
+    elif mode == 'batched':
+        # Whole frame in one pass
+        framebuffer.update(0, 0, render_batched(objects, lights, camera_pos, WIDTH, HEIGHT))
+    else:
+        # Scanline rendering
+        scene = compile_scene(objects)
+        row = np.zeros((1, WIDTH, 3))
+        for y in range(HEIGHT):
+            # Handle events to keep window responsive
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return
+
+            for x in range(WIDTH):
+                # Screen space coordinates
+                # Map x from [0, WIDTH] to [-1, 1] * ratio
+                # Map y from [0, HEIGHT] to [1, -1]
             
-            px = (2 * (x + 0.5) / WIDTH - 1) * ratio * math.tan(math.pi / 4) # FOV 90
-            py = (1 - 2 * (y + 0.5) / HEIGHT) * math.tan(math.pi / 4)
+                px = (2 * (x + 0.5) / WIDTH - 1) * ratio * math.tan(math.pi / 4) # FOV 90
+                py = (1 - 2 * (y + 0.5) / HEIGHT) * math.tan(math.pi / 4)
             
-            direction = normalize(np.array([px, py, -1]))
-            ray = Ray(camera_pos, direction)
+                direction = normalize(np.array([px, py, -1]))
+                ray = Ray(camera_pos, direction)
             
-            color = trace_ray(ray, objects, lights, 0)
-            screen_arr[x, y] = color * 255
+                row[0, x] = trace_ray(ray, scene, lights, 0)
+            framebuffer.update(0, y, row)
 
-        # Update display every few lines to show progress
-        if y % 10 == 0:
-            surf = pygame.surfarray.make_surface(screen_arr)
-            screen.blit(surf, (0, 0))
-            pygame.display.flip()
+            # Update display every few lines to show progress
+            if y % 10 == 0:
+                framebuffer.present(screen)
 
+    framebuffer.present(screen)
     print("Rendering Complete!")
     
+    # The finished image stays in the window surface; sleep until something happens
+    # and only redraw when the window was uncovered
     running = True
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-        
-        surf = pygame.surfarray.make_surface(screen_arr)
-        screen.blit(surf, (0, 0))
-        pygame.display.flip()
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            running = False
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            pygame.display.flip()
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    if "--scanline" in sys.argv:
+        main('scanline')
+    elif "--batched" in sys.argv:
+        main('batched')
+    elif "--interactive" in sys.argv:
+        # Camera controls with progressive-resolution refinement, see preview.py
+        import preview
+        preview.main([])
+    elif "--animate" in sys.argv:
+        # Keyframed demo animation to frames/, see animation.py
+        import animation
+        animation.main([])
+    else:
+        main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import time
+from contextlib import contextmanager
+from raytracer import (BACKEND, MAX_DEPTH, ProgressiveRenderer, RayStats, compile_scene, default_scene, render_batched,
+                       render_features)
+from image_io import heat_colors, write_png, write_pfm
+from scene import load_scene
+
+# Headless offline renderer: no window, no pygame import.
+#   python render_cli.py --width 1920 --height 1080 --samples 4 --workers 8 -o frame.png
+# writes frame.png (8-bit) and frame.pfm (float32 HDR).
+#   python render_cli.py --width 16384 --height 16384 --stream -o poster.png [--resume]
+# renders band by band straight into the PNG (or a memory-mapped .ppm) instead, with
+# memory bounded by the band size; see stream_render.py.
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the ray tracer scene to image files without a display.")
+    parser.add_argument('--scene', help="scene file (.json or .npz); default is the built-in demo scene")
+    parser.add_argument('--no-cache', action='store_true', help="don't read or write the scene cache")
+    parser.add_argument('--width', type=int, default=400)
+    parser.add_argument('--height', type=int, default=300)
+    parser.add_argument('--samples', type=int, default=1, help="rays per pixel (the maximum with --adaptive)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="jittered progressive sampling that stops early in pixels whose variance is low (single process)")
+    parser.add_argument('--threshold', type=float, default=0.01, help="--adaptive: target standard error per pixel")
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help="reflection bounces")
+    parser.add_argument('--workers', type=int, default=1, help="render processes; 1 renders in this process")
+    parser.add_argument('-o', '--output', default='render.png', help="PNG path; the PFM goes next to it")
+    parser.add_argument('--hdr', help="float32 PFM path (default: output with .pfm)")
+    parser.add_argument('--stats', action='store_true',
+                        help="print ray counts, query times and per-tile timings (not with --adaptive)")
+    parser.add_argument('--heatmap', metavar='PNG',
+                        help="also write per-pixel cost (intersection tests + BVH nodes) as a false-color image; implies --stats")
+    parser.add_argument('--denoise', action='store_true',
+                        help="filter the result guided by normal, albedo and depth buffers (see denoise.py)")
+    parser.add_argument('--stream', action='store_true',
+                        help="render in bands written straight to the .png/.ppm output, for images too large for memory (no PFM)")
+    parser.add_argument('--band-rows', type=int, help="--stream: rows per band (default: about 64K pixels)")
+    parser.add_argument('--resume', action='store_true', help="--stream: continue an interrupted render of the same output")
+    args = parser.parse_args(argv)
+    if args.adaptive and (args.stats or args.heatmap):
+        parser.error("--stats/--heatmap don't work with --adaptive")
+    if args.stream and (args.adaptive or args.workers > 1 or args.stats or args.heatmap or args.denoise or args.hdr):
+        parser.error("--stream renders single-process, without --adaptive/--stats/--heatmap/--denoise/--hdr")
+    return args
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        yield
+        self.phases.append((name, time.perf_counter() - start))
+
+    def report(self):
+        for name, seconds in self.phases:
+            print(f"  {name:<8} {seconds:8.3f} s")
+        print(f"  {'total':<8} {sum(s for _, s in self.phases):8.3f} s")
+
+def main(argv=None):
+    args = parse_args(argv)
+    hdr_path = args.hdr or os.path.splitext(args.output)[0] + '.pfm'
+    timer = PhaseTimer()
+
+    if args.scene:
+        with timer('load'):
+            scene = load_scene(args.scene, cache=not args.no_cache)
+        with timer('scene'):
+            objects, lights, camera_pos = scene, scene.lights(), scene.camera
+    else:
+        with timer('scene'):
+            objects, lights, camera_pos = default_scene()
+        with timer('pack'):
+            objects = compile_scene(objects)
+
+    if args.stream:
+        from stream_render import render_stream
+        print(f"Streaming {args.width}x{args.height}, {args.samples} spp, depth {args.max_depth}, {BACKEND} backend...")
+        with timer('render'):
+            render_stream(objects, lights, camera_pos, args.width, args.height, args.output, args.max_depth,
+                          args.samples, args.band_rows, args.resume, settings={'scene': args.scene})
+        print(f"Saved {args.output}")
+        timer.report()
+        return
+
+    stats = RayStats(detailed=bool(args.heatmap)) if args.stats or args.heatmap else None
+    print(f"Rendering {args.width}x{args.height}, {args.samples} spp, depth {args.max_depth}, {args.workers} worker(s), {BACKEND} backend...")
+    with timer('render'):
+        if args.adaptive:
+            renderer = ProgressiveRenderer(objects, lights, camera_pos, args.width, args.height, args.max_depth,
+                                           min_samples=min(2, args.samples), max_samples=args.samples,
+                                           threshold=args.threshold)
+            image = renderer.render()
+            print(f"  {renderer.count.mean():.2f} samples per pixel on average")
+        elif args.workers > 1:
+            from tile_renderer import render_tiles
+            image = render_tiles(objects, lights, camera_pos, args.width, args.height, args.max_depth,
+                                 workers=args.workers, samples=args.samples, stats=stats)
+        else:
+            image = render_batched(objects, lights, camera_pos, args.width, args.height, args.max_depth,
+                                   samples=args.samples, stats=stats)
+
+    if args.denoise:
+        from denoise import denoise
+        with timer('denoise'):
+            image = denoise(image, **render_features(objects, camera_pos, args.width, args.height, samples=args.samples))
+
+    with timer('write'):
+        write_png(args.output, image)
+        write_pfm(hdr_path, image)
+        if args.heatmap:
+            write_png(args.heatmap, heat_colors(stats.heatmap(args.width, args.height)))
+
+    print(f"Saved {args.output} and {hdr_path}" + (f" and {args.heatmap}" if args.heatmap else ""))
+    timer.report()
+    if stats is not None:
+        print(stats.report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+from image_io import write_png
+
+# Render targets for the 2D rasterizers, so they run with or without a display.
+#   target = ArrayTarget(800, 600)           # NumPy uint8 (height, width, 3), no pygame
+#   target = SurfaceTarget(screen)           # a pygame Surface, e.g. the window
+#   target.set_pixels(xs, ys, WHITE); target.save('out.png')
+#
+# Rasterizers hand over whole batches of pixels: set_pixels() clips them to the target
+# (off-target pixels are dropped, as Surface.set_at does) and writes them in one
+# indexed assignment; fill_rect() writes axis-aligned runs as slices and fill_spans()
+# batches of horizontal runs (filled shapes), one per row. The array
+# target is the fast path for bulk and batch work; the surface target writes through
+# a surfarray.pixels3d view, unlocked again before the call returns.
+
+def _clip(xs, ys, color, width, height):
+    xs = np.asarray(xs).ravel().astype(np.intp, copy=False)
+    ys = np.asarray(ys).ravel().astype(np.intp, copy=False)
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    color = np.asarray(color)
+    if color.ndim == 2:
+        color = color[inside]
+    return xs[inside], ys[inside], color
+
+def _clip_spans(ys, x0s, x1s, width, height):
+    ys, x0s, x1s = (np.asarray(a).ravel().astype(np.intp, copy=False) for a in (ys, x0s, x1s))
+    x0s, x1s = np.maximum(x0s, 0), np.minimum(x1s, width - 1)
+    inside = (ys >= 0) & (ys < height) & (x1s >= x0s)
+    return ys[inside], x0s[inside], x1s[inside]
+
+class ArrayTarget:
+    def __init__(self, width, height, background=(0, 0, 0)):
+        self.width, self.height = width, height
+        self.array = np.empty((height, width, 3), dtype=np.uint8)
+        self.fill(background)
+
+    def fill(self, color):
+        self.array[:] = color
+
+    def set_at(self, pos, color):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.array[y, x] = color
+
+    def set_pixels(self, xs, ys, color):
+        # color: one RGB triple or an (N, 3) array, one per pixel
+        xs, ys, color = _clip(xs, ys, color, self.width, self.height)
+        self.array[ys, xs] = color
+
+    def fill_rect(self, x0, y0, x1, y1, color):
+        # Inclusive pixel rectangle, clipped
+        if x1 >= max(x0, 0) and y1 >= max(y0, 0):
+            self.array[max(y0, 0):y1 + 1, max(x0, 0):x1 + 1] = color
+
+    def fill_spans(self, ys, x0s, x1s, color):
+        # Inclusive horizontal runs x0s[k]..x1s[k] on row ys[k], one color. Pixels are
+        # written as single 3-byte elements; when the spans overlap so much that they
+        # cover more than the whole target, a per-row running count of span starts
+        # minus ends marks the covered pixels instead, at the cost of one pass
+        ys, x0s, x1s = _clip_spans(ys, x0s, x1s, self.width, self.height)
+        counts = x1s - x0s + 1
+        pixels = self.array.view(np.dtype((np.void, 3))).reshape(-1)
+        color = np.asarray(color, dtype=np.uint8).view(np.dtype((np.void, 3)))[0]
+        if counts.sum() > self.width * self.height:
+            row = ys * (self.width + 1)
+            edges = np.bincount(row + x0s, minlength=self.height * (self.width + 1))
+            edges -= np.bincount(row + x1s + 1, minlength=self.height * (self.width + 1))
+            covered = np.cumsum(edges.reshape(self.height, self.width + 1)[:, :-1], axis=1) > 0
+            pixels[covered.ravel()] = color
+        else:
+            start = np.cumsum(counts) - counts
+            pixels[np.arange(counts.sum()) + np.repeat(ys * self.width + x0s - start, counts)] = color
+
+    def image(self):
+        return self.array
+
+    def save(self, path):
+        write_png(path, self.array)
+
+class SurfaceTarget:
+    def __init__(self, surface):
+        self.surface = surface
+        self.width, self.height = surface.get_size()
+
+    def fill(self, color):
+        self.surface.fill(color)
+
+    def set_at(self, pos, color):
+        self.surface.set_at(pos, color)
+
+    def set_pixels(self, xs, ys, color):
+        import pygame
+        xs, ys, color = _clip(xs, ys, color, self.width, self.height)
+        pixels = pygame.surfarray.pixels3d(self.surface)  # (width, height, 3) view, locks the surface
+        pixels[xs, ys] = color
+        del pixels
+
+    def fill_rect(self, x0, y0, x1, y1, color):
+        import pygame
+        if x1 >= x0 and y1 >= y0:
+            self.surface.fill(color, pygame.Rect(x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+
+    def fill_spans(self, ys, x0s, x1s, color):
+        import pygame
+        ys, x0s, x1s = _clip_spans(ys, x0s, x1s, self.width, self.height)
+        for y, x0, x1 in zip(ys.tolist(), x0s.tolist(), x1s.tolist()):
+            self.surface.fill(color, pygame.Rect(x0, y, x1 - x0 + 1, 1))
+
+    def image(self):
+        # (height, width, 3) uint8 copy
+        import pygame
+        return pygame.surfarray.array3d(self.surface).transpose(1, 0, 2)
+
+    def save(self, path):
+        write_png(path, self.image())
@@ -0,0 +1,172 @@
+import hashlib
+import io
+import json
+import os
+import numpy as np
+from mesh import load_obj
+from raytracer import MATERIAL_PARAMS, Material, Scene
+
+# Declarative scene files.
+#
+# JSON layout (see scenes/default.json):
+#   {
+#     "camera": [0, 1, 0],
+#     "materials": {"red": {"color": [1, 0, 0], "reflection": 0.2}, ...},
+#     "spheres": [{"center": [0, 0, -5], "radius": 1, "material": "red"}, ...],
+#     "planes": [{"point": [0, -1, 0], "normal": [0, 1, 0], "material": "gray_floor"}],
+#     "lights": [{"position": [5, 5, -5], "color": [1, 1, 1]}],
+#     "meshes": [{"obj": "models/teapot.obj", "material": "red"}]
+#   }
+# "spheres" and "planes" may also be given column-wise, which is much faster to
+# parse for large scenes:
+#   "spheres": {"center": [[...], ...], "radius": [...], "material": ["red", ...]}
+# Mesh paths are relative to the scene file; a mesh can also be given inline as
+# {"vertices": [[x, y, z], ...], "faces": [[i, j, k], ...], "material": ...}.
+#
+# The binary variant (.npz) stores the same arrays directly. Loaded scenes are
+# cached by file hash together with their BVH, see load_scene().
+
+CACHE_VERSION = 2
+
+# --- JSON ---
+
+def _columns(items, fields):
+    # Accept both a list of records and a dict of columns
+    if isinstance(items, dict):
+        return [items[field] for field in fields]
+    return [[item[field] for item in items] for field in fields]
+
+def _load_meshes(meshes, base_dir):
+    # Concatenated vertices/faces plus offsets, the layout Scene takes
+    parts = [load_obj(os.path.join(base_dir, mesh['obj'])) if 'obj' in mesh
+             else (np.asarray(mesh['vertices'], dtype=float).reshape(-1, 3), np.asarray(mesh['faces'], dtype=int).reshape(-1, 3))
+             for mesh in meshes]
+    vertex_offsets = np.cumsum([0] + [len(v) for v, _ in parts])
+    face_offsets = np.cumsum([0] + [len(f) for _, f in parts])
+    if not parts:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=int), vertex_offsets, face_offsets
+    return np.concatenate([v for v, _ in parts]), np.concatenate([f for _, f in parts]), vertex_offsets, face_offsets
+
+def parse_json_scene(data, base_dir='.'):
+    material_names = list(data['materials'])
+    index = {name: i for i, name in enumerate(material_names)}
+    specs = [data['materials'][name] for name in material_names]
+    defaults = Material([0, 0, 0])
+
+    def material_ids(names):
+        return np.array([index[name] for name in names], dtype=int)
+
+    centers, radii, sphere_mats = _columns(data.get('spheres', []), ('center', 'radius', 'material'))
+    points, normals, plane_mats = _columns(data.get('planes', []), ('point', 'normal', 'material'))
+    positions, colors = _columns(data.get('lights', []), ('position', 'color'))
+    meshes = data.get('meshes', [])
+    mesh_vertices, mesh_faces, vertex_offsets, face_offsets = _load_meshes(meshes, base_dir)
+
+    normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=normals.copy(), where=lengths != 0)
+
+    return Scene(
+        material_names,
+        [spec['color'] for spec in specs],
+        {name: [spec.get(name, getattr(defaults, name)) for spec in specs] for name in MATERIAL_PARAMS},
+        centers, radii, material_ids(sphere_mats),
+        points, normals, material_ids(plane_mats),
+        positions, colors, data.get('camera', [0, 0, 0]),
+        mesh_vertices=mesh_vertices, mesh_faces=mesh_faces,
+        mesh_vertex_offsets=vertex_offsets, mesh_face_offsets=face_offsets,
+        mesh_materials=material_ids([mesh['material'] for mesh in meshes]),
+    )
+
+def scene_to_json(scene):
+    materials = {
+        name: dict(color=scene.material_colors[i].tolist(),
+                   **{p: float(scene.material_params[p][i]) for p in MATERIAL_PARAMS})
+        for i, name in enumerate(scene.material_names)
+    }
+    names = scene.material_names
+    return {
+        'camera': scene.camera.tolist(),
+        'materials': materials,
+        'spheres': {
+            'center': scene.sphere_centers.tolist(),
+            'radius': scene.sphere_radii.tolist(),
+            'material': [names[m] for m in scene.sphere_materials],
+        },
+        'planes': [
+            {'point': p.tolist(), 'normal': n.tolist(), 'material': names[m]}
+            for p, n, m in zip(scene.plane_points, scene.plane_normals, scene.plane_materials)
+        ],
+        'lights': [
+            {'position': p.tolist(), 'color': c.tolist()}
+            for p, c in zip(scene.light_positions, scene.light_colors)
+        ],
+        'meshes': [
+            {
+                'vertices': scene.mesh_vertices[scene.mesh_vertex_offsets[i]:scene.mesh_vertex_offsets[i + 1]].tolist(),
+                'faces': scene.mesh_faces[scene.mesh_face_offsets[i]:scene.mesh_face_offsets[i + 1]].tolist(),
+                'material': names[m],
+            }
+            for i, m in enumerate(scene.mesh_materials)
+        ],
+    }
+
+# --- Loading, saving and the cache ---
+
+def save_scene(scene, path):
+    # .npz writes the binary variant, anything else JSON
+    if path.endswith('.npz'):
+        np.savez(path, **scene.to_arrays())
+    else:
+        with open(path, 'w') as f:
+            json.dump(scene_to_json(scene), f, indent=2)
+
+def _parse(path, content):
+    if path.endswith('.npz'):
+        with np.load(io.BytesIO(content), allow_pickle=False) as arrays:
+            return Scene.from_arrays(dict(arrays))
+    return parse_json_scene(json.loads(content), os.path.dirname(path))
+
+def _dependencies(path, content):
+    # OBJ files a JSON scene refers to; their contents are part of the cache key
+    if path.endswith('.npz'):
+        return []
+    meshes = json.loads(content).get('meshes', [])
+    return [os.path.join(os.path.dirname(path), mesh['obj']) for mesh in meshes if 'obj' in mesh]
+
+def default_cache_dir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), '.scene_cache')
+
+def load_scene(path, cache=True, cache_dir=None):
+    # Returns a Scene with its BVHs built. With cache=True the parsed arrays and the BVHs
+    # are stored under cache_dir keyed by the SHA-256 of the file and the OBJ files it
+    # uses, so loading an unchanged scene again skips parsing and BVH construction.
+    with open(path, 'rb') as f:
+        content = f.read()
+    if not cache:
+        scene = _parse(path, content)
+        scene.bvh_arrays()
+        return scene
+
+    digest = hashlib.sha256(content)
+    for dependency in _dependencies(path, content):
+        with open(dependency, 'rb') as f:
+            digest.update(f.read())
+    digest = digest.hexdigest()
+    cache_dir = cache_dir or default_cache_dir(path)
+    cache_path = os.path.join(cache_dir, f'{digest}-v{CACHE_VERSION}.npz')
+
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as arrays:
+            return Scene.from_arrays(dict(arrays))
+
+    scene = _parse(path, content)
+    arrays = scene.to_arrays()
+    arrays.update(scene.bvh_arrays())
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under a temporary name first so a crashed run never leaves a truncated cache entry
+    tmp_path = cache_path + f'.{os.getpid()}.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, cache_path)
+    return scene
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+from image_io import PNGStreamWriter, PPMStreamWriter
+from raytracer import MAX_DEPTH, compile_scene, render_batched
+
+# Memory-bounded rendering of very large images: horizontal bands are rendered one
+# at a time and handed straight to a streaming PNG or memory-mapped PPM writer, so
+# peak memory depends on the band size, not the image size.
+#
+# After every band, <output>.progress records the rows done plus the writer's
+# resume state (written to a temp file and renamed, so a crash never leaves it half
+# written). render_stream(..., resume=True) picks up after the last finished band if
+# the recorded settings match; the file is removed once the image is complete.
+
+BAND_RAYS = 1 << 16  # primary rays per band per sample, for the default band height
+
+WRITERS = {'.png': PNGStreamWriter, '.ppm': PPMStreamWriter}
+
+def progress_path(path):
+    return path + '.progress'
+
+def _load_progress(path, settings):
+    try:
+        with open(progress_path(path)) as f:
+            progress = json.load(f)
+    except FileNotFoundError:
+        return None
+    if progress['settings'] != settings or not os.path.exists(path):
+        raise ValueError(f"{progress_path(path)} belongs to a different render; delete it or render without resume")
+    return progress['state']
+
+def _save_progress(path, settings, state):
+    temp = progress_path(path) + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump({'settings': settings, 'state': state}, f)
+    os.replace(temp, progress_path(path))
+
+def render_stream(objects, lights, camera_pos, width, height, path, max_depth=MAX_DEPTH, samples=1,
+                  band_rows=None, resume=False, settings=None, log=print):
+    # Renders to path (.png or .ppm) band by band. settings: extra JSON-able values
+    # that must match for a resume, e.g. the scene file; returns the rows rendered
+    # by this call.
+    writer_class = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer_class is None:
+        raise ValueError(f"streaming output must be one of {', '.join(WRITERS)}: {path}")
+    band_rows = band_rows or max(1, BAND_RAYS // width)
+    settings = dict(settings or {}, width=width, height=height, max_depth=max_depth, samples=samples)
+
+    state = _load_progress(path, settings) if resume else None
+    writer = writer_class(path, width, height, state)
+    scene = compile_scene(objects)
+    start_row = writer.rows
+    if start_row:
+        log(f"Resuming at row {start_row} of {height}")
+    start = time.perf_counter()
+    try:
+        for y0 in range(start_row, height, band_rows):
+            y1 = min(y0 + band_rows, height)
+            band = render_batched(scene, lights, camera_pos, width, height, max_depth,
+                                  window=(0, y0, width, y1), samples=samples)
+            writer.write_rows(band)
+            _save_progress(path, settings, writer.state())
+            log(f"  rows {y1}/{height}  {time.perf_counter() - start:.1f} s")
+    finally:
+        writer.close()
+    os.remove(progress_path(path))
+    return height - start_row
@@ -0,0 +1,103 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from raytracer import MAX_DEPTH, RayStats, render_batched
+
+# Tile-based renderer: the frame is split into tiles that a process pool renders
+# straight into a shared-memory float32 framebuffer of shape (height, width, 3).
+# Workers get the scene once, through the pool initializer, and only tile
+# coordinates travel per task.
+
+TILE_SIZE = 32
+
+_worker = {}
+
+def make_tiles(width, height, tile_size=TILE_SIZE):
+    # (x0, y0, x1, y1) tiles, center-out so the interesting part of the frame shows first
+    tiles = [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+    cx, cy = width / 2, height / 2
+    tiles.sort(key=lambda t: ((t[0] + t[2]) / 2 - cx) ** 2 + ((t[1] + t[3]) / 2 - cy) ** 2)
+    return tiles
+
+def _init_worker(shm_name, shape, scene):
+    # Pool workers share the parent's resource tracker, so attaching doesn't hand them ownership
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker['shm'] = shm
+    _worker['framebuffer'] = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    _worker['scene'] = scene
+
+def _render_tile(tile, detailed=None):
+    # detailed is None without stats, else the RayStats mode; the tile's stats and
+    # render time go back to the parent
+    objects, lights, camera_pos, width, height, max_depth, samples = _worker['scene']
+    x0, y0, x1, y1 = tile
+    stats = None if detailed is None else RayStats(detailed)
+    start = time.perf_counter()
+    _worker['framebuffer'][y0:y1, x0:x1] = render_batched(objects, lights, camera_pos, width, height, max_depth,
+                                                          tile, samples, stats)
+    if stats is not None:
+        stats.tile_seconds.append((tile, time.perf_counter() - start))
+    return tile, stats
+
+class TileRenderer:
+    # Owns the shared framebuffer and the pool; use as a context manager so both are released.
+    #   with TileRenderer(objects, lights, camera_pos, w, h) as renderer:
+    #       image = renderer.render(on_tile=callback)
+    def __init__(self, objects, lights, camera_pos, width, height, max_depth=MAX_DEPTH,
+                 workers=None, tile_size=TILE_SIZE, samples=1):
+        self.width, self.height = width, height
+        self.tile_size = tile_size
+        shape = (height, width, 3)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        self.framebuffer = np.ndarray(shape, dtype=np.float32, buffer=self.shm.buf)
+        self.framebuffer[:] = 0
+
+        scene = (objects, lights, camera_pos, width, height, max_depth, samples)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(self.shm.name, shape, scene),
+        )
+
+    def render(self, on_tile=None, stats=None):
+        # Renders every tile; on_tile(tile, framebuffer) runs in this process as tiles finish
+        # and may return False to cancel the rest. Returns the framebuffer (a shared view).
+        # Per-tile RayStats, including the tile timings, are merged into stats if given.
+        detailed = None if stats is None else stats.detailed
+        futures = [self.pool.submit(_render_tile, tile, detailed)
+                   for tile in make_tiles(self.width, self.height, self.tile_size)]
+        for future in as_completed(futures):
+            tile, tile_stats = future.result()
+            if stats is not None:
+                stats.merge(tile_stats)
+            if on_tile is not None and on_tile(tile, self.framebuffer) is False:
+                for pending in futures:
+                    pending.cancel()
+                break
+        return self.framebuffer
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        # Drop our view before closing, the buffer can't be released while it is exported
+        self.framebuffer = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def render_tiles(objects, lights, camera_pos, width, height, max_depth=MAX_DEPTH,
+                 workers=None, tile_size=TILE_SIZE, on_tile=None, samples=1, stats=None):
+    # One-shot helper; returns a private (height, width, 3) float32 copy of the image
+    with TileRenderer(objects, lights, camera_pos, width, height, max_depth, workers, tile_size, samples) as renderer:
+        return renderer.render(on_tile, stats).copy()
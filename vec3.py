@@ -0,0 +1,63 @@
+import math
+
+# Scalar 3-vector kernel for the per-ray code paths.
+#
+# Vectors are plain tuples of floats. For single vectors this beats both NumPy
+# (np.dot / np.linalg.norm pay call overhead far above the arithmetic on three
+# floats) and a Vec class (attribute lookups plus a new object per operator).
+# Tuples are immutable, so the fused helpers (madd, reflect, ...) are the
+# "in-place" ops: they do the whole expression with one allocation instead of one
+# per intermediate.
+
+ZERO = (0.0, 0.0, 0.0)
+
+def vec(v):
+    # Any 3-sequence (list, NumPy array) -> tuple of Python floats
+    return (float(v[0]), float(v[1]), float(v[2]))
+
+def add(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+def sub(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+def scale(a, k):
+    return (a[0] * k, a[1] * k, a[2] * k)
+
+def mul(a, b):
+    # Component-wise product, e.g. color * light color
+    return (a[0] * b[0], a[1] * b[1], a[2] * b[2])
+
+def dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+def length(a):
+    return math.sqrt(a[0] * a[0] + a[1] * a[1] + a[2] * a[2])
+
+def normalize(a):
+    # Zero vectors come back unchanged, like raytracer.normalize
+    norm = math.sqrt(a[0] * a[0] + a[1] * a[1] + a[2] * a[2])
+    if norm == 0:
+        return a
+    return (a[0] / norm, a[1] / norm, a[2] / norm)
+
+def madd(a, b, k):
+    # a + b * k
+    return (a[0] + b[0] * k, a[1] + b[1] * k, a[2] + b[2] * k)
+
+def madd_mul(a, b, c, k):
+    # a + b * c * k (component-wise b * c), the diffuse/specular accumulate
+    return (a[0] + b[0] * c[0] * k, a[1] + b[1] * c[1] * k, a[2] + b[2] * c[2] * k)
+
+def lerp(a, b, t):
+    # a * (1 - t) + b * t
+    s = 1 - t
+    return (a[0] * s + b[0] * t, a[1] * s + b[1] * t, a[2] * s + b[2] * t)
+
+def reflect(d, n):
+    # d - 2 (d . n) n
+    k = 2 * (d[0] * n[0] + d[1] * n[1] + d[2] * n[2])
+    return (d[0] - n[0] * k, d[1] - n[1] * k, d[2] - n[2] * k)
+
+def clip01(a):
+    return (min(max(a[0], 0.0), 1.0), min(max(a[1], 0.0), 1.0), min(max(a[2], 0.0), 1.0))